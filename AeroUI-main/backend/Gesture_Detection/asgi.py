@@ -13,4 +13,18 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Gesture_Detection.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from core.push import state_socket  # noqa: E402  (needs the app registry loaded above)
+
+
+async def application(scope, receive, send):
+    # Django itself only speaks HTTP; /ws/state/ pushes state changes to
+    # dashboards so they don't have to poll the REST endpoints.
+    if scope["type"] == "websocket":
+        if scope["path"].rstrip("/") == "/ws/state":
+            await state_socket(scope, receive, send)
+        else:
+            await send({"type": "websocket.close", "code": 4404})
+        return
+    await django_application(scope, receive, send)
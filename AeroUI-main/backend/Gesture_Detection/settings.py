@@ -10,11 +10,17 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# shared/state_schema.py at the repository root: the vehicle/media field
+# definitions core.models builds its columns from
+sys.path.append(str(BASE_DIR.parent.parent / 'shared'))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/6.0/howto/deployment/checklist/
@@ -82,6 +88,39 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests instead of reconnecting every time
+        'CONN_MAX_AGE': int(os.environ.get('AEROUI_DB_CONN_MAX_AGE', 600)),
+        'OPTIONS': {
+            'timeout': 5,  # Seconds a writer waits for the lock
+        },
+    }
+}
+
+# SQLite profile, applied to every new connection (core/db.py).
+# WAL lets the dashboard read while a write is in progress; NORMAL is crash-safe
+# with WAL and skips the fsync on every commit (use FULL to fsync each one).
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('AEROUI_SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('AEROUI_SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'temp_store': 'MEMORY',
+}
+
+# State change history (core/history.py): rows are inserted in batches off the request path
+STATE_HISTORY = {
+    'enabled': True,
+    'batch_size': 200,
+    'flush_interval': 1.0,  # Seconds
+}
+
+
+# Cache
+# The state singletons and their serialized responses are cached here (see core/state.py).
+# Local memory is per process: use a shared backend (Redis, Memcached) when running several workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'aeroui-state',
     }
 }
 
@@ -0,0 +1,85 @@
+import atexit
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+# Batched, off-request writer for StateChange history rows. Saves only queue
+# rows (after their transaction commits); a background thread inserts them
+# in one transaction per batch, so history never adds a write transaction to
+# the live request path.
+
+
+class HistoryWriter:
+    def __init__(self, enabled=True, batch_size=200, flush_interval=1.0, max_pending=10000):
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def record(self, model, changes):
+        """Queue {field: value} changes of one model, stamped now."""
+        if not self.enabled or not changes:
+            return
+        now = timezone.now()
+        self._ensure_started()
+        for field, value in changes.items():
+            numeric = float(value) if isinstance(value, (int, float)) else None
+            try:
+                self._queue.put_nowait((model, field, value, numeric, now))
+            except queue.Full:
+                self.dropped += 1  # Database can't keep up, history is best-effort
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='state-history', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _take(self, block):
+        rows = []
+        try:
+            rows.append(self._queue.get(block, self.flush_interval))
+            while len(rows) < self.batch_size:
+                rows.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return rows
+
+    def _run(self):
+        while True:
+            rows = self._take(block=True)
+            if rows:
+                self._write(rows)
+
+    def _write(self, rows):
+        from .models import StateChange
+        try:
+            with transaction.atomic():
+                StateChange.objects.bulk_create([
+                    StateChange(model=model, field=field, value=value, numeric_value=numeric, changed_at=at)
+                    for model, field, value, numeric, at in rows
+                ])
+            self.written += len(rows)
+        except Exception as e:
+            print(f"Failed to write state history: {e}")
+        finally:
+            close_old_connections()
+
+    def flush(self):
+        """Write everything queued so far from the calling thread (used at exit and in tests)."""
+        while True:
+            rows = self._take(block=False)
+            if not rows:
+                break
+            self._write(rows)
+
+
+writer = HistoryWriter(**getattr(settings, 'STATE_HISTORY', {}))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:03
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_alter_mediastate_id_alter_vehiclestate_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StateChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=16)),
+                ('field', models.CharField(max_length=32)),
+                ('value', models.JSONField()),
+                ('numeric_value', models.FloatField(blank=True, null=True)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model', 'field', 'changed_at'], name='statechange_series_idx'), models.Index(fields=['changed_at'], name='statechange_time_idx')],
+            },
+        ),
+    ]
@@ -1,36 +1,86 @@
 from django.db import models
+from django.utils import timezone
+from state_schema import VEHICLE, MEDIA
+from . import state
 
-class VehicleState(models.Model):
-    # Climate
-    driver_temp = models.IntegerField(default=22)
-    passenger_temp = models.IntegerField(default=22)
-    fan_speed = models.IntegerField(default=3) # 1-5
-    
-    # Audio
-    volume = models.IntegerField(default=50) # 0-100
-    
+def schema_fields(schema):
+    """Abstract model with one column per field of a shared schema (see shared/state_schema.py)."""
+    attrs = {'__module__': __name__, 'Meta': type('Meta', (), {'abstract': True})}
+    for field in schema.fields:
+        if field.type is bool:
+            attrs[field.name] = models.BooleanField(default=field.default)
+        elif field.type is int:
+            attrs[field.name] = models.IntegerField(default=field.default)
+        elif field.url:
+            attrs[field.name] = models.URLField(max_length=field.max_length, blank=True, default=field.default)
+        else:
+            attrs[field.name] = models.CharField(max_length=field.max_length, default=field.default)
+    return type('%sStateFields' % schema.name.title(), (models.Model,), attrs)
+
+class VehicleState(schema_fields(VEHICLE)):
     def save(self, *args, **kwargs):
         self.pk = 1 # Singleton
+        previous = state.baseline(type(self))  # Before the row changes, so history only logs real changes
         super(VehicleState, self).save(*args, **kwargs)
+        state.saved(self, previous)  # Write-through to the cache and push to /ws/state/
 
     @classmethod
     def load(cls):
-        obj, created = cls.objects.get_or_create(pk=1)
-        return obj
-
-class MediaState(models.Model):
-    title = models.CharField(max_length=100, default="Not Playing")
-    artist = models.CharField(max_length=100, default="Unknown")
-    album_art = models.URLField(blank=True, default="")
-    is_playing = models.BooleanField(default=False)
-    progress = models.IntegerField(default=0) # Seconds
-    duration = models.IntegerField(default=180) # Seconds
-    
+        return state.load(cls)
+
+class MediaState(schema_fields(MEDIA)):
     def save(self, *args, **kwargs):
         self.pk = 1 # Singleton
+        previous = state.baseline(type(self))  # Before the row changes, so history only logs real changes
         super(MediaState, self).save(*args, **kwargs)
+        state.saved(self, previous)  # Write-through to the cache and push to /ws/state/
 
     @classmethod
     def load(cls):
-        obj, created = cls.objects.get_or_create(pk=1)
-        return obj
+        return state.load(cls)
+
+class StateChangeQuerySet(models.QuerySet):
+    def for_field(self, model, field):
+        return self.filter(model=model, field=field)
+
+    def downsample(self, bucket_seconds):
+        """One row per time bucket: bucket start (epoch seconds), avg/min/max of the numeric value, count."""
+        bucket = EpochBucket('changed_at', seconds=bucket_seconds)
+        return (self.annotate(bucket=bucket).values('bucket')
+                .annotate(avg=models.Avg('numeric_value'), min=models.Min('numeric_value'),
+                          max=models.Max('numeric_value'), count=models.Count('id'))
+                .order_by('bucket'))
+
+class EpochBucket(models.Func):
+    """Start of the fixed-size time bucket a timestamp falls in, as epoch seconds."""
+    output_field = models.IntegerField()
+
+    def __init__(self, expression, seconds, **extra):
+        super().__init__(expression, **extra)
+        self.seconds = int(seconds)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        template = 'FLOOR(EXTRACT(EPOCH FROM %%(expressions)s) / %d) * %d' % (self.seconds, self.seconds)
+        return super().as_sql(compiler, connection, template=template, **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # julianday() instead of strftime('%s') keeps '%' out of the SQL
+        template = ('(CAST((julianday(%%(expressions)s) - 2440587.5) * 86400 AS INTEGER) / %d) * %d'
+                    % (self.seconds, self.seconds))
+        return super().as_sql(compiler, connection, template=template, **extra_context)
+
+class StateChange(models.Model):
+    # One row per changed field, written in batches by core.history.HistoryWriter
+    model = models.CharField(max_length=16)  # "vehicle" / "media"
+    field = models.CharField(max_length=32)
+    value = models.JSONField()
+    numeric_value = models.FloatField(null=True, blank=True)  # For aggregation, null for text fields
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    objects = StateChangeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'field', 'changed_at'], name='statechange_series_idx'),
+            models.Index(fields=['changed_at'], name='statechange_time_idx'),
+        ]
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+
+from asgiref.sync import sync_to_async
+
+from . import state
+
+
+class StateHub:
+    """In-process pub/sub for state pushes.
+
+    publish() is called from sync views (worker threads), so messages are
+    handed to each subscriber's event loop thread-safely. Every subscriber
+    has a bounded queue; a slow one loses its oldest messages, which is fine
+    because every message carries the full model state.
+    """
+
+    def __init__(self, max_queue=32):
+        self.max_queue = max_queue
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        queue = asyncio.Queue(self.max_queue)
+        with self._lock:
+            self._subscribers.add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers = {sub for sub in self._subscribers if sub[1] is not queue}
+
+    def publish(self, text):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, text)
+            except RuntimeError:
+                self.unsubscribe(queue)  # Loop already closed
+
+    @staticmethod
+    def _put(queue, text):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(text)
+
+
+hub = StateHub()
+
+
+async def state_socket(scope, receive, send):
+    """ASGI app for /ws/state/: INITIAL_STATE, then VEHICLE_UPDATE / MEDIA_UPDATE / STATE_UPDATE (batch) pushes."""
+    if (await receive())["type"] != "websocket.connect":
+        return
+    await send({"type": "websocket.accept"})
+    queue = hub.subscribe()  # Before reading the state, so no change falls in between
+    try:
+        await send({"type": "websocket.send", "text": await sync_to_async(state.initial_message)()})
+        incoming = asyncio.ensure_future(receive())
+        while True:
+            outgoing = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({incoming, outgoing}, return_when=asyncio.FIRST_COMPLETED)
+            if outgoing in done:
+                await send({"type": "websocket.send", "text": outgoing.result()})
+            else:
+                outgoing.cancel()
+            if incoming in done:
+                if incoming.result()["type"] == "websocket.disconnect":
+                    break
+                incoming = asyncio.ensure_future(receive())  # Client messages are ignored
+    finally:
+        hub.unsubscribe(queue)
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import threading
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.http import parse_etags
+from state_schema import MODELS as STATE_MODELS
+
+# Cached singleton layer for VehicleState / MediaState.
+#
+# The singleton rows and their serialized JSON live in the Django cache and
+# are refreshed by the models' save() once the transaction commits
+# (write-through), so reads never touch the database while nothing has
+# changed and never see uncommitted rows. Encoding and diffing use the shared
+# schema's compiled functions (shared/state_schema.py), not DRF serializers.
+# With more than one server process configure a shared cache backend in
+# settings.CACHES, otherwise each process only sees its own writes.
+
+MODEL_NAMES = {"vehiclestate": "vehicle", "mediastate": "media"}
+
+_batches = threading.local()  # .pending: {model_cls: changes} inside batch()
+
+
+def _key(model_cls, kind):
+    return f"core:{model_cls._meta.model_name}:{kind}"
+
+
+def _schema_for(model_cls):
+    return STATE_MODELS[MODEL_NAMES[model_cls._meta.model_name]]
+
+
+def load(model_cls):
+    obj = cache.get(_key(model_cls, "obj"))
+    if obj is None:
+        obj, created = model_cls.objects.get_or_create(pk=1)
+        cache.set(_key(model_cls, "obj"), obj, None)
+    return obj
+
+
+def encoded(model_cls):
+    """(json bytes, etag) for the singleton, serialized once per change."""
+    entry = cache.get(_key(model_cls, "json"))
+    if entry is None:
+        data = as_data(load(model_cls))
+        body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        entry = (body, '"%s"' % hashlib.md5(body).hexdigest())
+        cache.set(_key(model_cls, "json"), entry, None)
+    return entry
+
+
+def as_data(instance):
+    return {"id": instance.pk, **_schema_for(type(instance)).from_object(instance)}
+
+
+def cached_response(request, model_cls):
+    body, etag = encoded(model_cls)
+    if _etag_matches(request.headers.get("If-None-Match", ""), etag):
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    return response
+
+
+def _etag_matches(if_none_match, etag):
+    """Weak comparison against an If-None-Match list ("*", W/ prefixes allowed)."""
+    tags = parse_etags(if_none_match)
+    return "*" in tags or etag in (tag.removeprefix("W/") for tag in tags)
+
+
+def _changes(previous, instance):
+    schema = _schema_for(type(instance))
+    current = schema.from_object(instance)
+    return current if previous is None else schema.diff(schema.from_object(previous), current)
+
+
+def _write_through(model_cls, instance):
+    cache.set(_key(model_cls, "obj"), instance, None)
+    cache.delete(_key(model_cls, "json"))
+
+
+def baseline(model_cls):
+    """The singleton as it is before a save, for diffing: cached, else read (not cached) from the DB."""
+    previous = cache.get(_key(model_cls, "obj"))
+    if previous is None:
+        previous = model_cls.objects.filter(pk=1).first()
+    return previous
+
+
+def saved(instance, previous):
+    """After a singleton save: once committed, refresh the cache, push and log history.
+
+    previous is baseline() taken before the save; None (no row yet) logs every field.
+    """
+    model_cls = type(instance)
+    name = MODEL_NAMES[model_cls._meta.model_name]
+    changes = _changes(previous, instance)
+
+    pending = getattr(_batches, "pending", None)
+    if pending is not None:
+        entry = pending.setdefault(model_cls, [instance, {}])  # Written and pushed once by batch()
+        entry[0] = instance
+        entry[1].update(changes)
+        return
+
+    def committed():
+        from .history import writer
+        from .push import hub
+        _write_through(model_cls, instance)
+        body, _ = encoded(model_cls)
+        hub.publish('{"type":"%s_UPDATE","data":%s}' % (name.upper(), body.decode("utf-8")))
+        writer.record(name, changes)
+    transaction.on_commit(committed)
+
+
+@contextmanager
+def batch():
+    """Group singleton saves into one transaction and one push.
+
+    Once the transaction commits, every model saved in the block is written
+    to the cache and goes out in a single STATE_UPDATE. If the block raises,
+    the transaction rolls back and the cache is never touched.
+    """
+    pending = _batches.pending = {}
+    try:
+        with transaction.atomic():
+            yield
+            if pending:
+                transaction.on_commit(lambda: _publish_batch(pending))
+    finally:
+        _batches.pending = None
+
+
+def _publish_batch(pending):
+    from .history import writer
+    from .push import hub
+    parts = []
+    for model_cls, (instance, changes) in pending.items():
+        name = MODEL_NAMES[model_cls._meta.model_name]
+        _write_through(model_cls, instance)
+        body, _ = encoded(model_cls)
+        parts.append('"%s":%s' % (name, body.decode("utf-8")))
+        writer.record(name, changes)
+    hub.publish('{"type":"STATE_UPDATE","data":{%s}}' % ",".join(parts))
+
+
+def initial_message():
+    from .models import VehicleState, MediaState
+    vehicle, _ = encoded(VehicleState)
+    media, _ = encoded(MediaState)
+    return '{"type":"INITIAL_STATE","data":{"vehicle":%s,"media":%s}}' % (vehicle.decode("utf-8"), media.decode("utf-8"))
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import VehicleStateViewSet, MediaStateViewSet
+from .views import VehicleStateViewSet, MediaStateViewSet, StateBatchView, StateHistoryView
 
 router = DefaultRouter()
 router.register(r'vehicle-state', VehicleStateViewSet, basename='vehicle-state')
@@ -8,4 +8,6 @@ router.register(r'media-state', MediaStateViewSet, basename='media-state')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('batch/', StateBatchView.as_view(), name='state-batch'),
+    path('history/', StateHistoryView.as_view(), name='state-history'),
 ]
@@ -1,7 +1,11 @@
-from rest_framework import viewsets
+from django.utils.dateparse import parse_datetime
+from rest_framework import status, viewsets
 from rest_framework.response import Response
-from .models import VehicleState, MediaState
+from rest_framework.views import APIView
+from .models import VehicleState, MediaState, StateChange
 from .serializers import VehicleStateSerializer, MediaStateSerializer
+from state_schema import MODELS as STATE_MODELS
+from . import state
 
 class VehicleStateViewSet(viewsets.ModelViewSet):
     queryset = VehicleState.objects.all()
@@ -11,8 +15,8 @@ class VehicleStateViewSet(viewsets.ModelViewSet):
         return VehicleState.load()
 
     def list(self, request):
-        serializer = self.get_serializer(self.get_object())
-        return Response(serializer.data)
+        # Pre-serialized body from the cache, no DB query or serializer while unchanged
+        return state.cached_response(request, self.queryset.model)
 
 class MediaStateViewSet(viewsets.ModelViewSet):
     queryset = MediaState.objects.all()
@@ -22,5 +26,76 @@ class MediaStateViewSet(viewsets.ModelViewSet):
         return MediaState.load()
     
     def list(self, request):
-        serializer = self.get_serializer(self.get_object())
-        return Response(serializer.data)
+        # Pre-serialized body from the cache, no DB query or serializer while unchanged
+        return state.cached_response(request, self.queryset.model)
+
+class BatchError(Exception):
+    def __init__(self, index, errors):
+        super().__init__(index, errors)
+        self.index = index
+        self.errors = errors
+
+class StateBatchView(APIView):
+    """POST /api/batch/ {"mutations": [{"model": "vehicle", "fields": {...}, "replace": false}, ...]}
+
+    Applied in order and all or nothing: one save per changed model, one
+    STATE_UPDATE push. Returns the resulting state of every model mentioned.
+    """
+    MODELS = {'vehicle': (VehicleState, VehicleStateSerializer), 'media': (MediaState, MediaStateSerializer)}
+
+    def post(self, request):
+        mutations = request.data.get('mutations') if isinstance(request.data, dict) else None
+        if not isinstance(mutations, list) or not mutations:
+            return Response({'detail': 'mutations must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        instances, originals = {}, {}
+        try:
+            with state.batch():
+                for i, mutation in enumerate(mutations):
+                    model = mutation.get('model') if isinstance(mutation, dict) else None
+                    if model not in self.MODELS:
+                        raise BatchError(i, {'model': ['expected one of %s' % list(self.MODELS)]})
+                    model_cls, serializer_cls = self.MODELS[model]
+                    schema = STATE_MODELS[model]
+                    if model not in instances:
+                        instances[model] = model_cls.load()
+                        originals[model] = schema.from_object(instances[model])
+                    fields = mutation.get('fields') or {}
+                    if mutation.get('replace'):
+                        fields = {**schema.defaults(), **fields}
+                    serializer = serializer_cls(instances[model], data=fields, partial=True)
+                    if not serializer.is_valid():
+                        raise BatchError(i, serializer.errors)
+                    for name, value in serializer.validated_data.items():
+                        setattr(instances[model], name, value)
+                for model, instance in instances.items():
+                    if STATE_MODELS[model].diff(originals[model], STATE_MODELS[model].from_object(instance)):
+                        instance.save()
+        except BatchError as e:
+            return Response({'detail': 'mutation %d is invalid' % e.index, 'mutation': e.index, 'errors': e.errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response({model: state.as_data(instance) for model, instance in instances.items()})
+
+class StateHistoryView(APIView):
+    """GET /api/history/?model=vehicle&field=volume[&since=<ISO time>][&bucket=<seconds>][&limit=500]
+
+    Raw changes, newest last, or with bucket one avg/min/max/count row per time bucket.
+    """
+    def get(self, request):
+        params = request.query_params
+        changes = StateChange.objects.for_field(params.get('model', 'vehicle'), params.get('field', 'volume'))
+        try:
+            if params.get('since'):
+                since = parse_datetime(params['since'])
+                if since is None:
+                    raise ValueError('since must be an ISO 8601 timestamp')
+                changes = changes.filter(changed_at__gte=since)
+            if params.get('bucket'):
+                bucket = int(params['bucket'])
+                if bucket <= 0:
+                    raise ValueError('bucket must be a positive number of seconds')
+                return Response(list(changes.downsample(bucket)))
+            limit = min(int(params.get('limit', 500)), 5000)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        rows = changes.order_by('-changed_at').values('value', 'changed_at')[:limit]
+        return Response(list(reversed(rows)))
@@ -0,0 +1,249 @@
+import asyncio
+import json
+import os
+import signal
+from typing import Optional
+from models import SystemState, SchemaError, STATE_MODELS, Mutation
+
+# Scale-out mode: one broker process owns SystemState (and its journal), every
+# uvicorn worker keeps a replica and talks to the broker over a Unix socket.
+#
+# Wire format: one compact JSON object per line.
+#   worker -> broker  {"id": 1, "op": "apply", "model": "vehicle", "fields": {...}, "replace": false}
+#                     {"id": 2, "op": "batch", "mutations": [["vehicle", {...}, false], ["media", {...}, false]]}
+#                     {"id": 3, "op": "snapshot"}
+#   broker -> worker  {"id": 1, "ok": true, "version": 7}   (reply, after the event below)
+#                     {"op": "change", "v": 7, "c": [{"m": "vehicle", "p": 5, "d": [mask, ...], "t": {...}}]}   (to every worker)
+#
+# A change event carries every model one version changed (several for a batch).
+#
+# Change deltas use the shared schema's compact form (state_schema.pack_delta);
+# the broker validated them, so workers merge them into their replica as is.
+#
+# The broker handles requests one at a time on its event loop, so mutations
+# are serialized, and every worker sees the changes in the same order.
+
+DEFAULT_SOCKET = "/tmp/aeroui-broker.sock"
+
+
+def _line(message: dict) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class StateBroker:
+    def __init__(self, state: SystemState, socket_path: str = DEFAULT_SOCKET):
+        self.state = state
+        self.socket_path = socket_path
+        self.workers: set[asyncio.StreamWriter] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)  # Left over from a previous run
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        print(f"State broker listening on {self.socket_path}")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        for writer in list(self.workers):
+            writer.close()
+        await self.state.flush()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.workers.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = json.loads(line)
+                writer.write(_line(self._dispatch(request)))
+                await writer.drain()
+        except (ConnectionError, ValueError) as e:
+            print(f"Broker: dropping worker connection: {e!r}")
+        finally:
+            self.workers.discard(writer)
+            writer.close()
+
+    def _dispatch(self, request: dict) -> dict:
+        op = request.get("op")
+        reply = {"id": request.get("id"), "ok": True}
+        if op == "snapshot":
+            reply["state"] = self.state.snapshot()
+        elif op in ("apply", "batch"):
+            if op == "apply":
+                mutations = [Mutation(request["model"], request.get("fields") or {}, request.get("replace", False))]
+            else:
+                mutations = [Mutation(*mutation) for mutation in request.get("mutations") or []]
+            try:
+                changes = self.state.apply_batch(mutations)
+            except SchemaError as e:
+                return {"id": request.get("id"), "ok": False, "error": str(e)}
+            if changes:
+                self._publish({"op": "change", "v": changes[0].version, "c": [
+                    {"m": change.model, "p": change.prev_version,
+                     "d": STATE_MODELS[change.model].pack_delta(change.delta), "t": change.topics}
+                    for change in changes]})
+            reply["version"] = changes[0].version if changes else None
+        else:
+            return {"id": request.get("id"), "ok": False, "error": f"unknown op {op!r}"}
+        return reply
+
+    def _publish(self, event: dict):
+        data = _line(event)
+        for writer in list(self.workers):
+            if writer.is_closing():
+                self.workers.discard(writer)
+                continue
+            writer.write(data)
+
+
+class BrokerError(Exception):
+    pass
+
+
+class BrokerClient:
+    """Worker side: forwards mutations to the broker and keeps a local replica in sync."""
+
+    REQUEST_TIMEOUT = 5.0  # Seconds a mutation may wait for the broker (including a reconnect)
+
+    def __init__(self, state: SystemState, socket_path: str = DEFAULT_SOCKET, on_change=None, on_resync=None):
+        self.state = state  # Replica, SystemState(journal_dir=None)
+        self.socket_path = socket_path
+        self.on_change = on_change  # async callback(StateChange) for every change, from any worker
+        self.on_resync = on_resync  # async callback() after the replica was re-seeded
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._replies: dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        self._task: Optional[asyncio.Task] = None
+        self._connected = asyncio.Event()
+        self._closing = False
+
+    async def start(self, timeout: float = 10.0):
+        self._task = asyncio.create_task(self._run())
+        await asyncio.wait_for(self._connected.wait(), timeout)
+
+    async def close(self):
+        self._closing = True
+        if self._task:
+            self._task.cancel()
+        if self._writer:
+            self._writer.close()
+
+    async def apply(self, model: str, fields: dict, replace: bool = False) -> Optional[int]:
+        """Have the broker apply an update; returns the new version (None for a no-op)."""
+        reply = await self._request({"op": "apply", "model": model, "fields": fields, "replace": replace})
+        return reply.get("version")
+
+    async def apply_batch(self, mutations: list) -> Optional[int]:
+        """Have the broker apply Mutations atomically; returns the batch's version (None for a no-op)."""
+        reply = await self._request({"op": "batch", "mutations": [list(mutation) for mutation in mutations]})
+        return reply.get("version")
+
+    async def _request(self, request: dict) -> dict:
+        try:
+            reply = await asyncio.wait_for(self._exchange(request), self.REQUEST_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise BrokerError("state broker unavailable") from None
+        if not reply.get("ok"):
+            raise BrokerError(reply.get("error"))
+        return reply
+
+    async def _exchange(self, request: dict) -> dict:
+        await self._connected.wait()
+        self._next_id += 1
+        request_id = request["id"] = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._replies[request_id] = future
+        try:
+            self._writer.write(_line(request))
+            await self._writer.drain()
+            return await future
+        except ConnectionError as e:
+            raise BrokerError(f"broker connection lost: {e!r}") from None
+        finally:
+            self._replies.pop(request_id, None)  # A late reply after a timeout is dropped
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                self._reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+            except OSError:
+                await asyncio.sleep(0.2)  # Broker not up yet
+                continue
+            try:
+                await self._sync()
+                await self._read_loop()
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                print(f"Lost connection to state broker: {e!r}")
+            finally:
+                self._connected.clear()
+                for future in self._replies.values():
+                    if not future.done():
+                        future.set_exception(BrokerError("broker connection lost"))
+                self._replies.clear()
+                self._writer.close()
+
+    async def _sync(self):
+        # Seed (or re-seed after a reconnect) the replica from a full snapshot
+        self._writer.write(_line({"id": 0, "op": "snapshot"}))
+        await self._writer.drain()
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                raise ConnectionError("broker closed the connection")
+            reply = json.loads(line)
+            if reply.get("id") == 0:
+                break  # Changes published before the reply are already in the snapshot
+        self.state.restore(reply["state"])
+        self._connected.set()
+        if self.on_resync:
+            await self.on_resync()
+
+    async def _read_loop(self):
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                raise ConnectionError("broker closed the connection")
+            message = json.loads(line)
+            if message.get("op") == "change":
+                if message["v"] <= self.state.version:
+                    continue  # Already part of the snapshot we were seeded with
+                changes = [self.state.apply_change(item["m"], message["v"], item["p"],
+                                                   STATE_MODELS[item["m"]].unpack_delta(item["d"]), item["t"],
+                                                   batch=len(message["c"]))
+                           for item in message["c"]]
+                if self.on_change:
+                    for change in changes:
+                        await self.on_change(change)
+            else:
+                future = self._replies.pop(message.get("id"), None)
+                if future and not future.done():
+                    future.set_result(message)
+
+
+def run_broker(socket_path: str = DEFAULT_SOCKET):
+    """Entry point for the broker process."""
+    async def main():
+        broker = StateBroker(SystemState.get_instance(), socket_path)
+        await broker.start()
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await stop.wait()
+        await broker.stop()
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="AeroUI state broker for multi-worker deployments")
+    parser.add_argument("--socket", default=os.environ.get("AEROUI_BROKER_SOCKET", DEFAULT_SOCKET))
+    run_broker(parser.parse_args().socket)
@@ -0,0 +1,229 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Union
+from fastapi import WebSocket, WebSocketDisconnect
+import wire
+
+
+class OutboundFrame:
+    """A message that is encoded once per encoding and shared by every client it goes to."""
+    __slots__ = ("message", "key", "pinned", "_encoded")
+
+    def __init__(self, message: Optional[dict], key: Optional[str] = None, encoded: Optional[dict] = None,
+                 pinned: bool = False):
+        self.message = message
+        self.key = key  # Frames with the same key coalesce in a client's queue (latest wins)
+        self.pinned = pinned  # Never dropped for a slow consumer (INITIAL_STATE, RESUMED)
+        self._encoded = encoded or {}  # encoding -> payload
+
+    def coalesce(self, older: "OutboundFrame") -> "OutboundFrame":
+        """Combine with a queued frame of the same key that was never sent."""
+        if "prev_version" not in self.message or "prev_version" not in older.message:
+            return self  # Full state: latest wins
+        # Deltas: merge fields and keep the older base so version gap checks still line up
+        merged = dict(self.message)
+        merged["prev_version"] = older.message["prev_version"]
+        merged["data"] = {**older.message["data"], **self.message["data"]}
+        return OutboundFrame(merged, self.key)
+
+    def encoded(self, encoding: str) -> Union[str, bytes]:
+        payload = self._encoded.get(encoding)
+        if payload is None:
+            payload = self._encoded[encoding] = wire.encode(self.message, encoding)
+        return payload
+
+
+class ClientConnection:
+    """One WebSocket with its own bounded send queue and writer task."""
+
+    def __init__(self, websocket: WebSocket, max_queue: int = 32, send_timeout: float = 2.0,
+                 encoding: str = wire.JSON):
+        self.websocket = websocket
+        self.encoding = encoding
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.dropped = 0
+        self.coalesced = 0
+        self.closed = False
+        self.topics: set[str] = set()  # Maintained by ConnectionManager.subscribe/unsubscribe
+        self.min_intervals: dict[str, float] = {}  # key -> seconds between frames (client rate limit)
+        self._last_sent: dict[str, float] = {}
+        self._held: dict[str, OutboundFrame] = {}  # Rate-limited frames waiting for their slot
+        self._queue: OrderedDict = OrderedDict()
+        self._seq = 0
+        self._wakeup = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def start(self, on_dead):
+        self._writer = asyncio.create_task(self._run(on_dead))
+
+    def close(self):
+        self.closed = True
+        self._queue.clear()
+        self._held.clear()
+        if self._writer and not self._writer.done():
+            self._writer.cancel()
+
+    async def receive(self) -> dict:
+        """Next message from the client, decoded with the connection's encoding."""
+        event = await self.websocket.receive()
+        if event["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(event.get("code", 1000))
+        if event.get("bytes") is not None:
+            return wire.decode(event["bytes"], self.encoding)
+        return wire.decode(event["text"], self.encoding)
+
+    def send(self, message: dict, key: Optional[str] = None, pinned: bool = False):
+        self.enqueue(OutboundFrame(message, key, pinned=pinned))
+
+    def send_encoded(self, payload: Union[str, bytes], pinned: bool = False):
+        """Queue a payload that is already encoded with this client's encoding."""
+        self.enqueue(OutboundFrame(None, encoded={self.encoding: payload}, pinned=pinned))
+
+    def set_rate(self, key: str, max_rate: Optional[float]):
+        """Limit frames with this key to max_rate per second (None or 0 removes the limit)."""
+        if max_rate:
+            self.min_intervals[key] = 1.0 / max_rate
+        else:
+            self.min_intervals.pop(key, None)
+            held = self._held.pop(key, None)
+            if held:
+                self._put(held)
+
+    def discard(self, key: str):
+        """Forget queued, held and rate-limit state for a key (topic unsubscribed)."""
+        self._queue.pop(key, None)
+        self._held.pop(key, None)
+        self._last_sent.pop(key, None)
+        self.min_intervals.pop(key, None)
+
+    def enqueue(self, frame: OutboundFrame):
+        if self.closed:
+            return
+        key = frame.key
+        interval = self.min_intervals.get(key)
+        if interval:
+            # Rate limited: hold the frame (coalescing into any already held) until the slot opens
+            now = time.monotonic()
+            due = self._last_sent.get(key, 0.0) + interval
+            if key in self._held:
+                self._held[key] = frame.coalesce(self._held[key])
+                self.coalesced += 1
+                return
+            if now < due:
+                self._held[key] = frame
+                asyncio.get_running_loop().call_later(due - now, self._release, key)
+                return
+            self._last_sent[key] = now
+        self._put(frame)
+
+    def _release(self, key: str):
+        frame = self._held.pop(key, None)
+        if frame is not None and not self.closed:
+            self._last_sent[key] = time.monotonic()
+            self._put(frame)
+
+    def _put(self, frame: OutboundFrame):
+        key = frame.key
+        if key is not None and key in self._queue:
+            # Client hasn't consumed the previous state yet: fold into it, and move it to
+            # the back so it never overtakes a full state queued after the older frame
+            self._queue[key] = frame.coalesce(self._queue[key])
+            self._queue.move_to_end(key)
+            self.coalesced += 1
+            return
+        if len(self._queue) >= self.max_queue:
+            # Slow consumer: drop the oldest frame instead of growing without bound. Pinned
+            # frames stay (a lost delta shows up as a version gap, a lost full state doesn't)
+            oldest = next((queued for queued, frame_ in self._queue.items() if not frame_.pinned), None)
+            if oldest is not None:
+                del self._queue[oldest]
+                self.dropped += 1
+        if key is None:
+            self._seq += 1
+            key = ("seq", self._seq)
+        self._queue[key] = frame
+        self._wakeup.set()
+
+    async def _run(self, on_dead):
+        try:
+            while True:
+                await self._wakeup.wait()
+                while self._queue:
+                    _, frame = self._queue.popitem(last=False)
+                    payload = frame.encoded(self.encoding)
+                    if isinstance(payload, bytes):
+                        send = self.websocket.send_bytes(payload)
+                    else:
+                        send = self.websocket.send_text(payload)
+                    await asyncio.wait_for(send, self.send_timeout)
+                self._wakeup.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Send failed or timed out: the socket is dead or hopelessly slow
+            print(f"Evicting WebSocket client: {e!r}")
+            self.closed = True
+            self._queue.clear()
+            on_dead(self)
+            try:
+                await self.websocket.close(code=1011)
+            except Exception:
+                pass
+
+
+# WebSocket Connection Manager
+class ConnectionManager:
+    def __init__(self, max_queue: int = 32, send_timeout: float = 2.0):
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.active_connections: dict[WebSocket, ClientConnection] = {}
+        self.subscribers: dict[str, set[ClientConnection]] = {}  # topic -> clients
+
+    async def connect(self, websocket: WebSocket) -> ClientConnection:
+        encoding, subprotocol = wire.negotiate(websocket)
+        await websocket.accept(subprotocol=subprotocol)
+        client = ClientConnection(websocket, self.max_queue, self.send_timeout, encoding)
+        self.active_connections[websocket] = client
+        client.start(self._evict)
+        return client
+
+    def disconnect(self, websocket: WebSocket):
+        client = self.active_connections.pop(websocket, None)
+        if client:
+            self.unsubscribe(client, list(client.topics))
+            client.close()
+
+    def _evict(self, client: ClientConnection):
+        if self.active_connections.get(client.websocket) is client:
+            del self.active_connections[client.websocket]
+        self.unsubscribe(client, list(client.topics))
+
+    def subscribe(self, client: ClientConnection, topics: Iterable[str]):
+        for topic in topics:
+            self.subscribers.setdefault(topic, set()).add(client)
+            client.topics.add(topic)
+
+    def unsubscribe(self, client: ClientConnection, topics: Iterable[str]):
+        for topic in topics:
+            self.subscribers.get(topic, set()).discard(client)
+            client.topics.discard(topic)
+            client.discard(topic)
+
+    async def broadcast(self, message: dict, key: Optional[str] = None, topic: Optional[str] = None):
+        # Only enqueues, so one slow client never stalls the others or the caller.
+        # The frame is serialized lazily, once per encoding in use. With a topic
+        # only its subscribers are touched, and the topic is the coalescing key.
+        if topic is not None:
+            clients = self.subscribers.get(topic, ())
+            key = topic
+        else:
+            clients = self.active_connections.values()
+        frame = OutboundFrame(message, key)
+        for client in list(clients):
+            client.enqueue(frame)
@@ -0,0 +1,205 @@
+import json
+import os
+from collections import deque
+from typing import Optional
+from persistence import encode_compact, write_atomic
+
+
+class StateJournal:
+    """Append-only, segmented log of state changes with periodic snapshots.
+
+    Layout of the journal directory:
+        snapshot-<version>.json   full state at <version> (compact JSON)
+        journal-<version>.log     one change per line, starting at <version>
+
+    A batch that changes several models logs one line per model, all with
+    the same version and "b" set to the number of lines; recovery drops a
+    batch whose lines did not all make it to disk.
+
+    A new segment is started after every snapshot (and whenever a segment
+    gets too long), so recovery only reads the segments that follow the
+    latest snapshot. The newest changes are also kept in memory so
+    reconnecting clients can be sent just what they missed. With no
+    directory only that in-memory tail is kept.
+    """
+
+    def __init__(self, directory: Optional[str], snapshot_every: int = 500, segment_events: int = 1000,
+                 tail_size: int = 256, keep_snapshots: int = 2, fsync: bool = True):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.segment_events = segment_events
+        self.keep_snapshots = keep_snapshots
+        self.fsync = fsync
+        self.tail = deque(maxlen=tail_size)  # Recent events, oldest first
+        self._pending = []  # Events recorded but not handed to the writer yet
+        self._since_snapshot = 0
+        self._snapshot_due = False
+        self._segment: Optional[str] = None
+        self._segment_events = 0
+        self._base = 0  # Version the journal was recovered at
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    # --- Event loop side ---
+
+    def record(self, version: int, prev_version: int, model: str, delta: dict, topics: dict, batch: int = 1):
+        event = {"v": version, "p": prev_version, "m": model, "d": delta, "t": topics}
+        if batch > 1:
+            event["b"] = batch
+        self.tail.append(event)
+        if self.directory is not None:
+            self._pending.append(event)
+            self._since_snapshot += 1
+
+    def reset(self, version: int):
+        """Forget the tail, e.g. after a replica was re-seeded with a snapshot."""
+        self.tail.clear()
+        self._pending = []
+        self._base = version
+
+    def request_snapshot(self):
+        self._snapshot_due = True
+
+    def since(self, version: int) -> Optional[list]:
+        """Events newer than version, or None if the in-memory tail doesn't cover it."""
+        latest = self.tail[-1]["v"] if self.tail else self._base
+        floor = self.tail[0]["v"] - 1 if self.tail else self._base
+        if self.tail and self.tail[0].get("b", 1) > 1:
+            # The deque may have evicted the first lines of the oldest batch
+            first = self.tail[0]["v"]
+            if sum(1 for event in self.tail if event["v"] == first) < self.tail[0]["b"]:
+                floor = first
+        if version < floor or version > latest:
+            return None
+        return [event for event in self.tail if event["v"] > version]
+
+    def take_batch(self, snapshot) -> tuple[list, Optional[dict]]:
+        """Hand buffered events (and a snapshot, when one is due) to the writer."""
+        events, self._pending = self._pending, []
+        state = None
+        if self._snapshot_due or self._since_snapshot >= self.snapshot_every:
+            state = snapshot()
+            self._snapshot_due = False
+            self._since_snapshot = 0
+        return events, state
+
+    # --- Writer thread side ---
+
+    def write(self, batch: tuple[list, Optional[dict]]):
+        if self.directory is None:
+            return
+        events, state = batch
+        try:
+            if events:
+                self._append(events)
+        except Exception:
+            # The on-disk log now has a hole, make sure the next batch covers it
+            self._snapshot_due = True
+            raise
+        if state is not None:
+            write_atomic(self._path("snapshot", state["version"], "json"), encode_compact(state), self.fsync)
+            self._segment = None  # Next event starts a fresh segment
+            self._prune(state["version"])
+
+    def _append(self, events: list):
+        if self._segment is None or self._segment_events >= self.segment_events:
+            self._segment = self._path("journal", events[0]["v"], "log")
+            self._segment_events = 0
+        lines = b"".join(encode_compact(event) + b"\n" for event in events)
+        with open(self._segment, "ab") as f:
+            f.write(lines)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self._segment_events += len(events)
+
+    def _prune(self, latest: int):
+        snapshots = self._versions("snapshot")
+        kept = snapshots[-self.keep_snapshots:] if self.keep_snapshots else [latest]
+        oldest_kept = kept[0] if kept else latest
+        for version in snapshots:
+            if version < oldest_kept:
+                self._remove(self._path("snapshot", version, "json"))
+        for version in self._versions("journal"):
+            # Segments never straddle a snapshot, so these are fully covered by it
+            if version <= oldest_kept:
+                self._remove(self._path("journal", version, "log"))
+
+    # --- Recovery ---
+
+    def recover(self) -> tuple[Optional[dict], list]:
+        """Latest readable snapshot plus every logged event after it."""
+        if self.directory is None:
+            return None, []
+        state = None
+        for version in reversed(self._versions("snapshot")):
+            try:
+                with open(self._path("snapshot", version, "json"), "rb") as f:
+                    state = json.load(f)
+                break
+            except (OSError, ValueError) as e:
+                print(f"Skipping unreadable snapshot {version}: {e}")
+
+        base = state["version"] if state else 0
+        events = []
+        for version in self._versions("journal"):
+            if version <= base:
+                continue
+            path = self._path("journal", version, "log")
+            with open(path, "rb") as f:
+                good = 0  # Bytes of complete lines so far
+                for line in f:
+                    try:
+                        event = json.loads(line) if line.endswith(b"\n") else None
+                    except ValueError:
+                        event = None
+                    if event is None:
+                        # Torn write at the end of a segment: cut it off, or the
+                        # next run would append its events after the partial line
+                        self._truncate(path, good)
+                        self._snapshot_due = True  # Covers it even if the truncate failed
+                        break
+                    good += len(line)
+                    if event["v"] > base:
+                        events.append(event)
+
+        # A torn write can cut a multi-model batch short: all of it or nothing
+        if events and events[-1].get("b", 1) > 1:
+            last = [event for event in events if event["v"] == events[-1]["v"]]
+            if len(last) < events[-1]["b"]:
+                events = events[:-len(last)]
+                self._snapshot_due = True  # Cover the leftover lines before the version is reused
+
+        self.tail.extend(events)
+        self._base = events[-1]["v"] if events else base
+        self._since_snapshot = len(events)
+        return state, events
+
+    # --- Helpers ---
+
+    def _path(self, kind: str, version: int, ext: str) -> str:
+        return os.path.join(self.directory, f"{kind}-{version:012d}.{ext}")
+
+    def _versions(self, kind: str) -> list[int]:
+        versions = []
+        for name in os.listdir(self.directory):
+            if name.startswith(kind + "-"):
+                try:
+                    versions.append(int(name[len(kind) + 1:].split(".")[0]))
+                except ValueError:
+                    pass
+        return sorted(versions)
+
+    @staticmethod
+    def _truncate(path: str, size: int):
+        try:
+            os.truncate(path, size)
+        except OSError as e:
+            print(f"Could not truncate torn journal segment {path}: {e}")
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
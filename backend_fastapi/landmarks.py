@@ -0,0 +1,245 @@
+import asyncio
+import time
+from typing import Optional
+import numpy as np
+
+# Server-side gesture classification for thin camera clients (/ws/landmarks).
+#
+# Clients run only the hand landmarker and stream 21 (x, y) landmarks per
+# frame, normalized and mirrored like GestureThread's camera image. Several
+# frames go in one message:
+#   text    {"type": "LANDMARKS", "frames": [[x0, y0, ..., x20, y20], ...], "dt": 0.033}
+#   binary  little-endian float32, 42 values per frame
+#   text    {"type": "CONTROL", "control": "volume" | "temp"}  (what rotation adjusts)
+#
+# Every tick the frames of all streams are classified together: per-frame
+# features in one vectorized pass over every frame received, then the
+# stateful part (pinch hysteresis, fist edges, rotation accumulation) one
+# round at a time across all streams.
+
+VALUES_PER_FRAME = 42
+TIPS = [8, 12, 16, 20]  # Index..pinky tips
+PIPS = [6, 10, 14, 18]
+
+MIN_HAND_SCALE = 0.08  # Wrist to middle knuckle, smaller hands are too far away
+PINCH_THRESHOLD = 0.05
+PINCH_DEBOUNCE = 0.5
+ROTATION_THRESHOLD = 540.0  # Accumulated turning angle in degrees (1.5 circles)
+ROTATION_DEBOUNCE = 0.5
+MIN_MOVEMENT = 0.01
+
+
+def parse_frames(payload) -> np.ndarray:
+    """(frames, 21, 2) float32 array from a binary payload or a list of flat frames."""
+    if isinstance(payload, (bytes, bytearray)):
+        values = np.frombuffer(payload, dtype="<f4")
+    else:
+        values = np.asarray(payload, dtype=np.float32).ravel()
+    if values.size % VALUES_PER_FRAME:
+        raise ValueError(f"expected {VALUES_PER_FRAME} values per frame, got {values.size} values")
+    return values.reshape(-1, 21, 2)
+
+
+def frame_features(points: np.ndarray) -> dict:
+    """Stateless per-frame features for an (F, 21, 2) batch."""
+    wrist, knuckle = points[:, 0], points[:, 9]
+    thumb_folded = points[:, 4, 0] >= points[:, 3, 0]
+    fingers_folded = (points[:, TIPS, 1] >= points[:, PIPS, 1]).all(axis=1)
+    return {
+        "valid": np.hypot(*(knuckle - wrist).T) >= MIN_HAND_SCALE,
+        "pinch": np.hypot(*(points[:, 4] - points[:, 8]).T),
+        "fist": thumb_folded & fingers_folded,
+        "center": (wrist + knuckle) / 2,
+    }
+
+
+def gesture_update(gesture: str, control: str, vehicle: dict, last_volume: int) -> dict:
+    """Vehicle fields a gesture changes, mirroring NetworkManager.handle_gesture."""
+    volume, temp = vehicle["volume"], vehicle["driver_temp"]
+    if gesture == "FIST":
+        return {"volume": 0} if volume > 0 else {}
+    step = 1 if gesture == "ROTATE_CW" else -1 if gesture == "ROTATE_CCW" else 0
+    if not step:
+        return {}
+    if control == "temp":
+        return {"driver_temp": max(16, min(30, temp + step))}
+    if step > 0 and volume == 0 and last_volume > 0:
+        return {"volume": last_volume}  # Auto-unmute
+    return {"volume": max(0, min(100, volume + 5 * step))}
+
+
+class LandmarkStream:
+    def __init__(self, slot: int, on_gesture, client=None):
+        self.slot = slot
+        self.on_gesture = on_gesture  # async callback(stream, gesture)
+        self.client = client  # Where recognized gestures are echoed back
+        self.control = "volume"
+        self.last_volume = 50  # Restored by auto-unmute
+        self.pending = []  # [(points, timestamps)]
+        self.frames = 0
+
+
+class LandmarkHub:
+    """Classifies the landmark frames of every connected stream in shared batches."""
+
+    def __init__(self, tick_hz: float = 30.0, max_frames_per_tick: int = 8, max_backlog: int = 120):
+        self.interval = 1.0 / tick_hz
+        self.max_frames = max_frames_per_tick
+        self.max_backlog = max_backlog  # Older frames are dropped once a stream is this far behind
+        self.streams: dict[int, LandmarkStream] = {}
+        self.ticks = 0
+        self.frames_classified = 0
+        self.last_tick_duration = 0.0
+        self._free: list[int] = []
+        self._capacity = 0
+        self._grow(16)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    # --- Streams ---
+
+    def _grow(self, capacity: int):
+        def extend(array, fill):
+            grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            grown[:len(array)] = array
+            return grown
+        empty = lambda shape, dtype: np.zeros((0,) + shape, dtype=dtype)
+        if self._capacity == 0:
+            self.pinching = empty((), bool)
+            self.last_pinch = empty((), np.float64)
+            self.was_fist = empty((), bool)
+            self.last_point = empty((2,), np.float32)
+            self.last_angle = empty((), np.float64)
+            self.rotation = empty((), np.float64)
+            self.last_rotation = empty((), np.float64)
+        self.pinching = extend(self.pinching, False)
+        self.last_pinch = extend(self.last_pinch, -np.inf)
+        self.was_fist = extend(self.was_fist, False)
+        self.last_point = extend(self.last_point, np.nan)
+        self.last_angle = extend(self.last_angle, np.nan)
+        self.rotation = extend(self.rotation, 0.0)
+        self.last_rotation = extend(self.last_rotation, -np.inf)
+        self._free.extend(range(capacity - 1, self._capacity - 1, -1))
+        self._capacity = capacity
+
+    def open(self, on_gesture, client=None) -> LandmarkStream:
+        if not self._free:
+            self._grow(self._capacity * 2)
+        slot = self._free.pop()
+        self.pinching[slot] = self.was_fist[slot] = False
+        self.last_pinch[slot] = self.last_rotation[slot] = -np.inf
+        self.last_point[slot] = self.last_angle[slot] = np.nan
+        self.rotation[slot] = 0.0
+        stream = LandmarkStream(slot, on_gesture, client)
+        self.streams[slot] = stream
+        return stream
+
+    def close(self, stream: LandmarkStream):
+        if self.streams.pop(stream.slot, None) is stream:
+            self._free.append(stream.slot)
+
+    def feed(self, stream: LandmarkStream, points: np.ndarray, dt: float = 1 / 30):
+        """Queue frames (oldest first); the newest one is stamped with the arrival time."""
+        if not len(points):
+            return
+        now = time.monotonic()
+        stamps = now - dt * np.arange(len(points) - 1, -1, -1)
+        stream.pending.append((points, stamps))
+        self._wakeup.set()
+
+    # --- Tick ---
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            started = time.perf_counter()
+            events = self.classify()
+            if any(stream.pending for stream in self.streams.values()):
+                self._wakeup.set()  # Backlog left over, go again next tick
+            self.last_tick_duration = time.perf_counter() - started
+            self.ticks += 1
+            for stream, gesture in events:
+                try:
+                    await stream.on_gesture(stream, gesture)
+                except Exception as e:
+                    print(f"Landmark gesture {gesture} failed: {e!r}")
+            await asyncio.sleep(max(0.0, self.interval - (time.perf_counter() - started)))
+
+    def classify(self) -> list:
+        """Run every pending frame through the classifier; returns [(stream, gesture)] in order."""
+        batch = []
+        for stream in self.streams.values():
+            if not stream.pending:
+                continue
+            points = np.concatenate([p for p, _ in stream.pending])[-self.max_backlog:]
+            stamps = np.concatenate([t for _, t in stream.pending])[-self.max_backlog:]
+            # Up to max_frames per stream per tick, the rest waits for the next one
+            stream.pending = [(points[self.max_frames:], stamps[self.max_frames:])] if len(points) > self.max_frames else []
+            points, stamps = points[:self.max_frames], stamps[:self.max_frames]
+            stream.frames += len(points)
+            batch.append((stream, points, stamps))
+        if not batch:
+            return []
+
+        # Stateless features for every frame of every stream in one pass
+        features = frame_features(np.concatenate([points for _, points, _ in batch]))
+        offsets = np.cumsum([0] + [len(points) for _, points, _ in batch])
+        lengths = np.diff(offsets)
+        slots = np.array([stream.slot for stream, _, _ in batch])
+        stamps = np.concatenate([s for _, _, s in batch])
+        self.frames_classified += int(offsets[-1])
+
+        events = []
+        for k in range(int(lengths.max())):
+            # Round k: the k-th frame of every stream that has one
+            active = lengths > k
+            index = offsets[:-1][active] + k
+            for slot, gesture in self._step(slots[active], {name: value[index] for name, value in features.items()},
+                                             stamps[index]):
+                events.append((self.streams[slot], gesture))
+        return events
+
+    def _step(self, slots: np.ndarray, f: dict, now: np.ndarray) -> list:
+        valid = f["valid"]
+        events = []
+
+        # Pinch with hysteresis and debounce
+        pinching = self.pinching[slots]
+        start = valid & ~pinching & (f["pinch"] < PINCH_THRESHOLD) & (now - self.last_pinch[slots] > PINCH_DEBOUNCE)
+        end = valid & pinching & (f["pinch"] > PINCH_THRESHOLD * 1.5)
+        self.pinching[slots] = (pinching | start) & ~end
+        self.last_pinch[slots] = np.where(start, now, self.last_pinch[slots])
+        events += [(slot, "PINCH_CLICK") for slot in slots[start]]
+        events += [(slot, "PINCH_END") for slot in slots[end]]
+
+        # Fist on the transition into it
+        fist = valid & f["fist"]
+        events += [(slot, "FIST") for slot in slots[fist & ~self.was_fist[slots]]]
+        self.was_fist[slots] = np.where(valid, f["fist"], self.was_fist[slots])
+
+        # Rotation: accumulate the turn between successive movement directions
+        center = f["center"]
+        last = self.last_point[slots]
+        delta = center - last
+        has_last = ~np.isnan(last[:, 0])
+        moved = valid & has_last & (np.abs(delta) > MIN_MOVEMENT).any(axis=1)
+        angle = np.degrees(np.arctan2(delta[:, 1], delta[:, 0]))
+        turn = (angle - self.last_angle[slots] + 180.0) % 360.0 - 180.0
+        turning = moved & ~np.isnan(turn)
+        rotation = self.rotation[slots] + np.where(turning, turn, 0.0)
+        fire = (np.abs(rotation) > ROTATION_THRESHOLD) & (now - self.last_rotation[slots] > ROTATION_DEBOUNCE)
+        events += [(slot, "ROTATE_CW" if rotation[i] > 0 else "ROTATE_CCW")
+                   for i, slot in zip(np.flatnonzero(fire), slots[fire])]
+        self.rotation[slots] = np.where(fire, 0.0, rotation)
+        self.last_rotation[slots] = np.where(fire, now, self.last_rotation[slots])
+        self.last_angle[slots] = np.where(moved, angle, self.last_angle[slots])
+        self.last_point[slots] = np.where((moved | (valid & ~has_last))[:, None], center, last)
+        return [(int(slot), gesture) for slot, gesture in events]
@@ -0,0 +1,241 @@
+"""Load generator for the REST and /ws paths.
+
+Starts the app with uvicorn in a scratch directory (or targets --url), connects
+N WebSocket listeners, runs M writers with a weighted mix of vehicle updates,
+media updates and GETs, and reports throughput, end-to-end broadcast latency
+(write sent -> delta received), server RSS growth and how deliberately slow
+consumers were treated. Needs httpx and websockets.
+
+    python loadtest.py --clients 50 --writers 4 --duration 10 --mix vehicle=6,media=3,get=1 --json run.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import websockets
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in ("vehicle", "media", "get"):
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(values: list, pct: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))]
+
+
+def rss_kb(pid: int):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class Stats:
+    def __init__(self):
+        self.sent = {}  # marker -> monotonic send time
+        self.latencies = []
+        self.ops = {"vehicle": 0, "media": 0, "get": 0}
+        self.errors = 0
+        self.deliveries = 0
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.stats = Stats()
+        self.seq = 0
+        self.stop = asyncio.Event()
+        self.server = None
+        self.url = args.url
+
+    # --- Server ---
+
+    async def start_server(self):
+        if self.url:
+            return
+        self.workdir = tempfile.mkdtemp(prefix="aeroui-load-")  # Fresh journal for every run
+        env = dict(os.environ, **({"AEROUI_TICK_RATES": self.args.tick_rates} if self.args.tick_rates else {}))
+        self.server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", HERE, "--port", str(self.args.port),
+             "--log-level", "warning"],
+            cwd=self.workdir, env=env)
+        self.url = f"http://127.0.0.1:{self.args.port}"
+        async with httpx.AsyncClient() as http:
+            for _ in range(100):
+                try:
+                    await http.get(self.url + "/api/vehicle")
+                    return
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+        raise RuntimeError("server did not start")
+
+    def stop_server(self):
+        if self.server:
+            self.server.terminate()
+            self.server.wait(timeout=10)
+
+    # --- Clients ---
+
+    def record_delivery(self, message: dict):
+        data = message.get("data") or {}
+        marker = data.get("title") if message.get("type") == "MEDIA_DELTA" else data.get("driver_temp")
+        sent_at = self.stats.sent.get(marker)
+        if sent_at is not None:
+            self.stats.latencies.append(time.monotonic() - sent_at)
+        self.stats.deliveries += 1
+
+    async def listener(self, slow: bool, result: dict):
+        ws_url = self.url.replace("http", "ws", 1) + "/ws"
+        try:
+            async with websockets.connect(ws_url, max_size=None) as ws:
+                while not self.stop.is_set():
+                    try:
+                        raw = await asyncio.wait_for(ws.recv(), 0.5)
+                    except asyncio.TimeoutError:
+                        continue
+                    result["received"] += 1
+                    if slow:
+                        await asyncio.sleep(self.args.slow_delay)
+                    else:
+                        self.record_delivery(json.loads(raw))
+        except websockets.ConnectionClosed as e:
+            result["closed"] = f"{e.rcvd.code if e.rcvd else None}"
+
+    async def writer(self, http: httpx.AsyncClient):
+        names, weights = zip(*self.args.mix.items())
+        interval = 1.0 / self.args.rate if self.args.rate else 0.0
+        next_at = time.monotonic()
+        while not self.stop.is_set():
+            op = random.choices(names, weights)[0]
+            self.seq += 1
+            try:
+                if op == "get":
+                    response = await http.get(self.url + random.choice(("/api/vehicle", "/api/media")))
+                else:
+                    marker = self.seq if op == "vehicle" else f"load-{self.seq}"
+                    fields = {"driver_temp": marker} if op == "vehicle" else {"title": marker}
+                    self.stats.sent[marker] = time.monotonic()
+                    response = await http.patch(f"{self.url}/api/{op}", json=fields)
+                response.raise_for_status()
+                self.stats.ops[op] += 1
+            except httpx.HTTPError:
+                self.stats.errors += 1
+            if interval:
+                next_at += interval
+                await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+
+    # --- Run ---
+
+    async def run(self) -> dict:
+        await self.start_server()
+        try:
+            return await self._run()
+        finally:
+            self.stop_server()
+
+    async def _run(self) -> dict:
+        args = self.args
+        listeners = [{"slow": i < args.slow_clients, "received": 0, "closed": None}
+                     for i in range(args.clients + args.slow_clients)]
+        tasks = [asyncio.create_task(self.listener(r["slow"], r)) for r in listeners]
+        await asyncio.sleep(0.5)  # Let everyone connect and take INITIAL_STATE
+
+        rss = []
+        async with httpx.AsyncClient(limits=httpx.Limits(max_connections=args.writers)) as http:
+            rss_start = rss_kb(self.server.pid) if self.server else None
+            started = time.monotonic()
+            writers = [asyncio.create_task(self.writer(http)) for _ in range(args.writers)]
+            while time.monotonic() - started < args.duration:
+                await asyncio.sleep(1.0)
+                if self.server:
+                    rss.append(rss_kb(self.server.pid))
+            elapsed = time.monotonic() - started
+            await asyncio.sleep(0.5)  # Drain in-flight deltas
+            self.stop.set()
+            await asyncio.gather(*writers)
+            metrics = (await http.get(self.url + "/metrics")).text
+        await asyncio.gather(*tasks)
+
+        latencies = self.stats.latencies
+        slow = [r for r in listeners if r["slow"]]
+        writes = self.stats.ops["vehicle"] + self.stats.ops["media"]
+        return {
+            "config": {key: value for key, value in vars(args).items() if key != "json"},
+            "duration_s": round(elapsed, 3),
+            "ops": self.stats.ops,
+            "errors": self.stats.errors,
+            "throughput": {
+                "requests_per_s": round(sum(self.stats.ops.values()) / elapsed, 1),
+                "writes_per_s": round(writes / elapsed, 1),
+                "deliveries_per_s": round(self.stats.deliveries / elapsed, 1),
+            },
+            "broadcast_latency_ms": {
+                "samples": len(latencies),
+                **{f"p{p}": round(percentile(latencies, p) * 1000, 3) if latencies else None for p in (50, 90, 99)},
+                "max": round(max(latencies) * 1000, 3) if latencies else None,
+            },
+            "server_rss_kb": {
+                "start": rss_start,
+                "end": rss[-1] if rss else None,
+                "growth": rss[-1] - rss_start if rss and rss[-1] and rss_start else None,
+                "samples": rss,
+            },
+            "slow_consumers": {
+                "count": len(slow),
+                "received": [r["received"] for r in slow],
+                "evicted": sum(1 for r in slow if r["closed"] is not None),
+                "server_dropped_frames": sum(
+                    float(line.rsplit(" ", 1)[1]) for line in metrics.splitlines()
+                    if line.startswith("aeroui_ws_dropped_frames{")),
+            },
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AeroUI backend load test")
+    parser.add_argument("--url", help="target a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--clients", type=int, default=20, help="WebSocket listeners")
+    parser.add_argument("--slow-clients", type=int, default=0, help="extra listeners that read slowly")
+    parser.add_argument("--slow-delay", type=float, default=0.2, help="seconds a slow client waits per message")
+    parser.add_argument("--writers", type=int, default=2, help="concurrent REST writers")
+    parser.add_argument("--rate", type=float, default=0, help="ops/s per writer (0: as fast as possible)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("vehicle=1,media=1,get=1"))
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--tick-rates", help="AEROUI_TICK_RATES for the started server")
+    parser.add_argument("--json", help="write the report here instead of stdout")
+    args = parser.parse_args()
+
+    report = asyncio.run(LoadTest(args).run())
+    output = json.dumps(report, indent=2)
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
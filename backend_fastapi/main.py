@@ -1,9 +1,53 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from models import SystemState, VehicleStateModel, MediaStateModel
+from models import (
+    SystemState, StateChange, VehicleStateModel, MediaStateModel,
+    VehicleStatePatch, MediaStatePatch, SchemaError, TOPICS, split_delta,
+    BatchRequest, Mutation,
+)
+from connections import ClientConnection, ConnectionManager
+from broker import BrokerClient, BrokerError
+from scheduler import BroadcastScheduler, parse_rates
+from metrics import Registry, LoopLagMonitor, SamplingProfiler
+try:
+    from landmarks import LandmarkHub, gesture_update, parse_frames
+except ImportError:  # numpy not installed: /ws/landmarks is unavailable
+    LandmarkHub = None
+import wire
+from contextlib import asynccontextmanager
 import asyncio
+import os
+import time
+from typing import Optional
+
+# Set by `python main.py --workers N` (or by hand with `python broker.py`):
+# state then lives in the broker process and this worker only keeps a replica.
+BROKER_SOCKET = os.environ.get("AEROUI_BROKER_SOCKET")
+# Optional broadcast ticks per topic, e.g. "vehicle=30,media.progress=4" (Hz). Unset: send every change at once.
+TICK_RATES = parse_rates(os.environ.get("AEROUI_TICK_RATES"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop_lag.start()
+    if landmark_hub:
+        landmark_hub.start()
+    if os.environ.get("AEROUI_PROFILE"):
+        profiler.start()
+    if broker:
+        await broker.start()
+    yield
+    loop_lag.stop()
+    profiler.stop()
+    if landmark_hub:
+        landmark_hub.stop()
+    if broker:
+        await broker.close()
+    await scheduler.flush()
+    # Write out anything still sitting in the write-behind buffer
+    await state_manager.flush()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # CORS configuration to match Django (allow all for dev)
 app.add_middleware(
@@ -15,85 +59,399 @@ app.add_middleware(
 )
 
 # Global State Manager
-state_manager = SystemState.get_instance()
+state_manager = SystemState(journal_dir=None) if BROKER_SOCKET else SystemState.get_instance()
+
+# WebSocket Connection Manager (per-client send queues, see connections.py)
+manager = ConnectionManager(max_queue=32, send_timeout=2.0)
+
+async def send_topic(topic: str, message: dict):
+    with broadcast_seconds.time(topic):
+        await manager.broadcast(message, topic=topic)
+    ws_messages.inc("out", message["type"], amount=len(manager.subscribers.get(topic, ())))
+
+# Coalesces high-rate topics into one delta per tick (see scheduler.py)
+scheduler = BroadcastScheduler(send_topic, TICK_RATES)
+
+# --- Metrics (GET /metrics, Prometheus text format) ---
+
+def client_label(client) -> str:
+    peer = client.websocket.client
+    return f"{peer.host}:{peer.port}" if peer else str(id(client))
+
+registry = Registry()
+request_seconds = registry.histogram("aeroui_http_request_seconds", "HTTP request latency", ("method", "route"))
+broadcast_seconds = registry.histogram("aeroui_broadcast_seconds", "Time to fan one delta out to every subscriber", ("topic",))
+ws_messages = registry.counter("aeroui_ws_messages_total", "WebSocket messages by direction and type", ("direction", "type"))
+flush_seconds = registry.histogram("aeroui_persist_flush_seconds", "Journal flush duration (runs off the event loop)")
+loop_lag_seconds = registry.histogram("aeroui_event_loop_lag_seconds", "How late the event loop wakes from a 250ms sleep")
+registry.gauge("aeroui_ws_clients", "Connected WebSocket clients",
+               lambda: {(): len(manager.active_connections)})
+registry.gauge("aeroui_ws_topic_subscribers", "Subscribers per topic",
+               lambda: {(topic,): len(clients) for topic, clients in manager.subscribers.items()}, ("topic",))
+registry.gauge("aeroui_ws_queue_depth", "Frames waiting in each client's send queue",
+               lambda: {(client_label(c),): c.queue_depth for c in manager.active_connections.values()}, ("client",))
+registry.gauge("aeroui_ws_dropped_frames", "Frames dropped for slow consumers, per connected client",
+               lambda: {(client_label(c),): c.dropped for c in manager.active_connections.values()}, ("client",))
+registry.gauge("aeroui_ws_coalesced_frames", "Frames folded into a queued frame, per connected client",
+               lambda: {(client_label(c),): c.coalesced for c in manager.active_connections.values()}, ("client",))
+registry.gauge("aeroui_scheduler_flushes", "Deltas sent by the broadcast scheduler",
+               lambda: {(): scheduler.flushes})
+registry.gauge("aeroui_scheduler_merged", "Deltas merged into a pending tick instead of being sent",
+               lambda: {(): scheduler.merged})
+registry.gauge("aeroui_state_version", "Current state version", lambda: {(): state_manager.version})
+registry.gauge("aeroui_persist_writes", "Journal writes since start", lambda: {(): state_manager.writer.writes})
+state_manager.writer.on_flush = flush_seconds.observe
+registry.gauge("aeroui_landmark_streams", "Connected /ws/landmarks streams",
+               lambda: {(): len(landmark_hub.streams) if landmark_hub else 0})
+registry.gauge("aeroui_landmark_frames", "Landmark frames classified since start",
+               lambda: {(): landmark_hub.frames_classified if landmark_hub else 0})
+registry.gauge("aeroui_landmark_tick_seconds", "Duration of the last classifier tick",
+               lambda: {(): landmark_hub.last_tick_duration if landmark_hub else 0})
+loop_lag = LoopLagMonitor(loop_lag_seconds)
+profiler = SamplingProfiler()  # Off unless AEROUI_PROFILE is set or switched on via /debug/profiler
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    request_seconds.observe(time.perf_counter() - started, request.method,
+                            route.path if route else "unmatched")
+    return response
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+PROFILER_HOSTS = ("127.0.0.1", "::1", "localhost")
+
+@app.post("/debug/profiler")
+async def toggle_profiler(request: Request, enabled: bool = True, interval_ms: float = 5.0):
+    # Local callers only, unless AEROUI_PROFILE opts the deployment in
+    if not os.environ.get("AEROUI_PROFILE") and (request.client is None or request.client.host not in PROFILER_HOSTS):
+        return JSONResponse(status_code=403, content={"detail": "profiler control is local-only (set AEROUI_PROFILE)"})
+    # Started from the event loop thread, which is the one it samples
+    if enabled:
+        profiler.start(min(max(interval_ms, 1.0), 1000.0) / 1000.0)
+    else:
+        profiler.stop()
+    return {"running": profiler.running, "samples": sum(profiler.samples.values())}
+
+@app.get("/debug/profiler", response_class=PlainTextResponse)
+async def profiler_report(limit: int = 200):
+    """Folded stacks collected so far (flamegraph.pl / speedscope input)."""
+    return PlainTextResponse(profiler.folded(limit))
+
+# --- State Changes ---
+
+def delta_messages(change: StateChange) -> dict:
+    """One *_DELTA per topic the change touched: {topic: message}.
+
+    prev_version is the topic's previous change, so a client that only
+    subscribes to some topics can still spot gaps in what it receives.
+    """
+    return {
+        topic: {
+            "type": f"{change.model.upper()}_DELTA",
+            "topic": topic,
+            "version": change.version,
+            "prev_version": change.topics[topic],
+            "data": fields,
+        }
+        for topic, fields in split_delta(change.model, change.delta).items()
+    }
+
+async def broadcast_change(change: StateChange):
+    for topic, message in delta_messages(change).items():
+        await scheduler.publish(topic, message)
+
+async def commit(model: str, fields: dict, replace: bool = False):
+    """Apply an update and broadcast only the fields that changed.
+
+    Returns the new version, or None if nothing changed.
+    """
+    if broker:
+        # Validate here so clients get the same errors, then let the broker
+        # order it; the change comes back through on_broker_change on every worker.
+        state_manager.validate(model, fields, replace=replace)
+        return await broker.apply(model, fields, replace=replace)
+    change = state_manager.apply(model, fields, replace=replace)
+    if change:
+        await broadcast_change(change)
+    return change.version if change else None
+
+async def commit_batch(mutations: list) -> Optional[int]:
+    """Apply Mutations in order, all or nothing.
 
-# WebSocket Connection Manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
+    The whole batch is one version and one journal write, and every topic it
+    touched gets a single delta with the net change. Returns the version, or
+    None if nothing changed.
+    """
+    if broker:
+        state_manager.validate_batch(mutations)
+        return await broker.apply_batch(mutations)
+    changes = state_manager.apply_batch(mutations)
+    for change in changes:
+        await broadcast_change(change)
+    return changes[0].version if changes else None
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
+def parse_mutations(value) -> list:
+    """Mutations from a BATCH message; raises ValueError if malformed."""
+    if not isinstance(value, list) or not value:
+        raise ValueError("mutations must be a non-empty list")
+    mutations = []
+    for i, item in enumerate(value):
+        if not isinstance(item, dict) or not isinstance(item.get("fields", {}), dict):
+            raise ValueError(f"mutation {i}: expected {{\"model\": ..., \"fields\": {{...}}, \"replace\": false}}")
+        mutations.append(Mutation(item.get("model"), item.get("fields") or {}, bool(item.get("replace", False))))
+    return mutations
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+async def on_broker_change(change: StateChange):
+    await broadcast_change(change)
 
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            await connection.send_json(message)
+async def on_broker_resync():
+    # Replica was re-seeded (broker restart/reconnect): everyone gets the full state
+    for client in list(manager.active_connections.values()):
+        send_state(client)
 
-manager = ConnectionManager()
+broker = BrokerClient(state_manager, BROKER_SOCKET, on_broker_change, on_broker_resync) if BROKER_SOCKET else None
 
 # --- REST Endpoints ---
+# Responses are served from SystemState's pre-encoded snapshots, so reads of
+# unchanged state skip Pydantic entirely, and If-None-Match gets a 304.
+
+MEDIA_TYPES = {wire.JSON: "application/json", wire.MSGPACK: "application/msgpack"}
+
+@app.exception_handler(SchemaError)
+async def schema_error(request: Request, exc: SchemaError):
+    # Checks Pydantic doesn't make itself (e.g. album_art must be an http(s) URL)
+    return JSONResponse(status_code=422, content={"detail": str(exc)})
+
+@app.exception_handler(BrokerError)
+async def broker_error(request: Request, exc: BrokerError):
+    # Broker down or lost mid-request: the write may or may not have been applied
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+def model_response(request: Request, model: str, conditional: bool = True) -> Response:
+    encoding = wire.JSON
+    if wire.MSGPACK in wire.available_encodings() and MEDIA_TYPES[wire.MSGPACK] in request.headers.get("accept", ""):
+        encoding = wire.MSGPACK
+    etag = state_manager.etag(model, encoding)
+    headers = {"ETag": etag, "Vary": "Accept"}
+    if conditional:
+        if_none_match = request.headers.get("if-none-match", "")
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if etag in candidates or "*" in candidates:
+            return Response(status_code=304, headers=headers)
+    return Response(content=state_manager.encoded_model(model, encoding),
+                    media_type=MEDIA_TYPES[encoding], headers=headers)
 
 @app.get("/api/vehicle", response_model=VehicleStateModel)
-async def get_vehicle_state():
-    return state_manager.vehicle
+async def get_vehicle_state(request: Request):
+    return model_response(request, "vehicle")
 
 @app.post("/api/vehicle", response_model=VehicleStateModel)
-async def update_vehicle_state(state: VehicleStateModel):
-    state_manager.vehicle = state
-    state_manager.save()
-    # Notify WebSocket clients
-    await manager.broadcast({"type": "VEHICLE_UPDATE", "data": state.dict()})
-    return state_manager.vehicle
+async def update_vehicle_state(state: VehicleStateModel, request: Request):
+    await commit("vehicle", state.dict(), replace=True)
+    return model_response(request, "vehicle", conditional=False)
+
+@app.patch("/api/vehicle", response_model=VehicleStateModel)
+async def patch_vehicle_state(patch: VehicleStatePatch, request: Request):
+    await commit("vehicle", patch.dict(exclude_unset=True, exclude_none=True))
+    return model_response(request, "vehicle", conditional=False)
 
 @app.get("/api/media", response_model=MediaStateModel)
-async def get_media_state():
-    return state_manager.media
+async def get_media_state(request: Request):
+    return model_response(request, "media")
 
 @app.post("/api/media", response_model=MediaStateModel)
-async def update_media_state(state: MediaStateModel):
-    state_manager.media = state
-    state_manager.save()
-    # Notify WebSocket clients
-    await manager.broadcast({"type": "MEDIA_UPDATE", "data": state.dict()})
-    return state_manager.media
+async def update_media_state(state: MediaStateModel, request: Request):
+    await commit("media", state.dict(), replace=True)
+    return model_response(request, "media", conditional=False)
+
+@app.patch("/api/media", response_model=MediaStateModel)
+async def patch_media_state(patch: MediaStatePatch, request: Request):
+    await commit("media", patch.dict(exclude_unset=True, exclude_none=True))
+    return model_response(request, "media", conditional=False)
+
+@app.post("/api/batch")
+async def batch_update(batch: BatchRequest):
+    """Several vehicle/media mutations (e.g. a climate preset) as one atomic change."""
+    mutations = parse_mutations([mutation.dict() for mutation in batch.mutations])
+    version = await commit_batch(mutations)
+    models = sorted({mutation.model for mutation in mutations})
+    return {"version": version, **{model: getattr(state_manager, model) for model in models}}
 
 # --- WebSocket Endpoint ---
 
+def parse_version(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_topics(value) -> list[str]:
+    """Topic list from a SUBSCRIBE message or ?topics=a,b; raises ValueError for unknown names."""
+    if isinstance(value, str):
+        value = [topic for topic in value.split(",") if topic]
+    topics = list(value or [])
+    unknown = [topic for topic in topics if topic not in TOPICS]
+    if unknown:
+        raise ValueError(f"unknown topics {unknown}, expected any of {list(TOPICS)}")
+    return topics
+
+def send_state(client, topics=None):
+    ws_messages.inc("out", "INITIAL_STATE")
+    client.send_encoded(state_manager.encoded_state(client.encoding, topics or client.topics), pinned=True)
+
+def catch_up(client, since):
+    """Send what the client missed since a version, or the full state if the journal can't."""
+    changes = state_manager.changes_since(since) if since is not None else None
+    if changes is None:
+        send_state(client)
+        return
+    # One merged delta per subscribed topic, the same way a slow client's queue coalesces them
+    merged = {}
+    for change in changes:
+        for topic, message in delta_messages(change).items():
+            if topic not in client.topics:
+                continue
+            previous = merged.get(topic)
+            if previous:
+                message["prev_version"] = previous["prev_version"]
+                message["data"] = {**previous["data"], **message["data"]}
+            merged[topic] = message
+    for topic, message in merged.items():
+        client.send(message, key=topic)
+    client.send({"type": "RESUMED", "version": state_manager.version}, pinned=True)
+
+# Client message types counted by name in aeroui_ws_messages_total, anything else is "other"
+WS_MESSAGE_TYPES = ("UPDATE_VEHICLE", "UPDATE_MEDIA", "BATCH", "RESYNC", "SUBSCRIBE", "UNSUBSCRIBE")
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+    client = await manager.connect(websocket)
     try:
-        # Send initial state on connection
-        await websocket.send_json({
-            "type": "INITIAL_STATE",
-            "data": {
-                "vehicle": state_manager.vehicle.dict(),
-                "media": state_manager.media.dict()
-            }
-        })
+        # Topics from /ws?topics=vehicle,media (default: all of them), changeable later
+        # with SUBSCRIBE / UNSUBSCRIBE. Only subscribed topics are ever sent.
+        try:
+            topics = parse_topics(websocket.query_params.get("topics")) or TOPICS
+        except ValueError as e:
+            client.send({"type": "ERROR", "request": "CONNECT", "detail": str(e)})
+            topics = TOPICS
+        manager.subscribe(client, topics)
+        # Resume handshake (/ws?since=N) or the full initial state
+        catch_up(client, parse_version(websocket.query_params.get("since")))
         while True:
-            # We mostly expect the client to listen, but if they send data, we can handle it
-            data = await websocket.receive_json()
-            # Handle incoming updates if necessary (e.g. from the Qt UI directly)
-            # For now, we assume one-way sync (UI actions -> REST -> Broadcast), 
-            # OR UI actions -> WS -> Broadcast. 
-            # Let's support basic state updates via WS too for lower latency.
-            if data.get("type") == "UPDATE_VEHICLE":
-                state_manager.vehicle = VehicleStateModel(**data["data"])
-                state_manager.save()
-                await manager.broadcast({"type": "VEHICLE_UPDATE", "data": state_manager.vehicle.dict()})
-            elif data.get("type") == "UPDATE_MEDIA":
-                state_manager.media = MediaStateModel(**data["data"])
-                state_manager.save()
-                await manager.broadcast({"type": "MEDIA_UPDATE", "data": state_manager.media.dict()})
+            msg_type = None
+            # UPDATE_* messages carry only the changed fields; every change is
+            # broadcast as one *_DELTA per topic with the new version and the topic's previous one.
+            try:
+                data = await client.receive()  # Undecodable frames get an ERROR, not a dropped socket
+                if not isinstance(data, dict):
+                    raise ValueError("messages must be objects")
+                msg_type = data.get("type")
+                ws_messages.inc("in", msg_type if msg_type in WS_MESSAGE_TYPES else "other")
+                if msg_type == "UPDATE_VEHICLE":
+                    await commit("vehicle", data.get("data") or {})
+                elif msg_type == "UPDATE_MEDIA":
+                    await commit("media", data.get("data") or {})
+                elif msg_type == "BATCH":
+                    # {"mutations": [{"model": "vehicle", "fields": {...}}, ...], "id": <echoed>}
+                    version = await commit_batch(parse_mutations(data.get("mutations")))
+                    client.send({"type": "BATCH_APPLIED", "id": data.get("id"), "version": version})
+                elif msg_type == "RESYNC":
+                    # Client saw a version gap: replay since its version if we can, else full state
+                    catch_up(client, parse_version(data.get("since")))
+                elif msg_type == "SUBSCRIBE":
+                    # {"topics": [...], "max_rate": {"media.progress": 2}} (rates in messages/second)
+                    topics = parse_topics(data.get("topics"))
+                    rates = data.get("max_rate") or {}
+                    parse_topics(list(rates))
+                    added = [topic for topic in topics if topic not in client.topics]
+                    manager.subscribe(client, topics)
+                    for topic, rate in rates.items():
+                        client.set_rate(topic, float(rate) if rate else None)
+                    if added:
+                        send_state(client, added)  # Current state of what was just added
+                    client.send({"type": "SUBSCRIBED", "topics": sorted(client.topics)})
+                elif msg_type == "UNSUBSCRIBE":
+                    manager.unsubscribe(client, parse_topics(data.get("topics")))
+                    client.send({"type": "SUBSCRIBED", "topics": sorted(client.topics)})
+            except (ValueError, TypeError, BrokerError) as e:
+                client.send({"type": "ERROR", "request": msg_type, "detail": str(e)})
 
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
+# --- Landmark Ingestion (see landmarks.py) ---
+
+landmark_hub = LandmarkHub() if LandmarkHub else None
+
+async def on_landmark_gesture(stream, gesture: str):
+    fields = gesture_update(gesture, stream.control, state_manager.vehicle, stream.last_volume)
+    if fields.get("volume") == 0:
+        stream.last_volume = state_manager.vehicle["volume"]
+    if fields:
+        await commit("vehicle", fields)
+    stream.client.send({"type": "GESTURE", "gesture": gesture})
+
+@app.websocket("/ws/landmarks")
+async def landmarks_endpoint(websocket: WebSocket):
+    if landmark_hub is None:
+        await websocket.close(code=1011, reason="numpy is required for /ws/landmarks")
+        return
+    await websocket.accept()
+    client = ClientConnection(websocket)
+    client.start(lambda _: None)
+    stream = landmark_hub.open(on_landmark_gesture, client)
+    try:
+        while True:
+            event = await websocket.receive()
+            if event["type"] == "websocket.disconnect":
+                break
+            try:
+                if event.get("bytes") is not None:
+                    landmark_hub.feed(stream, parse_frames(event["bytes"]))
+                    continue
+                data = wire.decode(event["text"])
+                if data.get("type") == "LANDMARKS":
+                    landmark_hub.feed(stream, parse_frames(data.get("frames") or []), float(data.get("dt") or 1 / 30))
+                elif data.get("type") == "CONTROL" and data.get("control") in ("volume", "temp"):
+                    stream.control = data["control"]
+            except (ValueError, TypeError, AttributeError) as e:
+                client.send({"type": "ERROR", "request": "LANDMARKS", "detail": str(e)})
+    finally:
+        landmark_hub.close(stream)
+        client.close()
+
 if __name__ == "__main__":
+    import argparse
+    import multiprocessing
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    from broker import DEFAULT_SOCKET, run_broker
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="more than 1 starts a state broker and runs uvicorn workers as replicas")
+    parser.add_argument("--tick-rates", help='broadcast ticks per topic, e.g. "vehicle=30,media.progress=4"')
+    args = parser.parse_args()
+    if args.tick_rates:
+        os.environ["AEROUI_TICK_RATES"] = args.tick_rates
+        scheduler.set_rates(parse_rates(args.tick_rates))
+
+    if args.workers > 1:
+        socket_path = os.environ.setdefault("AEROUI_BROKER_SOCKET", DEFAULT_SOCKET)
+        broker_process = multiprocessing.Process(target=run_broker, args=(socket_path,), name="aeroui-broker")
+        broker_process.start()
+        try:
+            uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers)
+        finally:
+            broker_process.terminate()
+            broker_process.join()
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
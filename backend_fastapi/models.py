@@ -1,31 +1,95 @@
 import json
 import os
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, create_model
+from typing import NamedTuple, Optional
+from persistence import StateWriter
+from journal import StateJournal
+import wire  # Also puts shared/ on sys.path
+from state_schema import MODELS as STATE_MODELS, VEHICLE, MEDIA, ModelSchema, SchemaError
 
-STATE_FILE = "state.json"
+STATE_FILE = "state.json"  # Legacy single-file state, only read when there is no journal yet
+JOURNAL_DIR = "state_journal"
+SAVE_INTERVAL_MS = 250  # Write-behind: at most one journal flush per interval
 
-class VehicleStateModel(BaseModel):
-    driver_temp: int = 22
-    passenger_temp: int = 22
-    fan_speed: int = 3
-    volume: int = 50
+# Fields come from shared/state_schema.py (STATE_MODELS: model name -> schema).
+# SystemState keeps each model as a plain dict checked by the schema's
+# compiled validate(); Pydantic is only the HTTP surface.
 
-class MediaStateModel(BaseModel):
-    title: str = "Not Playing"
-    artist: str = "Unknown"
-    album_art: str = ""
-    is_playing: bool = False
-    progress: int = 0
-    duration: int = 180
+def pydantic_model(schema: ModelSchema, name: str, patch: bool = False):
+    """Request/response model for the API docs and body parsing, built from the shared schema.
+
+    With patch=True every field is optional and only the fields that were set are applied.
+    """
+    fields = {}
+    for field in schema.fields:
+        constraints = {"max_length": field.max_length} if field.max_length is not None else {}
+        if patch:
+            fields[field.name] = (Optional[field.type], Field(None, **constraints))
+        else:
+            fields[field.name] = (field.type, Field(field.default, **constraints))
+    return create_model(name, **fields)
+
+VehicleStateModel = pydantic_model(VEHICLE, "VehicleStateModel")
+MediaStateModel = pydantic_model(MEDIA, "MediaStateModel")
+VehicleStatePatch = pydantic_model(VEHICLE, "VehicleStatePatch", patch=True)
+MediaStatePatch = pydantic_model(MEDIA, "MediaStatePatch", patch=True)
+
+# POST /api/batch: fields are checked against the schema by SystemState.apply_batch
+class MutationModel(BaseModel):
+    model: str
+    fields: dict = {}
+    replace: bool = False
+
+class BatchRequest(BaseModel):
+    mutations: list[MutationModel]
+
+# /ws topics. Each model is a topic; high-rate fields get a topic of their own
+# so screens that don't need them never receive that traffic. Topics partition
+# the fields: a field belongs to its own topic or else to its model's.
+FIELD_TOPICS = {
+    "media.progress": ("media", "progress"),
+}
+TOPICS = tuple(STATE_MODELS) + tuple(FIELD_TOPICS)
+
+def topic_model(topic: str) -> str:
+    return FIELD_TOPICS[topic][0] if topic in FIELD_TOPICS else topic
+
+def split_delta(model: str, delta: dict) -> dict:
+    """Split a model delta into {topic: fields}."""
+    parts = {}
+    for key, value in delta.items():
+        topic = f"{model}.{key}"
+        parts.setdefault(topic if topic in FIELD_TOPICS else model, {})[key] = value
+    return parts
+
+class Mutation(NamedTuple):
+    model: str
+    fields: dict
+    replace: bool = False  # Full model (missing fields reset to defaults) instead of a patch
+
+class StateChange(NamedTuple):
+    model: str
+    version: int
+    prev_version: int  # Version of the previous change to the same model
+    delta: dict
+    topics: dict  # topic -> version of that topic's previous change, for each topic in delta
 
 class SystemState:
     _instance = None
 
-    def __init__(self):
-        self.vehicle = VehicleStateModel()
-        self.media = MediaStateModel()
-        self.load()
+    def __init__(self, journal_dir: Optional[str] = JOURNAL_DIR):
+        self.vehicle = VEHICLE.defaults()
+        self.media = MEDIA.defaults()
+        self.version = 0  # Bumped on every change, never goes backwards
+        self.revisions = {name: 0 for name in STATE_MODELS}  # Version of each model's last change
+        self.topic_revisions = {topic: 0 for topic in TOPICS}  # Same, per /ws topic
+        self._encoded = {}  # (model or "state", encoding) -> payload, dropped on mutation
+        # Without a journal directory nothing touches the disk (scale-out replicas)
+        self.persistent = journal_dir is not None
+        self.journal = StateJournal(journal_dir)
+        if self.persistent:
+            self.load()
+        self.writer = StateWriter(self._take_batch, self.journal.write, interval_ms=SAVE_INTERVAL_MS)
 
     @classmethod
     def get_instance(cls):
@@ -34,21 +98,191 @@ class SystemState:
         return cls._instance
 
     def load(self):
-        if os.path.exists(STATE_FILE):
+        """Latest journal snapshot plus the changes logged after it."""
+        try:
+            data, events = self.journal.recover()
+        except Exception as e:
+            print(f"Failed to recover state journal: {e}")
+            data, events = None, []
+
+        if data is None and not events and os.path.exists(STATE_FILE):
             try:
                 with open(STATE_FILE, 'r') as f:
                     data = json.load(f)
-                    self.vehicle = VehicleStateModel(**data.get('vehicle', {}))
-                    self.media = MediaStateModel(**data.get('media', {}))
             except Exception as e:
                 print(f"Failed to load state: {e}")
 
+        if data:
+            self._restore(data)
+        for event in events:
+            self._set(event["m"], event["v"], event["d"])
+
+    def _restore(self, data: dict):
+        # Written by us, so trusted: fields missing from older snapshots keep their defaults
+        self.vehicle = VEHICLE.merge(VEHICLE.defaults(), data.get('vehicle', {}))
+        self.media = MEDIA.merge(MEDIA.defaults(), data.get('media', {}))
+        self.version = data.get('version', 0)
+        self.revisions.update(data.get('revisions', {}))
+        # Snapshots from before topics existed: a model's revision bounds all its topics
+        self.topic_revisions.update({topic: self.revisions[topic_model(topic)] for topic in TOPICS})
+        self.topic_revisions.update(data.get('topic_revisions', {}))
+        self._encoded.clear()
+
+    def _set(self, model: str, version: int, delta: dict):
+        # Trusted change (journal replay, broker): no validation, no conversion
+        setattr(self, model, STATE_MODELS[model].merge(getattr(self, model), delta))
+        self._invalidate(model)
+        self.version = version
+        self.revisions[model] = version
+        for topic in split_delta(model, delta):
+            self.topic_revisions[topic] = version
+
+    # --- Scale-out replicas (state owned by broker.StateBroker) ---
+
+    def restore(self, data: dict):
+        """Replace everything with a snapshot from the broker."""
+        self._restore(data)
+        self.journal.reset(self.version)
+
+    def apply_change(self, model: str, version: int, prev_version: int, delta: dict, topics: dict,
+                     batch: int = 1) -> StateChange:
+        """Apply a change the broker already validated and versioned (batch: changes sharing the version)."""
+        self._set(model, version, delta)
+        self.journal.record(version, prev_version, model, delta, topics, batch=batch)
+        return StateChange(model, version, prev_version, delta, topics)
+
+    def validate(self, model: str, fields: dict, replace: bool = False):
+        """Raise SchemaError for an update apply() would reject, without applying it."""
+        STATE_MODELS[model].validate(fields, partial=not replace)
+
+    def snapshot(self):
+        return {
+            "version": self.version,
+            "revisions": dict(self.revisions),
+            "topic_revisions": dict(self.topic_revisions),
+            "vehicle": dict(self.vehicle),
+            "media": dict(self.media)
+        }
+
+    def apply(self, model: str, fields: dict, replace: bool = False) -> Optional[StateChange]:
+        """Validate and apply fields to one model.
+
+        With replace=False only the given fields change (PATCH semantics).
+        Returns the change with just the fields that actually differ, or None
+        if the update was a no-op (no version bump, no save, no broadcast).
+        """
+        changes = self.apply_batch([Mutation(model, fields, replace)])
+        return changes[0] if changes else None
+
+    def _stage(self, mutations) -> dict:
+        """Validate mutations in order against a scratch copy: {model: new state}."""
+        staged = {}
+        for i, (model, fields, replace) in enumerate(mutations):
+            schema = STATE_MODELS.get(model)
+            if schema is None:
+                raise SchemaError(f"mutation {i}: unknown model {model!r}, expected any of {list(STATE_MODELS)}")
+            try:
+                checked = schema.validate(fields, partial=not replace)
+            except SchemaError as e:
+                raise SchemaError(f"mutation {i}: {e}" if len(mutations) > 1 else str(e)) from None
+            staged[model] = schema.merge(staged.get(model, getattr(self, model)), checked)
+        return staged
+
+    def validate_batch(self, mutations):
+        """Raise SchemaError for a batch apply_batch() would reject, without applying it."""
+        self._stage(mutations)
+
+    def apply_batch(self, mutations) -> list[StateChange]:
+        """Apply an ordered list of Mutations across models, all or nothing.
+
+        Every mutation is validated before anything changes. The models that
+        end up different share one new version and one journal write; each
+        gets a StateChange with its net delta. Returns [] for a no-op.
+        """
+        staged = self._stage(mutations)
+        deltas = {}
+        for model, new in staged.items():
+            delta = STATE_MODELS[model].diff(getattr(self, model), new)
+            if delta:
+                deltas[model] = delta
+        if not deltas:
+            return []
+
+        self.version += 1
+        changes = []
+        for model, delta in deltas.items():
+            setattr(self, model, staged[model])
+            self._invalidate(model)
+            prev_version = self.revisions[model]
+            topics = {topic: self.topic_revisions[topic] for topic in split_delta(model, delta)}
+            self.revisions[model] = self.version
+            self.topic_revisions.update(dict.fromkeys(topics, self.version))
+            self.journal.record(self.version, prev_version, model, delta, topics, batch=len(deltas))
+            changes.append(StateChange(model, self.version, prev_version, delta, topics))
+        self.save()
+        return changes
+
+    def changes_since(self, version: int) -> Optional[list[StateChange]]:
+        """Changes after version from the journal tail, None if a full snapshot is needed."""
+        events = self.journal.since(version)
+        if events is None:
+            return None
+        # Events logged before topics existed only carry the model's previous version
+        return [StateChange(event["m"], event["v"], event["p"], event["d"],
+                            event.get("t") or dict.fromkeys(split_delta(event["m"], event["d"]), event["p"]))
+                for event in events]
+
+    # --- Encoded snapshots (serialized once per change, shared by every reader) ---
+
+    def _invalidate(self, model: str):
+        for key in [key for key in self._encoded if key[0] in (model, "state")]:
+            del self._encoded[key]
+
+    def initial_state_message(self, topics=TOPICS) -> dict:
+        """Full state of every model with a subscribed topic, plus each topic's revision."""
+        models = [model for model in STATE_MODELS if any(topic_model(topic) == model for topic in topics)]
+        return {
+            "type": "INITIAL_STATE",
+            "version": self.version,
+            "revisions": {topic: self.topic_revisions[topic] for topic in topics},
+            "data": {model: getattr(self, model) for model in models}
+        }
+
+    def encoded_state(self, encoding: str = wire.JSON, topics=TOPICS):
+        """INITIAL_STATE payload for a /ws client in the given encoding."""
+        topics = tuple(sorted(topics))
+        key = ("state", encoding, topics)
+        payload = self._encoded.get(key)
+        if payload is None:
+            payload = self._encoded[key] = wire.encode(self.initial_state_message(topics), encoding)
+        return payload
+
+    def encoded_model(self, model: str, encoding: str = wire.JSON) -> bytes:
+        """HTTP response body for one model in the given encoding."""
+        key = (model, encoding)
+        body = self._encoded.get(key)
+        if body is None:
+            body = wire.encode(getattr(self, model), encoding)
+            if isinstance(body, str):
+                body = body.encode("utf-8")
+            self._encoded[key] = body
+        return body
+
+    def etag(self, model: str, encoding: str = wire.JSON) -> str:
+        return f'"{model}-{self.revisions[model]}-{encoding}"'
+
+    def _take_batch(self):
+        return self.journal.take_batch(self.snapshot)
+
     def save(self):
-        try:
-            with open(STATE_FILE, 'w') as f:
-                json.dump({
-                    "vehicle": self.vehicle.dict(),
-                    "media": self.media.dict()
-                }, f, indent=4)
-        except Exception as e:
-            print(f"Failed to save state: {e}")
+        # Coalesced and written off the event loop, see persistence.StateWriter
+        if self.persistent:
+            self.writer.schedule()
+
+    async def flush(self):
+        if not self.persistent:
+            return
+        # Finish with a snapshot so the next start has nothing to replay
+        self.journal.request_snapshot()
+        self.writer.schedule()
+        await self.writer.flush()
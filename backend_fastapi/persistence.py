@@ -0,0 +1,112 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Optional
+
+
+def write_atomic(path: str, payload: bytes, fsync: bool = True):
+    """Write payload to path via temp file + rename so readers never see a partial file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)  # mkstemp creates 0600
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def encode_compact(data) -> bytes:
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+class StateWriter:
+    """Write-behind persistence for SystemState.
+
+    save requests only mark the state dirty; at most one write happens per
+    interval. prepare() runs on the event loop (so it sees a consistent
+    state) and returns a job, write(job) does the file I/O in a worker
+    thread. Without a running loop (scripts, tests) it writes synchronously.
+    """
+
+    def __init__(self, prepare, write, interval_ms: int = 250):
+        self.prepare = prepare
+        self.write = write
+        self.interval = interval_ms / 1000.0
+        self.writes = 0
+        self.last_flush_duration = 0.0
+        self.on_flush = None  # Optional callback(seconds) after every write, for metrics
+        self._dirty = False
+        self._last_write = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def schedule(self):
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_sync()
+            return
+        if self._timer is not None or (self._task is not None and not self._task.done()):
+            return  # A write is already queued or running and will pick this up
+        delay = max(0.0, self._last_write + self.interval - time.monotonic())
+        self._timer = loop.call_later(delay, self._start_flush)
+
+    def _start_flush(self):
+        self._timer = None
+        self._task = asyncio.get_running_loop().create_task(self._flush())
+
+    async def _flush(self):
+        while self._dirty:
+            self._dirty = False
+            job = self.prepare()
+            started = time.monotonic()
+            try:
+                await asyncio.to_thread(self.write, job)
+                self.writes += 1
+            except Exception as e:
+                print(f"Failed to save state: {e}")
+            self._last_write = time.monotonic()
+            self._flushed(self._last_write - started)
+            if self._dirty:
+                # More updates arrived during the write, respect the interval before the next one
+                await asyncio.sleep(self.interval)
+
+    async def flush(self):
+        """Write any pending state now (used on shutdown)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._task is not None and not self._task.done():
+            await self._task
+        if self._dirty:
+            await self._flush()
+
+    def flush_sync(self):
+        if not self._dirty:
+            return
+        self._dirty = False
+        started = time.monotonic()
+        try:
+            self.write(self.prepare())
+            self.writes += 1
+        except Exception as e:
+            print(f"Failed to save state: {e}")
+        self._last_write = time.monotonic()
+        self._flushed(self._last_write - started)
+
+    def _flushed(self, duration: float):
+        self.last_flush_duration = duration
+        if self.on_flush:
+            self.on_flush(duration)
@@ -0,0 +1,87 @@
+import asyncio
+import time
+from typing import Optional
+
+# Fields that skip the tick and go out immediately: field -> urgent values (None: any value)
+URGENT_FIELDS = {
+    "is_playing": None,
+    "volume": (0,),  # Mute
+}
+
+
+def parse_rates(spec: Optional[str]) -> dict[str, float]:
+    """Tick rates from "vehicle=30,media.progress=4" (Hz per topic)."""
+    rates = {}
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        topic, _, rate = item.partition("=")
+        rates[topic.strip()] = float(rate)
+    return rates
+
+
+def is_urgent(data: dict) -> bool:
+    for key, values in URGENT_FIELDS.items():
+        if key in data and (values is None or data[key] in values):
+            return True
+    return False
+
+
+class BroadcastScheduler:
+    """Fixed-tick broadcaster: at most one merged delta per topic per tick.
+
+    Deltas for a topic with a tick rate are folded into that topic's dirty
+    set and flushed when its tick comes round, so fan-out cost follows the
+    tick rate instead of the input rate. Topics without a rate, and deltas
+    carrying an urgent field, are sent straight away (after whatever was
+    already pending for the topic, so clients still see versions in order).
+    send(topic, message) does the actual broadcast.
+    """
+
+    def __init__(self, send, rates: Optional[dict] = None):
+        self.send = send
+        self.intervals: dict[str, float] = {}
+        self.set_rates(rates or {})
+        self.flushes = 0
+        self.merged = 0
+        self._dirty: dict[str, dict] = {}  # topic -> merged message waiting for its tick
+        self._last_flush: dict[str, float] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+
+    def set_rates(self, rates: dict):
+        self.intervals = {topic: 1.0 / rate for topic, rate in rates.items() if rate > 0}
+
+    async def publish(self, topic: str, message: dict):
+        pending = self._dirty.pop(topic, None)
+        if pending:
+            # Fold into the dirty set; the older prev_version keeps gap checks lined up
+            message = {**message, "prev_version": pending["prev_version"],
+                       "data": {**pending["data"], **message["data"]}}
+            self.merged += 1
+        interval = self.intervals.get(topic)
+        if interval is None or is_urgent(message["data"]):
+            await self._send(topic, message)
+            return
+        self._dirty[topic] = message
+        if topic not in self._timers:
+            delay = max(0.0, self._last_flush.get(topic, 0.0) + interval - time.monotonic())
+            self._timers[topic] = asyncio.get_running_loop().call_later(delay, self._tick, topic)
+
+    def _tick(self, topic: str):
+        self._timers.pop(topic, None)
+        message = self._dirty.pop(topic, None)
+        if message:
+            asyncio.get_running_loop().create_task(self._send(topic, message))
+
+    async def _send(self, topic: str, message: dict):
+        timer = self._timers.pop(topic, None)
+        if timer:
+            timer.cancel()
+        self._last_flush[topic] = time.monotonic()
+        self.flushes += 1
+        await self.send(topic, message)
+
+    async def flush(self):
+        """Send everything that is waiting for a tick (used on shutdown)."""
+        for topic in list(self._dirty):
+            await self._send(topic, self._dirty.pop(topic))
@@ -0,0 +1,102 @@
+import json
+import os
+import sys
+from typing import Optional, Union
+from fastapi import WebSocket
+
+# shared/state_schema.py: the field definitions every AeroUI component uses
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from state_schema import MODELS as STATE_MODELS, WIRE_VERSION
+
+try:
+    import msgpack
+except ImportError:  # Optional: only needed for the binary /ws encoding
+    msgpack = None
+
+JSON = "json"
+MSGPACK = "msgpack"
+COMPACT = "compact"  # MessagePack with model fields in the schema's positional form
+
+# Subprotocol name -> encoding, in server preference order
+SUBPROTOCOLS = {
+    f"aeroui.compact.v{WIRE_VERSION}": COMPACT,
+    "aeroui.msgpack.v1": MSGPACK,
+    "aeroui.json.v1": JSON,
+}
+
+
+def available_encodings() -> list[str]:
+    return [JSON, MSGPACK, COMPACT] if msgpack is not None else [JSON]
+
+
+def compact(message: dict) -> dict:
+    """Message with its model fields packed (INITIAL_STATE states, *_DELTA deltas)."""
+    data = message.get("data")
+    kind = message.get("type", "")
+    if not data:
+        return message
+    if kind == "INITIAL_STATE":
+        data = {model: STATE_MODELS[model].pack(fields) for model, fields in data.items()}
+    elif kind.endswith("_DELTA"):
+        data = STATE_MODELS[kind[:-len("_DELTA")].lower()].pack_delta(data)
+    else:
+        return message
+    return {**message, "data": data}
+
+
+def _unpack_fields(model, fields):
+    schema = STATE_MODELS.get(model)
+    if schema is None or not fields:
+        raise ValueError(f"bad compact delta for {model!r}")
+    return schema.unpack_delta(fields)
+
+
+def expand(message: dict) -> dict:
+    """Client message with packed deltas (UPDATE_* data, BATCH mutation fields) turned back into fields."""
+    if not isinstance(message, dict):
+        return message
+    data = message.get("data")
+    kind = message.get("type")
+    if isinstance(data, list) and isinstance(kind, str) and kind.startswith("UPDATE_"):
+        return {**message, "data": _unpack_fields(kind[len("UPDATE_"):].lower(), data)}
+    if kind == "BATCH" and isinstance(message.get("mutations"), list):
+        mutations = [{**item, "fields": _unpack_fields(item.get("model"), item["fields"])}
+                     if isinstance(item, dict) and isinstance(item.get("fields"), list) else item
+                     for item in message["mutations"]]
+        return {**message, "mutations": mutations}
+    return message
+
+
+def encode(message, encoding: str = JSON) -> Union[str, bytes]:
+    """Text frame payload for JSON, binary frame payload for MessagePack and compact."""
+    if encoding == MSGPACK:
+        return msgpack.packb(message, use_bin_type=True)
+    if encoding == COMPACT:
+        return msgpack.packb(compact(message), use_bin_type=True)
+    return json.dumps(message, separators=(",", ":"))
+
+
+def decode(data: Union[str, bytes], encoding: str = JSON):
+    if isinstance(data, bytes) and encoding == MSGPACK:
+        return msgpack.unpackb(data, raw=False)
+    if isinstance(data, bytes) and encoding == COMPACT:
+        return expand(msgpack.unpackb(data, raw=False))
+    return json.loads(data)
+
+
+def negotiate(websocket: WebSocket) -> tuple[str, Optional[str]]:
+    """Pick the encoding for a new /ws connection.
+
+    Clients ask through the WebSocket subprotocol (aeroui.compact.v1,
+    aeroui.msgpack.v1) or ?encoding=compact|msgpack. Anything unknown or unavailable falls back to JSON.
+    Returns (encoding, subprotocol to accept with).
+    """
+    offered = websocket.scope.get("subprotocols") or []
+    for subprotocol, encoding in SUBPROTOCOLS.items():
+        if subprotocol in offered and encoding in available_encodings():
+            return encoding, subprotocol
+
+    requested = websocket.query_params.get("encoding", JSON)
+    if requested in available_encodings():
+        return requested, None
+    return JSON, None
@@ -0,0 +1,297 @@
+"""Gesture pipeline calibration for the device it runs on.
+
+Replays a recorded clip through every candidate configuration (landmarker
+model, capture resolution, delegate, running mode, frame interval), compares
+the landmarks with a reference run (first model, full resolution, every
+frame) and stores the most responsive configuration that meets the accuracy
+and latency targets as the profile GestureThread loads at startup.
+
+    python autotune.py --record clip.mp4 --seconds 10     # Move a hand around, pinch, make a fist
+    python autotune.py clip.mp4 --models hand_landmarker.task hand_landmarker_lite.task
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import cv2
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROFILE_PATH = os.environ.get("AEROUI_GESTURE_PROFILE", os.path.join(HERE, "gesture_profile.json"))
+
+# What GestureThread used before calibration existed
+DEFAULT_PROFILE = {
+    "model": "hand_landmarker.task",
+    "width": None,  # None: whatever the camera delivers
+    "height": None,
+    "delegate": "CPU",
+    "running_mode": "IMAGE",
+    "frame_interval": 0.05,  # Seconds per processed frame
+    "min_hand_detection_confidence": 0.7,
+    "min_hand_presence_confidence": 0.7,
+    "min_tracking_confidence": 0.5,
+}
+
+
+def load_profile(path=None):
+    """DEFAULT_PROFILE overlaid with the calibrated profile, if there is one."""
+    profile = dict(DEFAULT_PROFILE)
+    try:
+        with open(path or PROFILE_PATH) as f:
+            profile.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"[Autotune] Ignoring unreadable profile {path or PROFILE_PATH}: {e}")
+    return profile
+
+
+def save_profile(profile, path=None):
+    with open(path or PROFILE_PATH, "w") as f:
+        json.dump(profile, f, indent=2)
+        f.write("\n")
+
+
+def model_path(model):
+    """Relative model paths are looked up next to this file, then in the working directory."""
+    if not os.path.isabs(model) and os.path.exists(os.path.join(HERE, model)):
+        return os.path.join(HERE, model)
+    return model
+
+
+def create_landmarker(profile):
+    """MediaPipe HandLandmarker configured from a profile."""
+    from mediapipe.tasks import python
+    from mediapipe.tasks.python import vision
+
+    base_options = python.BaseOptions(
+        model_asset_path=model_path(profile["model"]),
+        delegate=getattr(python.BaseOptions.Delegate, profile["delegate"]))
+    options = vision.HandLandmarkerOptions(
+        base_options=base_options,
+        running_mode=getattr(vision.RunningMode, profile["running_mode"]),
+        num_hands=1,
+        min_hand_detection_confidence=profile["min_hand_detection_confidence"],
+        min_hand_presence_confidence=profile["min_hand_presence_confidence"],
+        min_tracking_confidence=profile["min_tracking_confidence"],
+    )
+    return vision.HandLandmarker.create_from_options(options)
+
+
+def detect(landmarker, profile, mp_image, timestamp_ms):
+    """IMAGE mode detects on every frame, VIDEO mode tracks between frames (timestamps must increase)."""
+    if profile["running_mode"] == "VIDEO":
+        return landmarker.detect_for_video(mp_image, int(timestamp_ms))
+    return landmarker.detect(mp_image)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))]
+
+
+# --- Clip ---
+
+def record_clip(path, seconds, camera_index=0):
+    cap = cv2.VideoCapture(camera_index)
+    if not cap.isOpened():
+        raise SystemExit(f"Could not open camera {camera_index}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    print(f"[Autotune] Recording {seconds}s at {width}x{height} to {path}...")
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        success, frame = cap.read()
+        if success:
+            writer.write(frame)
+    writer.release()
+    cap.release()
+
+
+def load_clip(path, max_frames=None):
+    """(RGB frames in camera orientation like GestureThread's, frames per second)."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise SystemExit(f"Could not open clip {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = []
+    while max_frames is None or len(frames) < max_frames:
+        success, frame = cap.read()
+        if not success:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    cap.release()
+    if not frames:
+        raise SystemExit(f"No frames in {path}")
+    return frames, fps
+
+
+# --- Benchmark ---
+
+def run_config(profile, frames, fps, warmup=3):
+    """Replay the clip at the profile's frame interval; returns ({frame index: landmarks}, latencies)."""
+    import mediapipe as mp
+    stride = max(1, int(round(profile["frame_interval"] * fps)))
+    landmarker = create_landmarker(profile)
+    results, latencies = {}, []
+    try:
+        for n, index in enumerate(range(0, len(frames), stride)):
+            frame = frames[index]
+            started = time.perf_counter()
+            if profile["width"] and (frame.shape[1], frame.shape[0]) != (profile["width"], profile["height"]):
+                frame = cv2.resize(frame, (profile["width"], profile["height"]), interpolation=cv2.INTER_AREA)
+            mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=np.ascontiguousarray(frame))
+            result = detect(landmarker, profile, mp_image, index * 1000.0 / fps)
+            if n >= warmup:
+                latencies.append(time.perf_counter() - started)
+            results[index] = (np.array([(p.x, p.y) for p in result.hand_landmarks[0]], dtype=np.float32)
+                              if result.hand_landmarks else None)
+    finally:
+        landmarker.close()
+    return results, latencies
+
+
+def accuracy(results, reference):
+    """Recall, false positive rate and mean landmark error against the reference run."""
+    hits = misses = false_positives = empty = 0
+    errors = []
+    for index, landmarks in results.items():
+        expected = reference[index]
+        if expected is None:
+            empty += 1
+            false_positives += landmarks is not None
+        elif landmarks is None:
+            misses += 1
+        else:
+            hits += 1
+            errors.append(float(np.linalg.norm(landmarks - expected, axis=1).mean()))
+    return {
+        "recall": hits / (hits + misses) if hits + misses else 1.0,
+        "false_positive_rate": false_positives / empty if empty else 0.0,
+        "landmark_error": float(np.mean(errors)) if errors else 0.0,
+    }
+
+
+def candidates(args, clip_size):
+    # Capture resolutions above the clip's cannot be emulated
+    resolutions = [r for r in args.resolutions if r[0] <= clip_size[0] and r[1] <= clip_size[1]] or [clip_size]
+    for model, (width, height), delegate, mode, interval in itertools.product(
+            args.models, resolutions, args.delegates, args.modes, args.intervals):
+        yield dict(DEFAULT_PROFILE, model=model, width=width, height=height, delegate=delegate,
+                   running_mode=mode, frame_interval=interval)
+
+
+def calibrate(args):
+    frames, fps = load_clip(args.clip, args.max_frames)
+    clip_size = (frames[0].shape[1], frames[0].shape[0])
+    print(f"[Autotune] {len(frames)} frames at {clip_size[0]}x{clip_size[1]}, {fps:.1f} fps")
+
+    reference_profile = dict(DEFAULT_PROFILE, model=args.models[0], width=None, height=None,
+                             running_mode="IMAGE", frame_interval=1.0 / fps)
+    reference, _ = run_config(reference_profile, frames, fps)
+    detected = sum(landmarks is not None for landmarks in reference.values())
+    print(f"[Autotune] Reference ({args.models[0]}) found a hand in {detected}/{len(reference)} frames")
+    if detected < len(reference) * 0.2:
+        print("[Autotune] WARNING: the clip hardly shows a hand, accuracy figures will mean little")
+
+    runs = []
+    for profile in candidates(args, clip_size):
+        label = (f"{profile['model']} {profile['width'] or clip_size[0]}x{profile['height'] or clip_size[1]} "
+                 f"{profile['delegate']} {profile['running_mode']} {profile['frame_interval'] * 1000:.0f}ms")
+        try:
+            results, latencies = run_config(profile, frames, fps)
+        except Exception as e:  # Missing model file, unsupported delegate...
+            print(f"[Autotune] {label}: unavailable ({e})")
+            runs.append({"profile": profile, "error": str(e)})
+            continue
+        metrics = accuracy(results, reference)
+        p90 = percentile(latencies, 90) or 0.0
+        metrics.update(latency_p50_ms=round((percentile(latencies, 50) or 0.0) * 1000, 2),
+                       latency_p90_ms=round(p90 * 1000, 2))
+        failures = []
+        if metrics["recall"] < args.min_recall:
+            failures.append("recall")
+        if metrics["false_positive_rate"] > args.max_false_positives:
+            failures.append("false positives")
+        if metrics["landmark_error"] > args.max_error:
+            failures.append("landmark error")
+        if p90 * 1000 > args.max_latency_ms:
+            failures.append("latency")
+        if p90 > profile["frame_interval"] * args.duty:
+            failures.append("frame budget")  # Would not keep up with its own pacing
+        runs.append({"profile": profile, "metrics": metrics, "failures": failures})
+        print(f"[Autotune] {label}: recall {metrics['recall']:.3f}, error {metrics['landmark_error']:.4f}, "
+              f"p90 {metrics['latency_p90_ms']}ms" + (f" -> fails {', '.join(failures)}" if failures else " -> ok"))
+
+    passing = [run for run in runs if "metrics" in run and not run["failures"]]
+    # Most responsive first: shortest frame interval, then the cheapest per frame
+    passing.sort(key=lambda run: (run["profile"]["frame_interval"], run["metrics"]["latency_p90_ms"]))
+    best = passing[0] if passing else None
+    report = {"clip": args.clip, "frames": len(frames), "fps": fps, "reference_detections": detected,
+              "runs": runs, "selected": best}
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    if best is None:
+        print("[Autotune] No configuration met the targets; profile left unchanged.")
+        return 1
+
+    profile = dict(best["profile"])
+    profile["calibration"] = {
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "calibrated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "clip": os.path.basename(args.clip),
+        "metrics": best["metrics"],
+    }
+    save_profile(profile, args.output)
+    print(f"[Autotune] Saved profile to {args.output or PROFILE_PATH}:")
+    print(json.dumps({key: value for key, value in profile.items() if key != "calibration"}, indent=2))
+    return 0
+
+
+def parse_resolution(text):
+    width, _, height = text.lower().partition("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the gesture pipeline for this device")
+    parser.add_argument("clip", nargs="?", help="recorded clip to replay")
+    parser.add_argument("--record", metavar="PATH", help="record a clip from the camera instead")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--camera", type=int, default=0)
+    parser.add_argument("--models", nargs="+", default=[DEFAULT_PROFILE["model"]],
+                        help="landmarker .task files, the first one is the accuracy reference")
+    parser.add_argument("--resolutions", type=lambda s: [parse_resolution(r) for r in s.split(",")],
+                        default=[(640, 480), (480, 360), (320, 240)])
+    parser.add_argument("--delegates", type=lambda s: s.upper().split(","), default=["CPU"])
+    parser.add_argument("--modes", type=lambda s: s.upper().split(","), default=["VIDEO", "IMAGE"])
+    parser.add_argument("--intervals", type=lambda s: [float(v) for v in s.split(",")],
+                        default=[1 / 30, 0.05, 1 / 15], help="frame intervals in seconds")
+    parser.add_argument("--min-recall", type=float, default=0.95)
+    parser.add_argument("--max-false-positives", type=float, default=0.05)
+    parser.add_argument("--max-error", type=float, default=0.02, help="mean landmark error (normalized)")
+    parser.add_argument("--max-latency-ms", type=float, default=50.0, help="p90 per-frame processing time")
+    parser.add_argument("--duty", type=float, default=0.7, help="share of the frame interval processing may use")
+    parser.add_argument("--max-frames", type=int)
+    parser.add_argument("--output", help=f"profile path (default {PROFILE_PATH})")
+    parser.add_argument("--report", help="write every run's metrics here as JSON")
+    args = parser.parse_args()
+
+    if args.record:
+        record_clip(args.record, args.seconds, args.camera)
+        return 0
+    if not args.clip:
+        parser.error("a clip is required (record one with --record)")
+    return calibrate(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,378 @@
+import argparse
+import enum
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+# Headless by default; both must be set before Qt and StateSyncClient read them
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("AEROUI_SYNC_URL", "")  # No backend: sync stays disabled
+
+import numpy as np
+from PySide6.QtCore import QObject, QThread, QTimer, Qt, Signal, Slot
+from PySide6.QtGui import QGuiApplication
+from PySide6.QtQuick import QQuickView, QQuickWindow, QSGRendererInterface
+import run_ui
+from eventlog import log, WARNING
+
+# --- Headless UI benchmark ---
+#
+# Runs the real GestureController, NetworkManager and SimpleMain.qml scene on
+# the offscreen platform. A replay thread stands in for GestureThread and
+# emits the same signals on a fixed, deterministic scenario: cursor moves and
+# preview frames at camera rate, a gesture every GESTURE_INTERVAL. Audio and
+# weather are stubbed and backend sync is off, so nothing needs a device or
+# the network. Reports rendered frame times, gesture -> binding update and
+# gesture/cursor -> next frame latencies, and memory.
+#
+#   python bench_ui.py --seconds 10 --json bench.json
+
+GESTURE_INTERVAL = 0.5  # Seconds between scripted gestures
+GESTURES = ("ROTATE_CW", "ROTATE_CW", "ROTATE_CCW", "FIST", "ROTATE_CW", "PINCH_CLICK")
+
+
+class StubPlayer(QObject):
+    """QMediaPlayer stand-in: no audio device or stream, only the state NetworkManager reads"""
+    PlaybackState = enum.Enum("PlaybackState", "StoppedState PlayingState PausedState", start=0)
+    durationChanged = Signal(int)
+    positionChanged = Signal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._playing = False
+
+    def setAudioOutput(self, output):
+        pass
+
+    def setSource(self, url):
+        self.durationChanged.emit(180000)
+
+    def play(self):
+        self._playing = True
+
+    def pause(self):
+        self._playing = False
+
+    def playbackState(self):
+        return self.PlaybackState.PlayingState if self._playing else self.PlaybackState.PausedState
+
+
+class StubAudioOutput(QObject):
+    def setVolume(self, volume):
+        pass
+
+
+class BenchNetworkManager(run_ui.NetworkManager):
+    def __init__(self):
+        super().__init__(player=StubPlayer(), audio_output=StubAudioOutput())
+
+    def _fetch_weather_loop(self):
+        pass  # No network
+
+
+class ReplaySource(QThread):
+    """GestureThread stand-in replaying the scripted scenario from its own thread"""
+    gesture_detected = Signal(str)
+    frame_captured = Signal()
+    cursor_moved = Signal(float, float)
+
+    def __init__(self, seconds, fps=30.0, frames=None, frame_size=(640, 480)):
+        super().__init__()
+        self.seconds = seconds
+        self.fps = fps
+        self.frames = frames  # Recorded RGB frames (autotune.load_clip), None for a synthetic pattern
+        self.frame_size = frame_size
+        self.latest_frame = None
+        self.emitted = {"cursor": [], "gesture": []}  # kind -> perf_counter of each emission, in order
+        self._running = False
+        self._go = threading.Event()
+
+    # GestureThread interface used by GestureController / the governor
+    def change_camera(self):
+        pass
+
+    def toggle_test_pattern(self):
+        pass
+
+    def set_quality(self, settings):
+        pass
+
+    def read_frame(self, use):
+        frame = self.latest_frame  # New arrays (or clip frames), never written to afterwards
+        if frame is None:
+            return False
+        use(frame)
+        return True
+
+    def play(self):
+        """Start the scenario (GestureController.start() runs the thread, which then waits for this)"""
+        self._go.set()
+
+    def stop(self):
+        self._running = False
+        self._go.set()
+        self.wait()
+
+    def _frame(self, index):
+        if self.frames:
+            return self.frames[index % len(self.frames)]
+        width, height = self.frame_size
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        bar = index * 8 % width
+        frame[:, bar:bar + 16] = (80, 200, 120)
+        return frame
+
+    def run(self):
+        self._running = True
+        self._go.wait()
+        started = time.perf_counter()
+        next_gesture = GESTURE_INTERVAL
+        gesture_index = 0
+        tick = 0
+        while self._running:
+            due = started + tick / self.fps
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            t = tick / self.fps
+            if t >= self.seconds:
+                break
+            # Cursor on a slow Lissajous path so it sweeps across the gesture targets
+            x = 0.5 + 0.42 * math.sin(2 * math.pi * 0.23 * t)
+            y = 0.5 + 0.38 * math.sin(2 * math.pi * 0.31 * t + 0.7)
+            self.latest_frame = self._frame(tick)
+            self.emitted["cursor"].append(time.perf_counter())
+            self.cursor_moved.emit(x, y)
+            self.frame_captured.emit()
+            if t >= next_gesture:
+                gesture = GESTURES[gesture_index % len(GESTURES)]
+                gesture_index += 1
+                next_gesture += GESTURE_INTERVAL
+                self.emitted["gesture"].append(time.perf_counter())
+                self.gesture_detected.emit(gesture)
+            tick += 1
+
+
+def percentiles(values, points=(50, 90, 99)):
+    """{"p50": ..., "max": ..., "count": n} in milliseconds for values in seconds"""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    result = {f"p{p}": round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000, 3)
+              for p in points}
+    result["max"] = round(ordered[-1] * 1000, 3)
+    result["mean"] = round(sum(ordered) / len(ordered) * 1000, 3)
+    result["count"] = len(ordered)
+    return result
+
+
+def memory_kb():
+    """{"rss": current, "peak": high water mark} in kB (Linux /proc, else ru_maxrss for both)"""
+    try:
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return {"rss": int(fields["VmRSS"].split()[0]), "peak": int(fields["VmHWM"].split()[0])}
+    except (OSError, KeyError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"rss": peak, "peak": peak}
+
+
+class Recorder(QObject):
+    """Timestamps frames and the GUI-thread side of every replayed signal"""
+
+    def __init__(self, source, view, network_manager, warmup):
+        super().__init__()
+        self.source = source
+        self.warmup_until = None
+        self.warmup = warmup
+        self.frame_swaps = []  # perf_counter of every frameSwapped
+        self.render_times = []  # beforeSynchronizing -> frameSwapped, seconds
+        self.binding = {}  # gesture -> [latency]
+        self.gesture_to_frame = []
+        self.cursor_to_frame = []
+        self.state_changes = 0
+        self._lock = threading.Lock()
+        self._sync_started = None
+        self._handled = {"cursor": 0, "gesture": 0}  # Next emission of each kind to pick up
+        self._unrendered_gestures = []  # emit times handled but not on screen yet
+        self._unrendered_cursor = None  # Oldest handled cursor move not on screen yet
+
+        # Connected after GestureController's own slots: queued events arrive in
+        # order, so these run once the controller, NetworkManager and the QML
+        # bindings they drive have all handled the same emission
+        source.gesture_detected.connect(self.on_gesture)
+        source.cursor_moved.connect(self.on_cursor)
+        network_manager.vehicleStateChanged.connect(self.on_state_changed)
+        network_manager.mediaStateChanged.connect(self.on_state_changed)
+        # Render-side signals may come from the render thread
+        view.beforeSynchronizing.connect(self.on_before_sync, Qt.DirectConnection)
+        view.frameSwapped.connect(self.on_frame_swapped, Qt.DirectConnection)
+
+    def _emitted_at(self, kind):
+        """Emission time of the signal being handled (queued signals arrive in order)"""
+        index = self._handled[kind]
+        self._handled[kind] += 1
+        return self.source.emitted[kind][index]
+
+    def _measuring(self, t):
+        if self.warmup_until is None:
+            self.warmup_until = t + self.warmup
+        return t >= self.warmup_until
+
+    @Slot(str)
+    def on_gesture(self, gesture):
+        now = time.perf_counter()
+        emitted = self._emitted_at("gesture")
+        if self._measuring(now):
+            self.binding.setdefault(gesture, []).append(now - emitted)
+            with self._lock:
+                self._unrendered_gestures.append(emitted)
+
+    @Slot(float, float)
+    def on_cursor(self, x, y):
+        now = time.perf_counter()
+        emitted = self._emitted_at("cursor")
+        if self._measuring(now):
+            with self._lock:
+                if self._unrendered_cursor is None:
+                    self._unrendered_cursor = emitted
+
+    @Slot()
+    def on_state_changed(self):
+        self.state_changes += 1
+
+    def on_before_sync(self):
+        self._sync_started = time.perf_counter()
+
+    def on_frame_swapped(self):
+        now = time.perf_counter()
+        if self.warmup_until is None or now < self.warmup_until:
+            return
+        self.frame_swaps.append(now)
+        if self._sync_started is not None:
+            self.render_times.append(now - self._sync_started)
+        with self._lock:
+            self.gesture_to_frame += [now - t for t in self._unrendered_gestures]
+            self._unrendered_gestures = []
+            if self._unrendered_cursor is not None:
+                self.cursor_to_frame.append(now - self._unrendered_cursor)
+                self._unrendered_cursor = None
+
+    def report(self):
+        intervals = [b - a for a, b in zip(self.frame_swaps, self.frame_swaps[1:])]
+        span = self.frame_swaps[-1] - self.frame_swaps[0] if len(self.frame_swaps) > 1 else 0.0
+        return {
+            "frames": len(self.frame_swaps),
+            "fps": round((len(self.frame_swaps) - 1) / span, 1) if span else 0.0,
+            "frame_interval_ms": percentiles(intervals),
+            "render_ms": percentiles(self.render_times),
+            "gesture_to_binding_ms": {gesture: percentiles(values) for gesture, values in sorted(self.binding.items())},
+            "gesture_to_frame_ms": percentiles(self.gesture_to_frame),
+            "cursor_to_frame_ms": percentiles(self.cursor_to_frame),
+            "state_changes": self.state_changes,
+        }
+
+
+def run(args):
+    timeline = {"start": memory_kb()}
+    if args.software:
+        QQuickWindow.setGraphicsApi(QSGRendererInterface.GraphicsApi.Software)
+    app = QGuiApplication(sys.argv[:1])
+    log.console_level = WARNING  # Keep per-gesture INFO lines out of the timing
+    log.start()
+
+    frames = None
+    if args.clip:
+        import autotune
+        frames, _ = autotune.load_clip(args.clip, max_frames=int(args.seconds * args.fps))
+    source = ReplaySource(args.seconds + args.warmup, args.fps, frames)
+    gesture_controller = run_ui.GestureController(thread=source)
+    network_manager = BenchNetworkManager()
+    gesture_controller.start()  # The replay then waits for play()
+    network_manager.start()  # Stub player only
+
+    load_started = time.perf_counter()
+    scene = run_ui.create_scene(gesture_controller, network_manager, args.qml)
+    view = scene.view
+    if view.status() == QQuickView.Error:
+        for error in view.errors():
+            print(error.toString(), file=sys.stderr)
+        log.stop()
+        return None
+    qml_load = time.perf_counter() - load_started
+    timeline["loaded"] = memory_kb()
+
+    recorder = Recorder(source, view, network_manager, args.warmup)
+    view.resize(args.width, args.height)
+    view.show()
+    QTimer.singleShot(0, source.play)
+    source.finished.connect(lambda: QTimer.singleShot(200, app.quit))  # Let the last frames land
+    app.exec()
+    source.stop()
+    timeline["end"] = memory_kb()
+    view.close()
+    del view, scene  # Tear the scene down while the singletons it binds to still exist
+    log.stop()
+
+    report = recorder.report()
+    report["qml_load_ms"] = round(qml_load * 1000, 1)
+    report["memory_kb"] = {"start": timeline["start"]["rss"], "after_load": timeline["loaded"]["rss"],
+                           "end": timeline["end"]["rss"], "peak": timeline["end"]["peak"]}
+    report["scenario"] = {"seconds": args.seconds, "warmup": args.warmup, "fps": args.fps,
+                          "size": [args.width, args.height], "qml": os.path.basename(args.qml),
+                          "clip": args.clip, "software": args.software,
+                          "platform": QGuiApplication.platformName()}
+    return report
+
+
+def print_report(report):
+    def line(name, stats):
+        if not stats.get("count"):
+            return f"  {name:<24} n/a"
+        return (f"  {name:<24} p50 {stats['p50']:8.2f}  p90 {stats['p90']:8.2f}  p99 {stats['p99']:8.2f}"
+                f"  max {stats['max']:8.2f} ms  (n={stats['count']})")
+
+    scenario = report["scenario"]
+    print(f"[Bench] {scenario['qml']} {scenario['size'][0]}x{scenario['size'][1]} on {scenario['platform']}, "
+          f"{scenario['seconds']}s after {scenario['warmup']}s warmup, input at {scenario['fps']} fps")
+    print(f"  QML load {report['qml_load_ms']} ms, {report['frames']} frames ({report['fps']} fps)")
+    print(line("frame interval", report["frame_interval_ms"]))
+    print(line("render (sync->swap)", report["render_ms"]))
+    for gesture, stats in report["gesture_to_binding_ms"].items():
+        print(line(f"{gesture} -> binding", stats))
+    print(line("gesture -> frame", report["gesture_to_frame_ms"]))
+    print(line("cursor -> frame", report["cursor_to_frame_ms"]))
+    memory = report["memory_kb"]
+    print(f"  memory RSS start {memory['start'] / 1024:.1f} MB, after load {memory['after_load'] / 1024:.1f} MB, "
+          f"end {memory['end'] / 1024:.1f} MB, peak {memory['peak'] / 1024:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless AeroUI frame time / latency / memory benchmark")
+    parser.add_argument("--seconds", type=float, default=10.0, help="measured duration")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds ignored at the start")
+    parser.add_argument("--fps", type=float, default=30.0, help="replayed camera rate")
+    parser.add_argument("--clip", help="replay preview frames from a recorded clip (autotune.py --record)")
+    parser.add_argument("--qml", default=run_ui.MAIN_QML, help="scene to load")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--rhi", dest="software", action="store_false",
+                        help="render with the default RHI backend instead of the software renderer")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = run(args)
+    if report is None:
+        sys.exit(1)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
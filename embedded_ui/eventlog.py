@@ -0,0 +1,157 @@
+import itertools
+import os
+import signal
+import sys
+import threading
+import time
+
+# --- Event log ---
+#
+# Callers only drop a tuple into a preallocated ring buffer; formatting and
+# console output happen on a background writer thread, so a slow terminal or
+# journald pipe never stalls the gesture thread or the GUI. The ring keeps the
+# last `capacity` events (including DEBUG ones that are not printed) for
+# dump(), e.g. on SIGUSR1 in the field.
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+
+def _parse_level(value, default):
+    if value is None:
+        return default
+    for level, name in LEVEL_NAMES.items():
+        if str(value).upper() == name:
+            return level
+    return int(value)
+
+
+class EventLog:
+    def __init__(self, capacity=4096, level=None, console_level=None, stream=None, flush_interval=0.2):
+        self.capacity = capacity
+        self.level = _parse_level(level or os.environ.get("AEROUI_LOG_RING_LEVEL"), DEBUG)  # Kept in the ring
+        self.console_level = _parse_level(console_level or os.environ.get("AEROUI_LOG_LEVEL"), INFO)  # Printed
+        self.stream = stream
+        self.flush_interval = flush_interval
+        self.dropped = 0  # Events overwritten before the writer got to them
+
+        self._ring = [None] * capacity  # (seq, timestamp, level, source, event, fields)
+        self._counter = itertools.count()  # next() is atomic under the GIL, so writers need no lock
+        self._head = 0  # Next sequence number to be claimed
+        self._written = 0  # Next sequence number the writer prints
+        self._samples = {}  # key -> calls seen
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    # --- Recording (any thread, never blocks) ---
+
+    def log(self, level, source, event, sample=None, **fields):
+        """Record an event; with sample=N only every Nth call for this source/event is kept."""
+        if level < self.level:
+            return
+        if sample:
+            key = (source, event)
+            seen = self._samples.get(key, 0)
+            self._samples[key] = seen + 1
+            if seen % sample:
+                return
+            fields["sampled"] = sample
+        seq = next(self._counter)
+        self._ring[seq % self.capacity] = (seq, time.time(), level, source, event, fields)
+        self._head = seq + 1
+        if level >= WARNING:
+            self._wakeup.set()
+
+    def debug(self, source, event, **fields):
+        self.log(DEBUG, source, event, **fields)
+
+    def info(self, source, event, **fields):
+        self.log(INFO, source, event, **fields)
+
+    def warning(self, source, event, **fields):
+        self.log(WARNING, source, event, **fields)
+
+    def error(self, source, event, **fields):
+        self.log(ERROR, source, event, **fields)
+
+    # --- Reading ---
+
+    @staticmethod
+    def format(entry):
+        seq, timestamp, level, source, event, fields = entry
+        clock = time.strftime("%H:%M:%S", time.localtime(timestamp)) + f".{int(timestamp % 1 * 1000):03d}"
+        details = " ".join(f"{key}={value}" for key, value in fields.items())
+        return f"{clock} {LEVEL_NAMES.get(level, level):<7} [{source}] {event}" + (f" {details}" if details else "")
+
+    def entries(self, n=None):
+        """The last n (default all) events still in the ring, oldest first."""
+        head = self._head
+        count = min(head, self.capacity) if n is None else min(n, head, self.capacity)
+        entries = []
+        for seq in range(head - count, head):
+            entry = self._ring[seq % self.capacity]
+            if entry is not None and entry[0] == seq:  # Skip slots already reused by newer events
+                entries.append(entry)
+        return entries
+
+    def dump(self, n=None):
+        return [self.format(entry) for entry in self.entries(n)]
+
+    def dump_to_file(self, path=None, n=None):
+        path = path or os.path.join(os.environ.get("AEROUI_LOG_DIR", "."),
+                                    time.strftime("aeroui-events-%Y%m%d-%H%M%S.log"))
+        with open(path, "w") as f:
+            f.write("\n".join(self.dump(n)) + "\n")
+        self.info("EventLog", "dumped", path=path)
+        return path
+
+    def install_dump_signal(self, signum=getattr(signal, "SIGUSR1", None)):
+        """Dump the ring to a file on a signal (POSIX only; call from the main thread)."""
+        if signum is not None:
+            signal.signal(signum, lambda *_: self.dump_to_file())
+
+    # --- Writer ---
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="aeroui-eventlog", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._wakeup.set()
+            thread.join(timeout=2.0)
+        self.flush()
+
+    def _run(self):
+        while self._thread is not None:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Print everything recorded since the last flush at console_level or above."""
+        head = self._head
+        lost = max(0, head - self._written - self.capacity)
+        self.dropped += lost
+        lines = [f"... {lost} events overwritten before they were printed"] if lost else []
+        seq = self._written + lost
+        while seq < head:
+            entry = self._ring[seq % self.capacity]
+            if entry is None or entry[0] < seq:
+                break  # Claimed but not stored yet, next flush picks it up
+            if entry[0] == seq and entry[2] >= self.console_level:
+                lines.append(self.format(entry))
+            seq += 1
+        self._written = seq
+        if lines:
+            stream = self.stream or sys.stdout
+            try:
+                stream.write("\n".join(lines) + "\n")
+                stream.flush()
+            except (OSError, ValueError):
+                pass  # Console gone; the ring still has everything
+
+
+log = EventLog()
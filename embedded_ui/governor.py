@@ -0,0 +1,150 @@
+import glob
+import os
+from PySide6.QtCore import QObject, QTimer, Property, Signal, Slot
+from eventlog import log
+
+# --- Quality governor ---
+#
+# Samples CPU load (/proc/stat) and the hottest thermal zone
+# (/sys/class/thermal/thermal_zone*/temp) and moves the gesture pipeline
+# through QUALITY_LEVELS: one level down after a few hot samples in a row,
+# one level up only after a longer cool streak and a minimum dwell time, so
+# it does not flap around a threshold. Both roots can point at a fake tree
+# (AEROUI_PROC_ROOT / AEROUI_SYSFS_ROOT).
+
+QUALITY_LEVELS = [
+    # processing_scale: share of the capture resolution fed to the landmarker
+    # interval_scale: multiplier on the calibrated frame interval
+    {"name": "HIGH", "processing_scale": 1.0, "interval_scale": 1.0, "preview": True, "overlay": True},
+    {"name": "MEDIUM", "processing_scale": 0.75, "interval_scale": 1.5, "preview": True, "overlay": True},
+    {"name": "LOW", "processing_scale": 0.5, "interval_scale": 2.0, "preview": True, "overlay": False},
+    {"name": "MINIMAL", "processing_scale": 0.5, "interval_scale": 3.0, "preview": False, "overlay": False},
+]
+
+
+class QualityGovernor(QObject):
+    levelChanged = Signal()
+    statsChanged = Signal()
+
+    def __init__(self, proc_root=None, sysfs_root=None, interval_ms=1000, parent=None):
+        super().__init__(parent)
+        self.proc_root = proc_root or os.environ.get("AEROUI_PROC_ROOT", "/proc")
+        self.sysfs_root = sysfs_root or os.environ.get("AEROUI_SYSFS_ROOT", "/sys")
+
+        # Thresholds: step down when either is exceeded, step up when both are clear
+        self.cpu_high = 0.85
+        self.cpu_low = 0.60
+        self.temp_high = 75.0  # Degrees C
+        self.temp_low = 65.0
+        self.down_samples = 2  # Consecutive hot samples before stepping down
+        self.up_samples = 5    # Consecutive cool samples before stepping up
+        self.min_dwell = 5     # Samples to stay at a level after any change
+
+        self._level = 0
+        self._hot = 0
+        self._cool = 0
+        self._since_change = self.min_dwell
+        self._cpu_load = 0.0
+        self._temperature = None
+        self._last_cpu = None  # (idle, total) jiffies
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.sample)
+
+    def start(self):
+        self._read_cpu()  # Baseline for the first delta
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+
+    # --- Sensors ---
+
+    def _read_cpu(self):
+        """Busy share of all CPUs since the previous call, None on the first one."""
+        try:
+            with open(os.path.join(self.proc_root, "stat")) as f:
+                values = [int(v) for v in f.readline().split()[1:]]
+        except (OSError, ValueError):
+            return None
+        idle = values[3] + (values[4] if len(values) > 4 else 0)  # idle + iowait
+        total = sum(values[:8])  # Guest time is already part of user
+        last, self._last_cpu = self._last_cpu, (idle, total)
+        if last is None or total == last[1]:
+            return None
+        return max(0.0, min(1.0, 1.0 - (idle - last[0]) / (total - last[1])))
+
+    def _read_temperature(self):
+        """Hottest thermal zone in degrees C, None if there are none."""
+        hottest = None
+        for path in glob.glob(os.path.join(self.sysfs_root, "class", "thermal", "thermal_zone*", "temp")):
+            try:
+                with open(path) as f:
+                    value = int(f.read().strip()) / 1000.0
+            except (OSError, ValueError):
+                continue
+            hottest = value if hottest is None else max(hottest, value)
+        return hottest
+
+    @Slot()
+    def sample(self):
+        cpu = self._read_cpu()
+        temperature = self._read_temperature()
+        if cpu is not None:
+            self._cpu_load = cpu
+        self._temperature = temperature
+        self.statsChanged.emit()
+        self.evaluate(self._cpu_load, temperature)
+
+    def evaluate(self, cpu, temperature):
+        """Feed one reading through the hysteresis; returns the (possibly new) level."""
+        hot = cpu >= self.cpu_high or (temperature is not None and temperature >= self.temp_high)
+        cool = cpu <= self.cpu_low and (temperature is None or temperature <= self.temp_low)
+        self._hot = self._hot + 1 if hot else 0
+        self._cool = self._cool + 1 if cool else 0
+        self._since_change += 1
+
+        if self._hot >= self.down_samples and self._level < len(QUALITY_LEVELS) - 1:
+            self._set_level(self._level + 1, cpu, temperature)
+        elif (self._cool >= self.up_samples and self._since_change >= self.min_dwell
+              and self._level > 0):
+            self._set_level(self._level - 1, cpu, temperature)
+        return self._level
+
+    def _set_level(self, level, cpu, temperature):
+        log.info("QualityGovernor", "level", old=QUALITY_LEVELS[self._level]["name"],
+                 new=QUALITY_LEVELS[level]["name"], cpu=f"{cpu:.0%}", temp=temperature)
+        self._level = level
+        self._hot = self._cool = self._since_change = 0
+        self.levelChanged.emit()
+
+    # --- QML ---
+
+    @property
+    def settings(self):
+        return QUALITY_LEVELS[self._level]
+
+    @Property(int, notify=levelChanged)
+    def level(self):
+        return self._level
+
+    @Property(str, notify=levelChanged)
+    def levelName(self):
+        return self.settings["name"]
+
+    @Property(int, constant=True)
+    def levelCount(self):
+        return len(QUALITY_LEVELS)
+
+    @Property(bool, notify=levelChanged)
+    def previewEnabled(self):
+        return self.settings["preview"]
+
+    @Property(float, notify=statsChanged)
+    def cpuLoad(self):
+        return self._cpu_load
+
+    @Property(float, notify=statsChanged)
+    def temperature(self):
+        return -1.0 if self._temperature is None else self._temperature
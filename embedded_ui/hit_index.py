@@ -0,0 +1,57 @@
+import math
+
+# --- Spatial index for gesture targets ---
+class HitGrid:
+    """Uniform grid of named scene rectangles for cursor hit-testing.
+
+    Every rectangle is bucketed into the cells it overlaps, so a lookup only
+    looks at the few rectangles sharing the cursor's cell. Where targets
+    overlap the smallest one (the most specific) wins.
+    """
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.rects = {}   # name -> (x, y, w, h)
+        self._cells = {}  # (col, row) -> set of names
+
+    def _span(self, rect):
+        x, y, w, h = rect
+        size = self.cell_size
+        return [(col, row)
+                for col in range(math.floor(x / size), math.floor((x + w) / size) + 1)
+                for row in range(math.floor(y / size), math.floor((y + h) / size) + 1)]
+
+    def set(self, name, x, y, w, h):
+        """Add or move a target; returns False if its rectangle did not change."""
+        rect = (x, y, w, h)
+        if self.rects.get(name) == rect:
+            return False
+        self.remove(name)
+        if w <= 0 or h <= 0:
+            return True
+        self.rects[name] = rect
+        for cell in self._span(rect):
+            self._cells.setdefault(cell, set()).add(name)
+        return True
+
+    def remove(self, name):
+        rect = self.rects.pop(name, None)
+        if rect is None:
+            return False
+        for cell in self._span(rect):
+            names = self._cells.get(cell)
+            if names is not None:
+                names.discard(name)
+                if not names:
+                    del self._cells[cell]
+        return True
+
+    def hit(self, px, py):
+        """Name of the target under (px, py), or "" if there is none."""
+        names = self._cells.get((math.floor(px / self.cell_size), math.floor(py / self.cell_size)))
+        best, best_area = "", None
+        for name in names or ():
+            x, y, w, h = self.rects[name]
+            if x <= px <= x + w and y <= py <= y + h and (best_area is None or w * h < best_area):
+                best, best_area = name, w * h
+        return best
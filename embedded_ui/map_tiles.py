@@ -0,0 +1,168 @@
+import json
+import math
+import os
+import queue
+import threading
+from collections import OrderedDict
+from PySide6.QtCore import QObject, Qt, Property, Slot
+from PySide6.QtGui import QImage
+from PySide6.QtQuick import QQuickImageProvider
+
+DEFAULT_SOURCE = os.path.join(os.path.dirname(__file__), "assets", "map_texture.png")
+DEFAULT_TILE_DIR = os.path.join(os.path.dirname(__file__), "assets", "tiles")
+DEFAULT_CACHE_MB = 32
+
+# --- Map tile pyramid ---
+#
+# Level 0 is the source at full resolution, every further level halves it
+# until the whole map fits in one tile. Tiles are stored as
+# <tile_dir>/<level>/<col>_<row>.png next to a meta.json describing the
+# pyramid, and served to QML as image://maptiles/<level>/<col>/<row>.
+
+def build_pyramid(source=DEFAULT_SOURCE, tile_dir=DEFAULT_TILE_DIR, tile_size=256):
+    """Cut the source image into tiles at every level; skipped while up to date."""
+    meta_path = os.path.join(tile_dir, "meta.json")
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta["tile_size"] == tile_size and meta["source_mtime"] == os.path.getmtime(source):
+            return meta
+    except (OSError, ValueError, KeyError):
+        pass
+
+    image = QImage(source)
+    if image.isNull():
+        raise ValueError(f"cannot load map source {source}")
+    width, height = image.width(), image.height()
+    levels = max(1, math.ceil(math.log2(max(width, height) / tile_size)) + 1)
+    print(f"[MapTiles] Building {levels} levels of {tile_size}px tiles from {source}")
+    for level in range(levels):
+        if level:
+            image = image.scaled(max(1, (image.width() + 1) // 2), max(1, (image.height() + 1) // 2),
+                                 Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+        os.makedirs(os.path.join(tile_dir, str(level)), exist_ok=True)
+        for col in range(math.ceil(image.width() / tile_size)):
+            for row in range(math.ceil(image.height() / tile_size)):
+                tile = image.copy(col * tile_size, row * tile_size,
+                                  min(tile_size, image.width() - col * tile_size),
+                                  min(tile_size, image.height() - row * tile_size))
+                tile.save(os.path.join(tile_dir, str(level), f"{col}_{row}.png"))
+
+    meta = {"width": width, "height": height, "tile_size": tile_size, "levels": levels,
+            "source_mtime": os.path.getmtime(source)}
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    return meta
+
+
+class TileCache:
+    """Decoded tiles in LRU order, bounded by their total size in bytes."""
+
+    def __init__(self, tile_dir, budget_bytes):
+        self.tile_dir = tile_dir
+        self.budget = budget_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._tiles = OrderedDict()  # (level, col, row) -> QImage
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._tiles
+
+    def get(self, key):
+        with self._lock:
+            image = self._tiles.get(key)
+            if image is not None:
+                self._tiles.move_to_end(key)
+                self.hits += 1
+                return image
+            self.misses += 1
+        # Decode outside the lock so the prefetcher and the QML loader run in parallel
+        level, col, row = key
+        image = QImage(os.path.join(self.tile_dir, str(level), f"{col}_{row}.png"))
+        if image.isNull():
+            return image
+        with self._lock:
+            if key not in self._tiles:
+                self._tiles[key] = image
+                self.bytes += image.sizeInBytes()
+                while self.bytes > self.budget and len(self._tiles) > 1:
+                    _, evicted = self._tiles.popitem(last=False)
+                    self.bytes -= evicted.sizeInBytes()
+        return image
+
+
+class TileImageProvider(QQuickImageProvider):
+    def __init__(self, cache):
+        super().__init__(QQuickImageProvider.Image)
+        self.cache = cache
+
+    def requestImage(self, id, size, requestedSize):
+        try:
+            level, col, row = (int(part) for part in id.split("?")[0].split("/"))
+        except ValueError:
+            return QImage()
+        return self.cache.get((level, col, row))
+
+
+class MapTiles(QObject):
+    """Tile pyramid metadata for QML plus the image provider and prefetcher."""
+
+    def __init__(self, source=DEFAULT_SOURCE, tile_dir=DEFAULT_TILE_DIR, cache_mb=None, parent=None):
+        super().__init__(parent)
+        if cache_mb is None:
+            cache_mb = float(os.environ.get("AEROUI_MAP_CACHE_MB", DEFAULT_CACHE_MB))
+        self.meta = build_pyramid(source, tile_dir)
+        self.cache = TileCache(tile_dir, int(cache_mb * 1024 * 1024))
+        self.provider = TileImageProvider(self.cache)
+        self._prefetch = queue.Queue()
+        self._prefetch_thread = threading.Thread(target=self._prefetch_loop, daemon=True)
+        self._prefetch_thread.start()
+
+    @Property(int, constant=True)
+    def mapWidth(self):
+        return self.meta["width"]
+
+    @Property(int, constant=True)
+    def mapHeight(self):
+        return self.meta["height"]
+
+    @Property(int, constant=True)
+    def tileSize(self):
+        return self.meta["tile_size"]
+
+    @Property(int, constant=True)
+    def levels(self):
+        return self.meta["levels"]
+
+    @Slot(int, int, int, int, int, float, float)
+    def prefetch(self, level, col0, row0, col1, row1, dx, dy):
+        """Warm the cache with the tiles just beyond the visible range in the pan direction."""
+        scale = 2 ** level
+        cols = math.ceil(self.meta["width"] / scale / self.meta["tile_size"])
+        rows = math.ceil(self.meta["height"] / scale / self.meta["tile_size"])
+        step_x = (dx > 0) - (dx < 0)
+        step_y = (dy > 0) - (dy < 0)
+        keys = set()
+        if step_x:
+            col = col1 + 1 if step_x > 0 else col0 - 1
+            keys.update((level, col, row) for row in range(row0, row1 + 1))
+        if step_y:
+            row = row1 + 1 if step_y > 0 else row0 - 1
+            keys.update((level, col, row) for col in range(col0 - abs(step_x), col1 + abs(step_x) + 1))
+        for key in keys:
+            if 0 <= key[1] < cols and 0 <= key[2] < rows and key not in self.cache:
+                self._prefetch.put(key)
+
+    def _prefetch_loop(self):
+        while True:
+            self.cache.get(self._prefetch.get())
+
+
+if __name__ == "__main__":
+    import sys
+    from PySide6.QtGui import QGuiApplication
+    app = QGuiApplication(sys.argv)
+    print(build_pyramid(*sys.argv[1:3]))
@@ -1,7 +1,6 @@
 import QtQuick
 import QtQuick.Layouts
 import QtQuick.Controls
-import QtMultimedia
 import AeroUI 1.0
 
 Item {
@@ -17,12 +16,6 @@ Item {
     property string activeControl: "temp" // 'temp' or 'volume'
     property date currentTime: new Date()
     
-    // Expose button references for gesture click detection
-    property alias tempButtonRef: tempButton
-    property alias volumeButtonRef: volumeButton
-    property alias musicPlayerPlayButtonRef: musicPlayer.playButtonRef
-    property alias musicPlayerPrevButtonRef: musicPlayer.prevButtonRef
-    property alias musicPlayerNextButtonRef: musicPlayer.nextButtonRef
     property alias map: navMap  // Expose Map for gesture control
     
     // Sync activeControl with NetworkManager
@@ -122,6 +115,7 @@ Item {
             NavigationMap { 
                 id: navMap
                 anchors.fill: parent 
+                GestureTarget { name: "map"; showHighlight: false }
             }
         }
 
@@ -167,6 +161,7 @@ Item {
                         anchors.fill: parent
                         onClicked: root.activeControl = "temp"
                     }
+                    GestureTarget { name: "temp" }
                 }
 
                 // Volume Shortcut
@@ -188,6 +183,7 @@ Item {
                         anchors.fill: parent
                         onClicked: root.activeControl = "volume"
                     }
+                    GestureTarget { name: "volume" }
                 }
             }
         }
@@ -0,0 +1,66 @@
+import QtQuick
+import AeroUI 1.0
+
+// Registers its parent's scene rectangle with GestureController's hit index
+// and outlines the parent while the virtual cursor hovers it. The rectangle is
+// only re-sent when the parent or one of its ancestors moves or resizes.
+Item {
+    id: root
+    anchors.fill: parent
+
+    property string name
+    property bool active: parent ? parent.visible : false
+    property bool showHighlight: true
+    property real radius: parent && parent.radius !== undefined ? parent.radius : 0
+    readonly property bool hovered: name !== "" && GestureController.hoveredTarget === name
+
+    property var _watched: []
+
+    function refresh() {
+        if (!parent || !active || name === "") {
+            GestureController.unregisterTarget(name)
+            return
+        }
+        var pos = parent.mapToItem(null, 0, 0)
+        GestureController.registerTarget(name, pos.x, pos.y, parent.width, parent.height)
+    }
+
+    function scheduleRefresh() {
+        Qt.callLater(root.refresh)
+    }
+
+    function watch(item, signalNames) {
+        for (var i = 0; i < signalNames.length; i++) {
+            item[signalNames[i]].connect(scheduleRefresh)
+            _watched.push([item, signalNames[i]])
+        }
+    }
+
+    Component.onCompleted: {
+        watch(parent, ["widthChanged", "heightChanged"])
+        for (var item = parent; item; item = item.parent) {
+            watch(item, ["xChanged", "yChanged"])
+        }
+        scheduleRefresh()
+    }
+
+    Component.onDestruction: {
+        for (var i = 0; i < _watched.length; i++) {
+            _watched[i][0][_watched[i][1]].disconnect(scheduleRefresh)
+        }
+        if (typeof GestureController.unregisterTarget === "function") // Gone already at shutdown
+            GestureController.unregisterTarget(name)
+    }
+
+    onActiveChanged: scheduleRefresh()
+
+    Rectangle {
+        anchors.fill: parent
+        anchors.margins: -3
+        radius: root.radius + 3
+        color: "transparent"
+        border.color: "#4CAF50"
+        border.width: 2
+        visible: root.showHighlight && root.hovered
+    }
+}
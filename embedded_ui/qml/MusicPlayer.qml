@@ -5,9 +5,6 @@ import AeroUI 1.0
 Rectangle {
     id: root
     property var mState: NetworkManager.mediaState || {}
-    property alias playButtonRef: playButton
-    property alias prevButtonRef: prevButton
-    property alias nextButtonRef: nextButton
     
     color: "#1f2937"
     radius: 20
@@ -149,6 +146,7 @@ Rectangle {
                     anchors.fill: parent
                     onClicked: NetworkManager.prevTrack()
                 }
+                GestureTarget { name: "prev" }
             }
             
             // Play/Pause
@@ -186,6 +184,7 @@ Rectangle {
                     anchors.fill: parent
                     onClicked: NetworkManager.togglePlayback()
                 }
+                GestureTarget { name: "play" }
             }
             
             // Next
@@ -214,6 +213,7 @@ Rectangle {
                     anchors.fill: parent
                     onClicked: NetworkManager.nextTrack()
                 }
+                GestureTarget { name: "next" }
             }
         }
         
@@ -1,41 +1,117 @@
 import QtQuick
 import QtQuick.Layouts
+import AeroUI 1.0
 
+// Tiled map: only the tiles overlapping the viewport are instantiated, at the
+// pyramid level matching the zoom, served by MapTiles (map_tiles.py).
 Rectangle {
     id: mapRoot
     clip: true
     color: "#0f172a" // Background color if you pan too far
 
+    property real mapSize: 2048 // Longest map side on screen at zoom 1
+    property real zoom: 1.0
+    // Screen pixels per source pixel
+    readonly property real pixelScale: mapSize / Math.max(MapTiles.mapWidth, MapTiles.mapHeight) * zoom
+    // Coarsest level that still has at least one source pixel per screen pixel
+    readonly property int level: Math.max(0, Math.min(MapTiles.levels - 1,
+                                                      Math.floor(-Math.log(pixelScale) / Math.LN2)))
+    readonly property real tileSpan: MapTiles.tileSize * Math.pow(2, level) * pixelScale
+
+    property real lastContentX: 0
+    property real lastContentY: 0
+
     function pan(dx, dy) {
         flick.contentX -= dx * 4  // Sensitvity multiplier
         flick.contentY -= dy * 4
     }
 
+    function setZoom(value) {
+        value = Math.max(0.5, Math.min(3.0, value))
+        // Zoom around the center of the viewport
+        var cx = (flick.contentX + flick.width / 2) / zoom
+        var cy = (flick.contentY + flick.height / 2) / zoom
+        zoom = value
+        flick.contentX = cx * zoom - flick.width / 2
+        flick.contentY = cy * zoom - flick.height / 2
+    }
+
+    function updateTiles() {
+        if (flick.width <= 0 || flick.height <= 0)
+            return
+        var levelScale = Math.pow(2, level)
+        var cols = Math.ceil(MapTiles.mapWidth / levelScale / MapTiles.tileSize)
+        var rows = Math.ceil(MapTiles.mapHeight / levelScale / MapTiles.tileSize)
+        var col0 = Math.max(0, Math.floor(flick.contentX / tileSpan))
+        var row0 = Math.max(0, Math.floor(flick.contentY / tileSpan))
+        var col1 = Math.min(cols - 1, Math.floor((flick.contentX + flick.width) / tileSpan))
+        var row1 = Math.min(rows - 1, Math.floor((flick.contentY + flick.height) / tileSpan))
+
+        var wanted = {}
+        for (var col = col0; col <= col1; col++)
+            for (var row = row0; row <= row1; row++)
+                wanted[level + "/" + col + "/" + row] = [col, row]
+        // Keep tiles that stay visible, so only newly exposed ones are decoded
+        for (var i = visibleTiles.count - 1; i >= 0; i--) {
+            var key = visibleTiles.get(i).key
+            if (wanted[key])
+                delete wanted[key]
+            else
+                visibleTiles.remove(i)
+        }
+        for (key in wanted)
+            visibleTiles.append({ key: key, level: level, col: wanted[key][0], row: wanted[key][1] })
+
+        MapTiles.prefetch(level, col0, row0, col1, row1,
+                          flick.contentX - lastContentX, flick.contentY - lastContentY)
+        lastContentX = flick.contentX
+        lastContentY = flick.contentY
+    }
+
+    onLevelChanged: Qt.callLater(updateTiles)
+    onZoomChanged: Qt.callLater(updateTiles)
+    onWidthChanged: Qt.callLater(updateTiles)
+    onHeightChanged: Qt.callLater(updateTiles)
+
+    ListModel { id: visibleTiles }
+
     Flickable {
         id: flick
         anchors.fill: parent
-        contentWidth: mapContainer.width * mapContainer.scale
-        contentHeight: mapContainer.height * mapContainer.scale
+        contentWidth: mapContainer.width
+        contentHeight: mapContainer.height
         
         // Panning (Flickable handles drag)
         interactive: true
         boundsBehavior: Flickable.StopAtBounds
 
-        // Container for Zooming
+        onContentXChanged: Qt.callLater(mapRoot.updateTiles)
+        onContentYChanged: Qt.callLater(mapRoot.updateTiles)
+
         Item {
             id: mapContainer
-            width: mapImage.width
-            height: mapImage.height
+            width: MapTiles.mapWidth * mapRoot.pixelScale
+            height: MapTiles.mapHeight * mapRoot.pixelScale
 
-            // The Map Texture
+            // Whole map from the top level, shown until the detailed tiles are decoded
             Image {
-                id: mapImage
-                source: "../assets/map_texture.png"
-                width: 2048 // Assume high res or stretch
-                height: 2048
-                fillMode: Image.PreserveAspectCrop
+                anchors.fill: parent
+                source: "image://maptiles/" + (MapTiles.levels - 1) + "/0/0"
                 smooth: true
-                antialiasing: true
+            }
+
+            Repeater {
+                model: visibleTiles
+                delegate: Image {
+                    x: model.col * mapRoot.tileSpan
+                    y: model.row * mapRoot.tileSpan
+                    width: Math.min(mapRoot.tileSpan, mapContainer.width - x)
+                    height: Math.min(mapRoot.tileSpan, mapContainer.height - y)
+                    source: "image://maptiles/" + model.key
+                    asynchronous: true
+                    cache: false // MapTiles keeps its own bounded cache
+                    smooth: true
+                }
             }
 
             // "You Are Here" Marker (Standard Blue Dot)
@@ -73,50 +149,16 @@ Rectangle {
                     }
                 }
             }
-            
-            // Initial Transform
-            transform: Scale {
-                id: mapScale
-                origin.x: flick.contentX + flick.width / 2
-                origin.y: flick.contentY + flick.height / 2
-                xScale: 1.0
-                yScale: 1.0
-            }
         }
 
         // Pinch Area
         PinchArea {
             anchors.fill: parent
             
-            property real initialScale
-            property real initialWidth
-            property real initialHeight
+            property real initialZoom
 
-            onPinchStarted: {
-                initialScale = mapScale.xScale
-            }
-
-            onPinchUpdated: (pinch) => {
-                // Determine new scale
-                var scale = initialScale * pinch.scale
-                
-                // Limits
-                if (scale < 0.5) scale = 0.5
-                if (scale > 3.0) scale = 3.0
-                
-                // Set scale
-                mapScale.xScale = scale
-                mapScale.yScale = scale
-                
-                // Optional: Adjust content position to zoom towards center?
-                // Flickable + Scale Transform is simpler if we just scale.
-                // For proper pinch-zoom-center, we usually need simpler Item-based transform, 
-                // but Flickable + Scale works for basic needs.
-                
-                // Update content sizing
-                flick.contentWidth = mapContainer.width * scale
-                flick.contentHeight = mapContainer.height * scale
-            }
+            onPinchStarted: initialZoom = mapRoot.zoom
+            onPinchUpdated: (pinch) => mapRoot.setZoom(initialZoom * pinch.scale)
         }
         
         Component.onCompleted: {
@@ -147,10 +189,9 @@ Rectangle {
             anchors.fill: parent
             onClicked: {
                 // Recenter
-                flick.contentX = (mapContainer.width * mapScale.xScale - flick.width) / 2
-                flick.contentY = (mapContainer.height * mapScale.yScale - flick.height) / 2
-                mapScale.xScale = 1.0
-                mapScale.yScale = 1.0
+                mapRoot.zoom = 1.0
+                flick.contentX = (mapContainer.width - flick.width) / 2
+                flick.contentY = (mapContainer.height - flick.height) / 2
             }
         }
     }
@@ -18,103 +18,30 @@ Rectangle {
         anchors.fill: parent
     }
     
-    // Handle gesture clicks
+    onWidthChanged: GestureController.setSceneSize(width, height)
+    onHeightChanged: GestureController.setSceneSize(width, height)
+    Component.onCompleted: GestureController.setSceneSize(width, height)
+
+    // Handle gesture clicks (targets register themselves, see GestureTarget.qml)
     Connections {
         target: GestureController
-        function onClickDetected() {
-            // Get cursor position in screen coordinates
-            var cursorX = GestureController.cursorX * root.width
-            var cursorY = GestureController.cursorY * root.height
-            
-            console.log("Click detected at cursor position:", cursorX, cursorY)
-            
-            // Check if cursor is over temp button
-            if (dashboard.tempButtonRef) {
-                var tempPos = dashboard.tempButtonRef.mapToItem(root, 0, 0)
-                var tempBounds = {
-                    x: tempPos.x,
-                    y: tempPos.y,
-                    width: dashboard.tempButtonRef.width,
-                    height: dashboard.tempButtonRef.height
-                }
-                console.log("TEMP button bounds:", tempBounds.x, tempBounds.y, tempBounds.width, tempBounds.height)
-                
-                if (cursorX >= tempPos.x && cursorX <= tempPos.x + dashboard.tempButtonRef.width &&
-                    cursorY >= tempPos.y && cursorY <= tempPos.y + dashboard.tempButtonRef.height) {
-                    console.log("✓ Clicked TEMP button via gesture")
-                    dashboard.activeControl = "temp"
-                    return
-                }
-            }
-            
-            // Check if cursor is over volume button
-            if (dashboard.volumeButtonRef) {
-                var volPos = dashboard.volumeButtonRef.mapToItem(root, 0, 0)
-                var volBounds = {
-                    x: volPos.x,
-                    y: volPos.y,
-                    width: dashboard.volumeButtonRef.width,
-                    height: dashboard.volumeButtonRef.height
-                }
-                console.log("VOL button bounds:", volBounds.x, volBounds.y, volBounds.width, volBounds.height)
-                
-                if (cursorX >= volPos.x && cursorX <= volPos.x + dashboard.volumeButtonRef.width &&
-                    cursorY >= volPos.y && cursorY <= volPos.y + dashboard.volumeButtonRef.height) {
-                    console.log("✓ Clicked VOLUME button via gesture")
-                    dashboard.activeControl = "volume"
-                    return
-                }
+        function onTargetClicked(name) {
+            console.log("Gesture click on target:", name)
+            switch (name) {
+            case "temp":
+            case "volume":
+                dashboard.activeControl = name
+                break
+            case "play":
+                NetworkManager.togglePlayback()
+                break
+            case "prev":
+                NetworkManager.prevTrack()
+                break
+            case "next":
+                NetworkManager.nextTrack()
+                break
             }
-            
-            // Check Music Player Controls
-            console.log("Checking Music Player buttons...")
-            
-            // Play/Pause
-            if (dashboard.musicPlayerPlayButtonRef) {
-                var pos = dashboard.musicPlayerPlayButtonRef.mapToItem(root, 0, 0)
-                console.log("PLAY Button Bounds:", pos.x, pos.y, dashboard.musicPlayerPlayButtonRef.width, dashboard.musicPlayerPlayButtonRef.height)
-                
-                if (cursorX >= pos.x && cursorX <= pos.x + dashboard.musicPlayerPlayButtonRef.width &&
-                    cursorY >= pos.y && cursorY <= pos.y + dashboard.musicPlayerPlayButtonRef.height) {
-                    console.log("✓ Clicked PLAY button via gesture")
-                    NetworkManager.togglePlayback()
-                    return
-                }
-            } else {
-                console.log("PLAY button ref is null/undefined")
-            }
-
-            // Previous Track
-            if (dashboard.musicPlayerPrevButtonRef) {
-                var pos = dashboard.musicPlayerPrevButtonRef.mapToItem(root, 0, 0)
-                console.log("PREV Button Bounds:", pos.x, pos.y, dashboard.musicPlayerPrevButtonRef.width, dashboard.musicPlayerPrevButtonRef.height)
-
-                if (cursorX >= pos.x && cursorX <= pos.x + dashboard.musicPlayerPrevButtonRef.width &&
-                    cursorY >= pos.y && cursorY <= pos.y + dashboard.musicPlayerPrevButtonRef.height) {
-                    console.log("✓ Clicked PREV button via gesture")
-                    NetworkManager.prevTrack()
-                    return
-                }
-            } else {
-                console.log("PREV button ref is null/undefined")
-            }
-
-            // Next Track
-            if (dashboard.musicPlayerNextButtonRef) {
-                var pos = dashboard.musicPlayerNextButtonRef.mapToItem(root, 0, 0)
-                console.log("NEXT Button Bounds:", pos.x, pos.y, dashboard.musicPlayerNextButtonRef.width, dashboard.musicPlayerNextButtonRef.height)
-
-                if (cursorX >= pos.x && cursorX <= pos.x + dashboard.musicPlayerNextButtonRef.width &&
-                    cursorY >= pos.y && cursorY <= pos.y + dashboard.musicPlayerNextButtonRef.height) {
-                    console.log("✓ Clicked NEXT button via gesture")
-                    NetworkManager.nextTrack()
-                    return
-                }
-            } else {
-                console.log("NEXT button ref is null/undefined")
-            }
-            
-            console.log("✗ Click missed all buttons")
         }
     }
     
@@ -138,7 +65,7 @@ Rectangle {
         border.color: "white"
         border.width: 2
         radius: 10
-        visible: GestureController.isCameraVisible
+        visible: GestureController.isCameraVisible && QualityGovernor.previewEnabled
         z: 99 // On top of everything
         
         property int frameCounter: 0
@@ -147,6 +74,7 @@ Rectangle {
             id: camFeed
             anchors.fill: parent
             fillMode: Image.PreserveAspectCrop
+            mirror: true // Selfie view; frames arrive in camera orientation
             source: "image://live_camera/feed?id=" + parent.frameCounter
             cache: false 
         }
@@ -175,7 +103,7 @@ Rectangle {
         anchors.bottom: parent.bottom
         anchors.horizontalCenter: parent.horizontalCenter
         anchors.bottomMargin: 10
-        width: 400
+        width: 520
         height: 30
         radius: 15
         color: "#cc000000" // Semi-transparent black
@@ -195,6 +123,12 @@ Rectangle {
                 color: gestureDisplay.text !== "NONE" ? "#22c55e" : "#888888"
                 font.bold: true
             }
+            Text {
+                // Gesture pipeline quality, lowered by QualityGovernor when the SoC is busy or hot
+                text: "Q:" + QualityGovernor.levelName
+                color: QualityGovernor.level === 0 ? "#888888" : "#f59e0b"
+                font.bold: true
+            }
             Text {
                 text: "(F/O: Mute | P: Click | Arrows: Move Cursor | C: Cam | T: Test)"
                 color: "#555555"
@@ -215,31 +149,7 @@ Rectangle {
             
             if (gesture === "PINCH_CLICK") {
                 root.isPinching = true
-                root.isPinchingMap = false // Reset first
-                
-                if (dashboard.map) {
-                     var mapPos = dashboard.map.mapToItem(root, 0, 0)
-                     var cx = GestureController.cursorX * root.width
-                     var cy = GestureController.cursorY * root.height
-                     var mapW = dashboard.map.width
-                     var mapH = dashboard.map.height
-                     
-                     console.log("PINCH CHECK: Cursor(", cx, cy, ") MapBounds(", mapPos.x, mapPos.y, mapW, mapH, ")")
-                     
-                     if (cx >= mapPos.x && cx <= mapPos.x + mapW &&
-                         cy >= mapPos.y && cy <= mapPos.y + mapH) {
-                         console.log(" -> INSIDE MAP")
-                         root.isPinchingMap = true
-                     } else {
-                         console.log(" -> OUTSIDE MAP")
-                     }
-                }
-
-                // Existing click logic seems to be handled by onClickDetected signal 
-                // or similar mechanism. We just track state here.
-                if (typeof onClickDetected === "function") {
-                    onClickDetected() 
-                }
+                root.isPinchingMap = GestureController.hoveredTarget === "map"
             }
             if (gesture === "PINCH_END") {
                 root.isPinching = false
@@ -7,6 +7,7 @@ Item {
     
     // Click animation state
     property bool isClicking: false
+    property bool isHovering: GestureController.hoveredTarget !== ""
     
     // Listen for click events
     Connections {
@@ -23,7 +24,7 @@ Item {
         width: 30
         height: 30
         radius: 15
-        color: root.isClicking ? "#FF5722" : "#4CAF50"  // Red when clicking, green otherwise
+        color: root.isClicking ? "#FF5722" : root.isHovering ? "#03A9F4" : "#4CAF50"  // Red when clicking, blue over a target, green otherwise
         border.color: "#FFFFFF"
         border.width: root.isClicking ? 5 : 3
         opacity: 0.8
@@ -1,17 +1,64 @@
+from startup import timeline, configure_qml_cache  # First: everything below counts towards the cold start
 import sys
 import os
-import cv2
 import time
 import math
-import numpy as np
-from PySide6.QtGui import QGuiApplication
+from PySide6.QtGui import QGuiApplication, QImage, QColor
 from PySide6.QtQml import QQmlApplicationEngine, qmlRegisterSingletonInstance
 from PySide6.QtCore import QObject, QUrl, Signal, Slot, Property, QThread, Qt
-from PySide6.QtQuick import QQuickView
-from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
-import urllib.request
+from PySide6.QtQuick import QQuickView, QQuickImageProvider
+timeline.mark("import_qt")
 import json
 import threading
+from collections import namedtuple
+from state_sync import StateSyncClient
+from state_schema import VEHICLE, MEDIA
+from hit_index import HitGrid
+from map_tiles import MapTiles
+from governor import QualityGovernor, QUALITY_LEVELS
+from eventlog import log
+timeline.mark("import_app")
+
+# Heavy or late-needed modules stay out of the cold start: OpenCV, NumPy and
+# autotune (which imports both) load on the gesture thread via load_vision(),
+# QtMultimedia in NetworkManager.start_media() and urllib in the weather thread.
+cv2 = np = autotune = None
+
+
+def load_vision():
+    global cv2, np, autotune
+    if autotune is None:
+        import cv2
+        import numpy as np
+        import autotune
+        timeline.mark("import_vision")
+
+
+# --- Frame preprocessing ---
+# Frames stay in camera orientation: the detector gets them as captured, the
+# selfie-view logic works on landmarks mirrored here, and the preview is
+# mirrored by the QML Image. Overlays are drawn at un-mirrored positions
+# (text pre-flipped) so they line up once displayed.
+Landmark = namedtuple("Landmark", "x y z")
+
+
+def mirror_landmarks(landmarks):
+    return [Landmark(1.0 - p.x, p.y, p.z) for p in landmarks]
+
+
+def put_mirrored_text(image, text, org, font, scale, color, thickness):
+    """cv2.putText at display position org, readable once the image is shown mirrored"""
+    (text_w, text_h), baseline = cv2.getTextSize(text, font, scale, thickness)
+    h, w = image.shape[:2]
+    x0, x1 = max(0, org[0]), min(w, org[0] + text_w)
+    y0, y1 = max(0, org[1] - text_h - thickness), min(h, org[1] + baseline)
+    if x0 >= x1 or y0 >= y1:
+        return
+    roi = image[y0:y1, w - x1:w - x0]
+    patch = np.ascontiguousarray(roi[:, ::-1])  # Only the text's box gets flipped
+    cv2.putText(patch, text, (org[0] - x0, org[1] - y0), font, scale, color, thickness)
+    roi[:] = patch[:, ::-1]
+
 
 # --- Gesture Recognition Logic (Mocking the C++ port in Python) ---
 class GestureThread(QThread):
@@ -22,10 +69,17 @@ class GestureThread(QThread):
     def __init__(self, camera_index=0): # Scan from 0
         super().__init__()
         self.running = True
+        self.profile = None  # Loaded with the landmarker in _setup(), on this thread
+        self.frame_interval = None
+        self.quality = QUALITY_LEVELS[0]  # Stepped by QualityGovernor under load
         self.mp_hands = None
         self.hands = None
         self.cap = None
         self.latest_frame = None
+        self._rgb_buffers = []  # Reused conversion targets, see _next_rgb_buffer
+        self._rgb_index = 0
+        self._frame_lock = threading.Lock()  # Guards latest_frame / _reading against buffer reuse
+        self._reading = None  # Buffer the GUI is copying right now, see read_frame
         self.camera_index = camera_index
         self.black_frame_count = 0
         self.current_brightness = 0.0 # Debug info
@@ -47,26 +101,23 @@ class GestureThread(QThread):
         # Depth filtering (invisible plane)
         self.min_hand_size = 0.2  # Minimum hand size (wrist to middle fingertip) to be recognized
                                     # Smaller hands are too far away and will be ignored
-        
+
+    def _setup(self):
+        """Vision imports, device profile and landmarker, done on this thread so the GUI never waits on them"""
+        load_vision()
+        self.profile = autotune.load_profile()  # Calibrated by autotune.py for this device
+        self.frame_interval = self.profile["frame_interval"]
         try:
             import mediapipe as mp
-            from mediapipe.tasks import python
-            from mediapipe.tasks.python import vision
             
             # Use the new MediaPipe Tasks API
-            base_options = python.BaseOptions(model_asset_path='hand_landmarker.task')
-            options = vision.HandLandmarkerOptions(
-                base_options=base_options,
-                num_hands=1,
-                min_hand_detection_confidence=0.7,
-                min_hand_presence_confidence=0.7,
-                min_tracking_confidence=0.5
-            )
-            self.hands = vision.HandLandmarker.create_from_options(options)
+            self.hands = autotune.create_landmarker(self.profile)
             self.mp_hands = mp  # Store for landmark constants
-            print("MediaPipe HandLandmarker initialized successfully (Tasks API).")
+            log.info("GestureThread", "landmarker_ready", model=self.profile["model"],
+                     delegate=self.profile["delegate"], mode=self.profile["running_mode"])
+            timeline.mark("landmarker_ready")
         except Exception as e:
-            print(f"WARNING: MediaPipe initialization failed. Gesture recognition will be DISABLED. Error: {e}")
+            log.warning("GestureThread", "mediapipe_unavailable", error=repr(e), gestures="disabled")
             self.mp_hands = None
             self.hands = None
 
@@ -76,35 +127,43 @@ class GestureThread(QThread):
         if self.cap and self.cap.isOpened():
             self.cap.release()
             
+    def set_quality(self, settings):
+        self.quality = settings  # Read once per frame by the loop, a plain swap is enough
+
     def toggle_test_pattern(self):
         self.manual_test_pattern = not self.manual_test_pattern
 
     def run(self):
+        self._setup()
         # Even if MediaPipe fails, we can still run the loop to keep the thread alive for Camera Feed
         if not self.hands:
-            print("GestureThread running (MediaPipe Disabled - Camera Only Mode)")
+            log.info("GestureThread", "running", mediapipe=False)  # Camera only
         else:
-            print("GestureThread running (MediaPipe Enabled)")
+            log.info("GestureThread", "running", mediapipe=True)
 
         while self.running:
-            print(f"Attempting to open camera index {self.camera_index} (Auto Backend)...")
+            log.info("GestureThread", "camera_opening", index=self.camera_index)
             # Remove specific backend flags to allow OpenCV to auto-negotiate
             self.cap = cv2.VideoCapture(self.camera_index)
+            if self.profile["width"] and self.cap.isOpened():
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.profile["width"])
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.profile["height"])
             
             # Test Pattern Logic
             self.use_test_pattern = self.manual_test_pattern
             if not self.use_test_pattern:
                 if not self.cap.isOpened():
-                     print(f"ERROR: Could not open camera {self.camera_index}. Switching to Test Pattern.")
+                     log.error("GestureThread", "camera_unavailable", index=self.camera_index, fallback="test_pattern")
                      self.use_test_pattern = True
                 else:
-                     print(f"Camera {self.camera_index} opened successfully.")
+                     log.info("GestureThread", "camera_opened", index=self.camera_index)
             
             frame_count = 0
             current_idx = self.camera_index
             
             # Inner loop: Check if camera index changed
             while self.running and self.camera_index == current_idx:
+                frame_started = time.perf_counter()
                 # Check for manual override update
                 if self.manual_test_pattern != self.use_test_pattern and self.manual_test_pattern:
                      self.use_test_pattern = True
@@ -116,8 +175,8 @@ class GestureThread(QThread):
                         ((math.cos(frame_count * 0.1) + 1) * 127 * np.ones((480, 640), dtype=np.uint8)).astype(np.uint8),
                         np.zeros((480, 640), dtype=np.uint8)
                     ])
-                    # Add text
-                    cv2.putText(image, f"TEST PATTERN (Idx: {self.camera_index})", (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+                    # Add text (pre-flipped, the preview is mirrored)
+                    put_mirrored_text(image, f"TEST PATTERN (Idx: {self.camera_index})", (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
                     success = True
                     self.current_brightness = 128.0
                     time.sleep(0.033)
@@ -125,15 +184,11 @@ class GestureThread(QThread):
                     success, image = self.cap.read()
                 
                 if not success:
-                    if frame_count % 100 == 0:
-                         print("Warning: Failed to read frame from camera.")
+                    log.warning("GestureThread", "frame_read_failed", sample=100, index=self.camera_index)
                     frame_count += 1
                     time.sleep(0.1)
                     continue
 
-                # Flip for selfie view
-                image = cv2.flip(image, 1)
-                
                 # Calculate mean brightness for debug/auto-switch
                 mean_val = np.mean(image)
                 self.current_brightness = mean_val
@@ -149,15 +204,16 @@ class GestureThread(QThread):
                          if mean_val < 2.0: # Extremely low threshold for PITCH BLACK
                              self.black_frame_count += 1
                              if self.black_frame_count > 15: # ~0.5 seconds
-                                 print(f"WARNING: Camera {self.camera_index} is black (Val: {mean_val:.2f}). Auto-switching...")
+                                 log.warning("GestureThread", "camera_black", index=self.camera_index,
+                                             brightness=round(float(mean_val), 2))
                                  self.black_frame_count = 0
                                  self.change_camera()
                                  break # Break inner loop
                          else:
                              self.black_frame_count = 0
 
-                # Convert to RGB for processing and display
-                image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+                # Convert to RGB for processing and display, in camera orientation
+                image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=self._next_rgb_buffer(image))
                 
                 frame_count += 1
 
@@ -166,14 +222,20 @@ class GestureThread(QThread):
                         # Convert to MediaPipe Image format
                         import mediapipe as mp
                         import math
-                        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=image_rgb)
+                        detect_rgb = image_rgb
+                        scale = self.quality["processing_scale"]
+                        if scale < 1.0:  # Throttled: run the landmarker on a smaller copy
+                            detect_rgb = cv2.resize(image_rgb, None, fx=scale, fy=scale,
+                                                    interpolation=cv2.INTER_AREA)
+                        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=detect_rgb)
                         
                         # Detect hand landmarks
-                        detection_result = self.hands.detect(mp_image)
+                        detection_result = autotune.detect(self.hands, self.profile, mp_image,
+                                                           time.monotonic() * 1000)
                         
                         if detection_result.hand_landmarks:
                             for hand_landmarks in detection_result.hand_landmarks:
-                                landmarks = hand_landmarks
+                                landmarks = mirror_landmarks(hand_landmarks)  # Selfie view
                                 
                                 # Depth filtering: Calculate hand size to determine if hand is too far
                                 wrist = landmarks[0]  # Wrist
@@ -189,16 +251,19 @@ class GestureThread(QThread):
                                 # Skip this hand if it's too small (too far away)
                                 # Threshold adjusted ~0.08 for palm length (approx corresponds to 0.2 full hand)
                                 if hand_scale < 0.08:
+                                    if not self.quality["overlay"]:
+                                        continue
                                     # Draw a red X on the image to show hand is too far
                                     h, w, _ = image_rgb.shape
                                     center_x = int((wrist.x + middle_mcp.x) / 2 * w)
                                     center_y = int((wrist.y + middle_mcp.y) / 2 * h)
-                                    cv2.putText(image_rgb, "TOO FAR", (center_x - 40, center_y), 
-                                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
-                                    cv2.line(image_rgb, (center_x - 30, center_y - 30), 
-                                            (center_x + 30, center_y + 30), (255, 0, 0), 3)
-                                    cv2.line(image_rgb, (center_x + 30, center_y - 30), 
-                                            (center_x - 30, center_y + 30), (255, 0, 0), 3)
+                                    put_mirrored_text(image_rgb, "TOO FAR", (center_x - 40, center_y), 
+                                                      cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
+                                    image_x = w - center_x  # The X is symmetric, only its center moves
+                                    cv2.line(image_rgb, (image_x - 30, center_y - 30), 
+                                            (image_x + 30, center_y + 30), (255, 0, 0), 3)
+                                    cv2.line(image_rgb, (image_x + 30, center_y - 30), 
+                                            (image_x - 30, center_y + 30), (255, 0, 0), 3)
                                     continue  # Skip to next hand (if any)
                                 
                                 # Emit cursor position based on MIDPOINT of stick (Index Tip & Thumb Tip)
@@ -212,6 +277,7 @@ class GestureThread(QThread):
                                 index_tip_y = max(0.0, min(1.0, (raw_y - margin) / (1 - 2 * margin)))
                                 
                                 self.cursor_moved.emit(index_tip_x, index_tip_y)
+                                log.debug("GestureThread", "cursor", sample=30, x=round(index_tip_x, 3), y=round(index_tip_y, 3))
                                 
                                 # Detect pinch gesture (thumb tip to index finger tip distance)
                                 thumb_tip = landmarks[4]  # Thumb tip
@@ -232,14 +298,14 @@ class GestureThread(QThread):
                                         self.is_pinching = True
                                         self.last_pinch_time = current_time
                                         self.gesture_detected.emit("PINCH_CLICK")
-                                        print(f"[GestureThread] Pinch detected! Distance: {pinch_distance:.3f}")
+                                        log.info("GestureThread", "pinch", distance=round(pinch_distance, 3))
                                 else:
                                     # Fingers separated - reset pinch state
                                     if pinch_distance > self.pinch_threshold * 1.5:  # Hysteresis
                                         if self.is_pinching:
                                             self.is_pinching = False
                                             self.gesture_detected.emit("PINCH_END")
-                                            print("[GestureThread] Pinch released")
+                                            log.info("GestureThread", "pinch_released")
                                 
                                 # Calculate hand center (using wrist and middle finger base)
                                 hand_center_x = (landmarks[0].x + landmarks[9].x) / 2
@@ -314,51 +380,8 @@ class GestureThread(QThread):
                                     self.gesture_detected.emit("FIST")
                                 
                                 # Draw hand landmarks on the image
-                                h, w, _ = image_rgb.shape
-                                for idx, landmark in enumerate(landmarks):
-                                    # Convert normalized coordinates to pixel coordinates
-                                    cx, cy = int(landmark.x * w), int(landmark.y * h)
-                                    
-                                    # Draw different colors for different landmark types
-                                    if idx in [4, 8, 12, 16, 20]:  # Fingertips
-                                        color = (0, 255, 0)  # Green for fingertips
-                                        radius = 8
-                                    elif idx == 0:  # Wrist
-                                        color = (255, 0, 255)  # Magenta for wrist
-                                        radius = 10
-                                    else:  # Other joints
-                                        color = (255, 255, 0)  # Yellow for other joints
-                                        radius = 5
-                                    
-                                    # Draw circle on the landmark
-                                    cv2.circle(image_rgb, (cx, cy), radius, color, -1)
-                                    cv2.circle(image_rgb, (cx, cy), radius + 2, (255, 255, 255), 2)  # White border
-                                
-                                # Draw connections between landmarks
-                                connections = [
-                                    # Thumb
-                                    (0, 1), (1, 2), (2, 3), (3, 4),
-                                    # Index finger
-                                    (0, 5), (5, 6), (6, 7), (7, 8),
-                                    # Middle finger
-                                    (0, 9), (9, 10), (10, 11), (11, 12),
-                                    # Ring finger
-                                    (0, 13), (13, 14), (14, 15), (15, 16),
-                                    # Pinky
-                                    (0, 17), (17, 18), (18, 19), (19, 20),
-                                    # Palm
-                                    (5, 9), (9, 13), (13, 17)
-                                ]
-                                
-                                for connection in connections:
-                                    start_idx, end_idx = connection
-                                    start = landmarks[start_idx]
-                                    end = landmarks[end_idx]
-                                    
-                                    start_point = (int(start.x * w), int(start.y * h))
-                                    end_point = (int(end.x * w), int(end.y * h))
-                                    
-                                    cv2.line(image_rgb, start_point, end_point, (100, 100, 255), 2)
+                                if self.quality["overlay"]:
+                                    self.draw_landmarks(image_rgb, landmarks)
                         else:
                             # No hand detected, reset rotation tracking
                             if len(self.hand_history) > 0:
@@ -369,14 +392,99 @@ class GestureThread(QThread):
                         pass  # Silently ignore detection errors
                 
                 # Store the processed frame for GUI display (with landmarks if detected)
-                self.latest_frame = image_rgb
-                self.frame_captured.emit()
+                if self.quality["preview"]:
+                    with self._frame_lock:
+                        self.latest_frame = image_rgb
+                    self.frame_captured.emit()
+                    timeline.mark("first_camera_frame")
                             
-                time.sleep(0.05) # Limit FPS
+                log.debug("GestureThread", "frame", sample=100, quality=self.quality["name"],
+                          ms=round((time.perf_counter() - frame_started) * 1000, 1))
+
+                # Pace to the calibrated frame interval, stretched by the quality governor
+                interval = self.frame_interval * self.quality["interval_scale"]
+                time.sleep(max(0.0, interval - (time.perf_counter() - frame_started)))
             
             if self.cap:
                 self.cap.release()
 
+    def _next_rgb_buffer(self, image):
+        """A buffer to convert the next frame into, never the published or the one being read.
+
+        Three are enough: at any moment at most one is published (latest_frame)
+        and at most one is being copied by the GUI (read_frame), however far
+        behind it is, which always leaves one free to write into.
+        """
+        with self._frame_lock:
+            if not self._rgb_buffers or self._rgb_buffers[0].shape != image.shape:
+                self._rgb_buffers = [np.empty_like(image) for _ in range(3)]
+            for _ in range(len(self._rgb_buffers)):
+                self._rgb_index = (self._rgb_index + 1) % len(self._rgb_buffers)
+                buffer = self._rgb_buffers[self._rgb_index]
+                if buffer is not self.latest_frame and buffer is not self._reading:
+                    return buffer
+
+    def read_frame(self, use):
+        """Call use(frame) with the newest frame, if any; its buffer is not reused until use returns"""
+        with self._frame_lock:
+            frame = self._reading = self.latest_frame
+        if frame is None:
+            return False
+        try:
+            use(frame)
+        finally:
+            with self._frame_lock:
+                self._reading = None
+        return True
+
+    def draw_landmarks(self, image, landmarks):
+        """Draw the hand skeleton onto the preview frame (landmarks mirrored, image not)"""
+        h, w, _ = image.shape
+        for idx, landmark in enumerate(landmarks):
+            # Convert normalized coordinates to pixel coordinates
+            cx, cy = int((1.0 - landmark.x) * w), int(landmark.y * h)
+
+            # Draw different colors for different landmark types
+            if idx in [4, 8, 12, 16, 20]:  # Fingertips
+                color = (0, 255, 0)  # Green for fingertips
+                radius = 8
+            elif idx == 0:  # Wrist
+                color = (255, 0, 255)  # Magenta for wrist
+                radius = 10
+            else:  # Other joints
+                color = (255, 255, 0)  # Yellow for other joints
+                radius = 5
+
+            # Draw circle on the landmark
+            cv2.circle(image, (cx, cy), radius, color, -1)
+            cv2.circle(image, (cx, cy), radius + 2, (255, 255, 255), 2)  # White border
+
+        # Draw connections between landmarks
+        connections = [
+            # Thumb
+            (0, 1), (1, 2), (2, 3), (3, 4),
+            # Index finger
+            (0, 5), (5, 6), (6, 7), (7, 8),
+            # Middle finger
+            (0, 9), (9, 10), (10, 11), (11, 12),
+            # Ring finger
+            (0, 13), (13, 14), (14, 15), (15, 16),
+            # Pinky
+            (0, 17), (17, 18), (18, 19), (19, 20),
+            # Palm
+            (5, 9), (9, 13), (13, 17)
+        ]
+
+        for connection in connections:
+            start_idx, end_idx = connection
+            start = landmarks[start_idx]
+            end = landmarks[end_idx]
+
+            start_point = (int((1.0 - start.x) * w), int(start.y * h))
+            end_point = (int((1.0 - end.x) * w), int(end.y * h))
+
+            cv2.line(image, start_point, end_point, (100, 100, 255), 2)
+
     def stop(self):
         self.running = False
         if self.cap:
@@ -391,18 +499,29 @@ class GestureController(QObject):
     cursorXChanged = Signal()
     cursorYChanged = Signal()
     clickDetected = Signal()  # Signal when pinch click is detected
+    hoveredTargetChanged = Signal()
+    targetClicked = Signal(str)  # Name of the target under the cursor on a pinch click
 
-    def __init__(self):
+    def __init__(self, thread=None):
         super().__init__()
         self._isCameraVisible = True
         self._currentGesture = ""
         self._cursorX = 0.5  # Normalized 0-1
         self._cursorY = 0.5  # Normalized 0-1
+
+        # Gesture targets registered from QML (scene pixels), see GestureTarget.qml
+        self._targets = HitGrid()
+        self._sceneWidth = 1.0
+        self._sceneHeight = 1.0
+        self._hoveredTarget = ""
         
-        # Start Detection Thread
-        self.thread = GestureThread()
+        # Detection Thread (or whatever stands in for it, e.g. bench_ui's replay), started by start()
+        self.thread = thread or GestureThread()
         self.thread.gesture_detected.connect(self.on_gesture_from_thread)
         self.thread.cursor_moved.connect(self.on_cursor_moved)
+
+    def start(self):
+        """Open the camera and load the landmarker (run_ui defers this until the first frame is up)"""
         self.thread.start()
 
     @Slot(float, float)
@@ -414,6 +533,40 @@ class GestureController(QObject):
             self.cursorXChanged.emit()
             self.cursorYChanged.emit()
             self.cursorMoved.emit(x, y)
+            self._update_hover()
+
+    def _update_hover(self):
+        target = self._targets.hit(self._cursorX * self._sceneWidth, self._cursorY * self._sceneHeight)
+        if target != self._hoveredTarget:
+            self._hoveredTarget = target
+            self.hoveredTargetChanged.emit()
+
+    @Slot(float, float)
+    def setSceneSize(self, width, height):
+        """Size of the scene the normalized cursor maps onto"""
+        self._sceneWidth = width
+        self._sceneHeight = height
+        self._update_hover()
+
+    @Slot(str, float, float, float, float)
+    def registerTarget(self, name, x, y, width, height):
+        """Add or move a gesture target (scene coordinates)"""
+        if self._targets.set(name, x, y, width, height):
+            self._update_hover()
+
+    @Slot(str)
+    def unregisterTarget(self, name):
+        if self._targets.remove(name):
+            self._update_hover()
+
+    @Slot(float, float, result=str)
+    def targetAt(self, x, y):
+        """Target under a normalized position, "" if none"""
+        return self._targets.hit(x * self._sceneWidth, y * self._sceneHeight)
+
+    @Property(str, notify=hoveredTargetChanged)
+    def hoveredTarget(self):
+        return self._hoveredTarget
 
     @Property(float, notify=cursorXChanged)
     def cursorX(self):
@@ -434,28 +587,29 @@ class GestureController(QObject):
         # Debounce or just pass through
         # if self._currentGesture != gesture: (removed debounce for simulation responsiveness)
         self._currentGesture = gesture
-        print(f"Gesture Detected: {gesture}")
+        log.info("GestureController", "gesture", gesture=gesture)
         self.gestureDetected.emit(gesture)
         
         # Emit click signal for pinch gestures
         if gesture == "PINCH_CLICK":
-            print("[GestureController] Emitting clickDetected signal")
             self.clickDetected.emit()
+            if self._hoveredTarget:
+                self.targetClicked.emit(self._hoveredTarget)
             
     # Allow manual simulation/override
     @Slot(str)
     def simulateGesture(self, gesture):
-        print(f"[RunUI] simulateGesture Called with: {gesture}") # Visual feedback for inputs
+        log.info("GestureController", "simulated", gesture=gesture)  # Visual feedback for inputs
         self.on_gesture_from_thread(gesture)
 
     @Slot()
     def cycleCamera(self):
-        print("[RunUI] Cycling Camera Index...")
+        log.info("GestureController", "cycle_camera")
         self.thread.change_camera()
 
     @Slot()
     def toggleTestPattern(self):
-        print("[RunUI] Toggling Test Pattern...")
+        log.info("GestureController", "toggle_test_pattern")
         self.thread.toggle_test_pattern()
     
     @Slot(float, float)
@@ -483,18 +637,16 @@ class NetworkManager(QObject):
     volumeChanged = Signal() # Explicit signal for volume
     activeControlChanged = Signal()  # Signal when active control changes
 
-    def __init__(self):
+    def __init__(self, player=None, audio_output=None):
         super().__init__()
-        self._vehicle_state = {"driver_temp": 22, "volume": 50, "outdoor_temp": "--"} # Start at 50%
-        
-        # Start weather thread
-        self.weather_thread = threading.Thread(target=self._fetch_weather_loop, daemon=True)
-        self.weather_thread.start()
-        
-        # Audio Player Setup
-        self.player = QMediaPlayer()
-        self.audio_output = QAudioOutput()
-        self.player.setAudioOutput(self.audio_output)
+        # Synced fields from the shared schema (volume starts at 50%), plus display-only ones
+        self._vehicle_state = {**VEHICLE.defaults(), "outdoor_temp": "--"}
+
+        # Audio player and weather thread are created by start()/start_media()
+        self.player = player
+        self.audio_output = audio_output
+        self._media_started = False
+        self.weather_thread = None
         
         # Playlist (Streaming URLs)
         self.playlist = [
@@ -505,25 +657,79 @@ class NetworkManager(QObject):
         ]
         self.current_track_index = 0
         
+        # duration/position are the player's milliseconds, only title/artist/is_playing are synced
         self._media_state = {
-            "title": self.playlist[0]["title"], 
-            "artist": self.playlist[0]["artist"], 
-            "is_playing": False,
+            **MEDIA.defaults(),
+            "title": self.playlist[0]["title"],
+            "artist": self.playlist[0]["artist"],
             "duration": 0,
             "position": 0
         }
         self._last_volume = 50
         self._active_control = "temp"  # Default to temp control
-        
-        # Initialize volume
-        self.audio_output.setVolume(self._vehicle_state["volume"] / 100.0)
-        
+
+        # Backend sync (optimistic local updates, pushed as changed fields only)
+        self.sync = StateSyncClient(parent=self)
+        self.sync.vehicleReceived.connect(self._on_remote_vehicle)
+        self.sync.mediaReceived.connect(self._on_remote_media)
+        self.sync.start()
+
+    def start(self):
+        """Start the non-critical services, media and weather (run_ui defers this until the first frame is up)"""
+        self.start_media()
+        if self.weather_thread is None:
+            self.weather_thread = threading.Thread(target=self._fetch_weather_loop, daemon=True)
+            self.weather_thread.start()
+
+    def start_media(self):
+        """Create the player and load the current track; also runs on first use if start() has not yet"""
+        if self._media_started:
+            return
+        self._media_started = True
+        if self.player is None:
+            from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput  # Loads the multimedia backend
+            self.player = QMediaPlayer()
+            self.audio_output = QAudioOutput()
+        self.player.setAudioOutput(self.audio_output)
+        self._set_output_volume(self._vehicle_state["volume"])
+
         # Connect signals
         self.player.durationChanged.connect(self._on_duration_changed)
         self.player.positionChanged.connect(self._on_position_changed)
-        
-        # Load first track
-        self.player.setSource(QUrl(self.playlist[0]["url"]))
+
+        # Load first track (and honour a play request synced in before the player existed)
+        self.player.setSource(QUrl(self.playlist[self.current_track_index]["url"]))
+        if self._media_state["is_playing"]:
+            self.player.play()
+        timeline.mark("media_ready")
+
+    def _set_output_volume(self, volume):
+        """Hardware volume, 0-100; the player picks up the current value when it starts"""
+        if self._media_started:
+            self.audio_output.setVolume(volume / 100.0)
+
+    def _on_remote_vehicle(self, fields):
+        """Apply vehicle fields changed by another display"""
+        new_state = self._vehicle_state.copy()
+        new_state.update(fields)
+        self._vehicle_state = new_state
+        if "volume" in fields:
+            self._set_output_volume(new_state["volume"])
+        self.vehicleStateChanged.emit()
+        self.volumeChanged.emit()
+
+    def _on_remote_media(self, fields):
+        """Apply media fields changed by another display"""
+        if (self._media_started and "is_playing" in fields
+                and fields["is_playing"] != self._media_state["is_playing"]):
+            if fields["is_playing"]:
+                self.player.play()
+            else:
+                self.player.pause()
+        for key in ("title", "artist", "is_playing"):
+            if key in fields:
+                self._media_state[key] = fields[key]
+        self.mediaStateChanged.emit()
 
     def _on_duration_changed(self, duration):
         self._media_state["duration"] = duration
@@ -542,11 +748,11 @@ class NetworkManager(QObject):
         if self._active_control != value:
             self._active_control = value
             self.activeControlChanged.emit()
-            print(f"[NetworkManager] Active control changed to: {value}")
+            log.info("NetworkManager", "active_control", control=value)
             
             # Sync volume focus
             if value == "volume":
-                 self.audio_output.setVolume(self._vehicle_state["volume"] / 100.0)
+                 self._set_output_volume(self._vehicle_state["volume"])
 
     @Property(int, notify=volumeChanged)
     def volume(self):
@@ -555,7 +761,8 @@ class NetworkManager(QObject):
     @Slot()
     def togglePlayback(self):
         """Toggle play/pause state"""
-        if self.player.playbackState() == QMediaPlayer.PlayingState:
+        self.start_media()
+        if self.player.playbackState() == self.player.PlaybackState.PlayingState:
             self.player.pause()
             self._media_state["is_playing"] = False
         else:
@@ -563,7 +770,8 @@ class NetworkManager(QObject):
             self._media_state["is_playing"] = True
             
         self.mediaStateChanged.emit()
-        print(f"[NetworkManager] Playback {'paused' if not self._media_state['is_playing'] else 'playing'}")
+        self.sync.push_media({"is_playing": self._media_state["is_playing"]})
+        log.info("NetworkManager", "playback", playing=self._media_state["is_playing"])
 
     @Slot()
     def nextTrack(self):
@@ -579,6 +787,7 @@ class NetworkManager(QObject):
         
     def load_track(self):
         track = self.playlist[self.current_track_index]
+        self.start_media()
         self.player.setSource(QUrl(track["url"]))
         self.player.play()
         
@@ -586,7 +795,8 @@ class NetworkManager(QObject):
         self._media_state["artist"] = track["artist"]
         self._media_state["is_playing"] = True
         self.mediaStateChanged.emit()
-        print(f"[NetworkManager] Playing: {track['title']}")
+        self.sync.push_media({"title": track["title"], "artist": track["artist"], "is_playing": True})
+        log.info("NetworkManager", "track", title=track["title"])
 
     @Property("QVariantMap", notify=vehicleStateChanged)
     def vehicleState(self):
@@ -598,6 +808,7 @@ class NetworkManager(QObject):
         return self._media_state
 
     def _fetch_weather_loop(self):
+        import urllib.request
         while True:
             try:
                  # Kochi coordinates
@@ -611,15 +822,16 @@ class NetworkManager(QObject):
                             new_state["outdoor_temp"] = str(int(round(temp)))
                             self._vehicle_state = new_state
                             self.vehicleStateChanged.emit()
-                            print(f"[NetworkManager] Weather updated: {new_state['outdoor_temp']}C")
+                            log.info("NetworkManager", "weather", outdoor_temp=new_state["outdoor_temp"])
             except Exception as e:
-                print(f"[NetworkManager] Weather fetch error: {e}")
+                log.warning("NetworkManager", "weather_failed", error=repr(e))
             
             time.sleep(900) # Update every 15 minutes
         
     def handle_gesture(self, gesture_name):
-        print(f"[NetworkManager] Handling Gesture: {gesture_name}")
+        log.debug("NetworkManager", "handle_gesture", gesture=gesture_name)
         changed = False
+        old_state = self._vehicle_state
         
         if gesture_name == "FIST":
             # Mute
@@ -629,13 +841,13 @@ class NetworkManager(QObject):
                 new_state = self._vehicle_state.copy()
                 new_state["volume"] = 0
                 self._vehicle_state = new_state
-                self.audio_output.setVolume(0) # Hardware mute
+                self._set_output_volume(0) # Hardware mute
                 
                 # Switch active control to volume so subsequent rotation controls volume
                 if self._active_control != "volume":
                     self.activeControl = "volume"
                     
-                print(f"[NetworkManager] Muted. Volume is now: {self._vehicle_state['volume']}")
+                log.info("NetworkManager", "muted", restore_volume=self._last_volume)
                 changed = True
                 
         # OPEN_PALM unmute removed - volume auto-unmutes when increased
@@ -647,21 +859,21 @@ class NetworkManager(QObject):
                 # Auto-unmute if currently muted
                 if self._vehicle_state["volume"] == 0 and self._last_volume > 0:
                     new_state["volume"] = self._last_volume
-                    print(f"[NetworkManager] Auto-unmuted to: {new_state['volume']}")
+                    log.info("NetworkManager", "unmuted", volume=new_state["volume"])
                 else:
                     new_state["volume"] = min(100, self._vehicle_state["volume"] + 5)
                 
                 if new_state["volume"] != self._vehicle_state["volume"]:
                     self._vehicle_state = new_state
-                    self.audio_output.setVolume(new_state["volume"] / 100.0) # Hardware vol
-                    print(f"[NetworkManager] Volume increased to: {self._vehicle_state['volume']}")
+                    self._set_output_volume(new_state["volume"]) # Hardware vol
+                    log.info("NetworkManager", "volume", volume=self._vehicle_state["volume"])
                     changed = True
             elif self._active_control == "temp":
                 new_state = self._vehicle_state.copy()
                 new_state["driver_temp"] = min(30, self._vehicle_state["driver_temp"] + 1)
                 if new_state["driver_temp"] != self._vehicle_state["driver_temp"]:
                     self._vehicle_state = new_state
-                    print(f"[NetworkManager] Temperature increased to: {self._vehicle_state['driver_temp']}")
+                    log.info("NetworkManager", "driver_temp", driver_temp=self._vehicle_state["driver_temp"])
                     changed = True
                 
         elif gesture_name == "ROTATE_CCW":
@@ -671,34 +883,56 @@ class NetworkManager(QObject):
                 new_state["volume"] = max(0, self._vehicle_state["volume"] - 5)
                 if new_state["volume"] != self._vehicle_state["volume"]:
                     self._vehicle_state = new_state
-                    self.audio_output.setVolume(new_state["volume"] / 100.0) # Hardware vol
-                    print(f"[NetworkManager] Volume decreased to: {self._vehicle_state['volume']}")
+                    self._set_output_volume(new_state["volume"]) # Hardware vol
+                    log.info("NetworkManager", "volume", volume=self._vehicle_state["volume"])
                     changed = True
             elif self._active_control == "temp":
                 new_state = self._vehicle_state.copy()
                 new_state["driver_temp"] = max(16, self._vehicle_state["driver_temp"] - 1)
                 if new_state["driver_temp"] != self._vehicle_state["driver_temp"]:
                     self._vehicle_state = new_state
-                    print(f"[NetworkManager] Temperature decreased to: {self._vehicle_state['driver_temp']}")
+                    log.info("NetworkManager", "driver_temp", driver_temp=self._vehicle_state["driver_temp"])
                     changed = True
                 
         if changed:
-            print("[NetworkManager] Emitting State Change Signal")
             self.vehicleStateChanged.emit()
             self.volumeChanged.emit()
+            self.sync.push_vehicle(VEHICLE.diff(old_state, self._vehicle_state))
 
 class CameraManager(QObject):
     def __init__(self):
         super().__init__()
 
-if __name__ == "__main__":
-    app = QGuiApplication(sys.argv)
-    
-    # Mock Objects
-    gesture_controller = GestureController()
-    network_manager = NetworkManager()
+MAIN_QML = os.path.join(os.path.dirname(__file__), "qml/SimpleMain.qml")
+
+
+class LiveImageProvider(QQuickImageProvider):
+    def __init__(self):
+        super().__init__(QQuickImageProvider.Image)
+        self._image = QImage(640, 480, QImage.Format_RGB888)
+        self._image.fill(QColor("black"))
+
+    def requestImage(self, id, size, requestedSize):
+        return self._image
+
+    def update_image(self, cv_img):
+        # Expects RGB image
+        height, width, channel = cv_img.shape
+        bytes_per_line = 3 * width
+        q_img = QImage(cv_img.data, width, height, bytes_per_line, QImage.Format_RGB888)
+        self._image = q_img.copy() # Layout might need copy to persist
+
+
+Scene = namedtuple("Scene", "view camera_manager map_tiles governor image_provider")
+
+
+def create_scene(gesture_controller, network_manager, qml_file=MAIN_QML):
+    """Register the QML singletons and load qml_file into a QQuickView (not shown yet)"""
     camera_manager = CameraManager()
-    
+    map_tiles = MapTiles()  # Builds the tile pyramid on first run
+    governor = QualityGovernor()
+    governor.levelChanged.connect(lambda: gesture_controller.thread.set_quality(governor.settings))
+
     # Wire Gestures to Logic
     gesture_controller.gestureDetected.connect(network_manager.handle_gesture)
 
@@ -706,55 +940,110 @@ if __name__ == "__main__":
     qmlRegisterSingletonInstance(GestureController, "AeroUI", 1, 0, "GestureController", gesture_controller)
     qmlRegisterSingletonInstance(NetworkManager, "AeroUI", 1, 0, "NetworkManager", network_manager)
     qmlRegisterSingletonInstance(CameraManager, "AeroUI", 1, 0, "CameraManager", camera_manager)
+    qmlRegisterSingletonInstance(MapTiles, "AeroUI", 1, 0, "MapTiles", map_tiles)
+    qmlRegisterSingletonInstance(QualityGovernor, "AeroUI", 1, 0, "QualityGovernor", governor)
 
     # Use QQuickView for better compatibility with Item/Rectangle roots
     view = QQuickView()
     view.setResizeMode(QQuickView.SizeRootObjectToView)
     view.setTitle("AeroUI Embedded - Gesture Enabled")
-    
-    # --- Image Provider for Live Feed ---
-    from PySide6.QtQuick import QQuickImageProvider
-    from PySide6.QtGui import QImage, QPainter, QColor
-
-    class LiveImageProvider(QQuickImageProvider):
-        def __init__(self):
-            super().__init__(QQuickImageProvider.Image)
-            self._image = QImage(640, 480, QImage.Format_RGB888)
-            self._image.fill(QColor("black"))
-
-        def requestImage(self, id, size, requestedSize):
-            return self._image
-
-        def update_image(self, cv_img):
-            # Expects RGB image
-            height, width, channel = cv_img.shape
-            bytes_per_line = 3 * width
-            q_img = QImage(cv_img.data, width, height, bytes_per_line, QImage.Format_RGB888)
-            self._image = q_img.copy() # Layout might need copy to persist
 
+    # --- Image Provider for Live Feed ---
     image_provider = LiveImageProvider()
     view.engine().addImageProvider("live_camera", image_provider)
+    view.engine().addImageProvider("maptiles", map_tiles.provider)
 
     # Connect Thread to Provider
     def update_camera_feed():
-        if gesture_controller.thread.latest_frame is not None:
-             image_provider.update_image(gesture_controller.thread.latest_frame)
+        if gesture_controller.thread.read_frame(image_provider.update_image):
              gesture_controller.frameReady.emit()
 
     gesture_controller.thread.frame_captured.connect(update_camera_feed)
-    
+
     # Load QML
-    qml_file = os.path.join(os.path.dirname(__file__), "qml/SimpleMain.qml")
     view.setSource(QUrl.fromLocalFile(qml_file))
+    return Scene(view, camera_manager, map_tiles, governor, image_provider)
+
+
+def report_startup():
+    log.info("Startup", "timeline", **timeline.summary())
+    path = os.environ.get("AEROUI_STARTUP_REPORT")
+    if path:
+        timeline.write(path)
+
+
+if __name__ == "__main__":
+    # --precompile-qml: compile the scene into the QML disk cache and exit (image build / install step)
+    precompile = "--precompile-qml" in sys.argv
+    if precompile:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    configure_qml_cache()
+    app = QGuiApplication(sys.argv)
+    log.start()  # Console output from a background thread
+    log.install_dump_signal()  # kill -USR1 <pid> writes the last events to aeroui-events-*.log
+    timeline.mark("app")
+    
+    # Mock Objects
+    gesture_controller = GestureController()
+    network_manager = NetworkManager()
+    scene = create_scene(gesture_controller, network_manager)
+    view = scene.view
+    timeline.mark("qml_loaded")
 
     if view.status() == QQuickView.Error:
         print("Error loading QML:")
         for error in view.errors():
             print(error.toString())
-        gesture_controller.thread.stop()
+        log.stop()
         sys.exit(-1)
 
+    if precompile:
+        log.info("Startup", "qml_precompiled", cache=os.environ.get("QML_DISK_CACHE_PATH"),
+                 ms=round(timeline.elapsed("qml_loaded") * 1000))
+        log.stop()
+        sys.exit(0)
+
+    # Camera, media and weather start once the first frame is on screen
+    # (AEROUI_STARTUP=eager starts them before showing, as a baseline)
+    eager = os.environ.get("AEROUI_STARTUP") == "eager"
+
+    def start_services():
+        gesture_controller.start()
+        network_manager.start()
+        scene.governor.start()
+        timeline.mark("services_started")
+
+    # Calls already queued when the slots disconnect still arrive, so each runs once by flag
+    started = False
+    gestures_live = False
+
+    def on_first_frame():
+        global started
+        if started:
+            return
+        started = True
+        view.frameSwapped.disconnect(on_first_frame)
+        timeline.mark("first_frame")
+        if not eager:
+            start_services()
+        report_startup()  # Interactive: touch and keys work from here
+
+    def on_first_camera_frame():
+        global gestures_live
+        if gestures_live:
+            return
+        gestures_live = True
+        gesture_controller.thread.frame_captured.disconnect(on_first_camera_frame)
+        report_startup()  # Gestures live as well
+
+    gesture_controller.thread.frame_captured.connect(on_first_camera_frame)
+    view.frameSwapped.connect(on_first_frame, Qt.QueuedConnection)  # Emitted on the render thread
+    if eager:
+        start_services()
     view.show()
+    timeline.mark("shown")
     ret = app.exec()
+    network_manager.sync.stop()
     gesture_controller.thread.stop()
+    log.stop()
     sys.exit(ret)
@@ -0,0 +1,86 @@
+import json
+import os
+import time
+
+# --- Cold start ---
+#
+# StartupTimeline marks the phases of a launch (imports, QML load, first
+# frame, deferred services, first camera frame) in milliseconds since the
+# process was started, so interpreter start-up counts too. run_ui logs it
+# once the UI is interactive and again when gestures are live, and writes it
+# as JSON to AEROUI_STARTUP_REPORT if that is set.
+#
+# QML is compiled once into a persistent disk cache (AEROUI_QML_CACHE,
+# default embedded_ui/qmlcache) instead of Qt's per-user default, and
+# `python run_ui.py --precompile-qml` fills it ahead of time (image build,
+# install), so even the first launch on a device loads bytecode.
+
+QML_CACHE_DIR = os.environ.get("AEROUI_QML_CACHE",
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), "qmlcache"))
+
+
+def process_age():
+    """Seconds since this process was started, None where /proc is not available"""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])  # Field 22, starttime
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def configure_qml_cache(path=None):
+    """Point Qt's QML disk cache at path; call before the first QML engine is created"""
+    path = path or QML_CACHE_DIR
+    try:
+        os.makedirs(path, exist_ok=True)
+    except OSError:
+        return None  # Read-only install: Qt falls back to its own cache location
+    os.environ.setdefault("QML_DISK_CACHE_PATH", path)
+    return os.environ["QML_DISK_CACHE_PATH"]
+
+
+class StartupTimeline:
+    def __init__(self):
+        age = process_age()
+        self._origin = time.perf_counter() - (age or 0.0)
+        self.marks = []  # (name, seconds since process start), in order
+        self._names = set()
+        if age is not None:
+            self.mark("interpreter")  # Python start-up until this module was imported
+
+    def mark(self, name):
+        """Record that phase name ended now; repeats are ignored, so per-frame callers are fine"""
+        if name in self._names:
+            return
+        self._names.add(name)
+        self.marks.append((name, time.perf_counter() - self._origin))  # list.append: safe from any thread
+
+    def elapsed(self, name):
+        for mark, at in self.marks:
+            if mark == name:
+                return at
+        return None
+
+    def phases(self):
+        """[(name, ms since start, ms since the previous mark)]"""
+        phases = []
+        previous = 0.0
+        for name, at in sorted(self.marks, key=lambda mark: mark[1]):
+            phases.append((name, round(at * 1000, 1), round((at - previous) * 1000, 1)))
+            previous = at
+        return phases
+
+    def summary(self):
+        """name -> "total (+delta)" strings, for one log line"""
+        return {name: f"{at:.0f}ms(+{delta:.0f})" for name, at, delta in self.phases()}
+
+    def write(self, path):
+        phases = [{"name": name, "ms": at, "delta_ms": delta} for name, at, delta in self.phases()]
+        with open(path, "w") as f:
+            json.dump({"phases": phases, "qml_cache": os.environ.get("QML_DISK_CACHE_PATH")}, f, indent=2)
+
+
+timeline = StartupTimeline()
@@ -0,0 +1,237 @@
+import json
+import os
+import sys
+import time
+from PySide6.QtCore import QObject, QTimer, QUrl, QUrlQuery, Signal, Slot
+from PySide6.QtWebSockets import QWebSocket
+
+# shared/state_schema.py: the vehicle/media fields the backends use too
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from state_schema import MODELS as STATE_MODELS
+from eventlog import log
+
+DEFAULT_SYNC_URL = "ws://localhost:8000/ws"
+
+# --- Backend State Sync (single persistent WebSocket to backend_fastapi) ---
+class StateSyncClient(QObject):
+    """Mirrors vehicle/media state with the FastAPI backend over one WebSocket.
+
+    Local changes are applied optimistically by the caller and pushed here as
+    changed fields only. Everything runs on the Qt event loop (QWebSocket and
+    QTimer are asynchronous), so nothing here ever blocks the UI.
+    """
+    vehicleReceived = Signal(dict)  # Server fields the UI should apply
+    mediaReceived = Signal(dict)
+    connectedChanged = Signal(bool)
+
+    MODELS = tuple(STATE_MODELS)
+    TOPICS = ("vehicle", "media")  # The player owns playback position, so no media.progress
+    PENDING_TIMEOUT = 2.0  # Seconds an un-acked local change wins over the server
+    RECONNECT_MIN_MS = 500
+    RECONNECT_MAX_MS = 10000
+
+    def __init__(self, url=None, parent=None):
+        super().__init__(parent)
+        self.url = os.environ.get("AEROUI_SYNC_URL", DEFAULT_SYNC_URL) if url is None else url
+        self._connected = False
+        self._running = False
+        self._reconnect_attempts = 0
+        self._revisions = {topic: None for topic in self.TOPICS}  # Server version of each topic
+        self._version = None  # Highest server version fully applied, resumed from on reconnect
+        self._resync_requested = False
+
+        self._outbox = {model: {} for model in self.MODELS}   # Changed fields not sent yet
+        self._pending = {model: {} for model in self.MODELS}  # field -> (value, sent_at)
+
+        self._socket = QWebSocket("", parent=self)
+        self._socket.connected.connect(self._on_connected)
+        self._socket.disconnected.connect(self._on_disconnected)
+        self._socket.textMessageReceived.connect(self._on_message)
+
+        # Coalesce all changes made during one event loop pass into a single send
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(0)
+        self._flush_timer.timeout.connect(self.flush)
+
+        self._reconnect_timer = QTimer(self)
+        self._reconnect_timer.setSingleShot(True)
+        self._reconnect_timer.timeout.connect(self._open)
+
+    @property
+    def connected(self):
+        return self._connected
+
+    def start(self):
+        if not self.url:
+            log.info("StateSync", "disabled", reason="no backend URL configured")
+            return
+        self._running = True
+        self._open()
+
+    def stop(self):
+        self._running = False
+        self._reconnect_timer.stop()
+        self._socket.close()
+
+    def push_vehicle(self, fields):
+        self._push("vehicle", fields)
+
+    def push_media(self, fields):
+        self._push("media", fields)
+
+    def _push(self, model, fields):
+        if not fields:
+            return
+        self._outbox[model].update(fields)
+        if self._connected and not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    @Slot()
+    def flush(self):
+        """Send every queued change, one message per model."""
+        if not self._connected:
+            return
+        now = time.monotonic()
+        for model in self.MODELS:
+            fields = self._outbox[model]
+            if not fields:
+                continue
+            self._outbox[model] = {}
+            self._send({"type": f"UPDATE_{model.upper()}", "data": fields})
+            for key, value in fields.items():
+                self._pending[model][key] = (value, now)
+
+    def _send(self, message):
+        self._socket.sendTextMessage(json.dumps(message, separators=(",", ":")))
+
+    def _open(self):
+        if not self._running:
+            return
+        url = QUrl(self.url)
+        query = QUrlQuery(url)
+        query.removeAllQueryItems("topics")
+        query.addQueryItem("topics", ",".join(self.TOPICS))
+        if self._version is not None:
+            # Resume: the server replays only what we missed (or sends a full state)
+            query.removeAllQueryItems("since")
+            query.addQueryItem("since", str(self._version))
+        url.setQuery(query)
+        self._socket.open(url)
+
+    @Slot()
+    def _on_connected(self):
+        log.info("StateSync", "connected", url=self.url)
+        self._connected = True
+        self._reconnect_attempts = 0
+        self._resync_requested = False  # New handshake, the server answers it with state or a replay
+        self._version = None  # Re-established by that answer (the server may have restarted older)
+        self.connectedChanged.emit(True)
+        # Anything un-acked from before the drop may never have reached the server
+        for model in self.MODELS:
+            for key, (value, _) in self._pending[model].items():
+                self._outbox[model].setdefault(key, value)
+            self._pending[model].clear()
+        self.flush()
+
+    @Slot()
+    def _on_disconnected(self):
+        was_connected = self._connected
+        self._connected = False
+        if was_connected:
+            log.warning("StateSync", "connection_lost")
+            self.connectedChanged.emit(False)
+        if not self._running:
+            return
+        # Exponential backoff so a dead backend doesn't cost us a connect per frame
+        delay = min(self.RECONNECT_MAX_MS, self.RECONNECT_MIN_MS * (2 ** self._reconnect_attempts))
+        self._reconnect_attempts += 1
+        self._reconnect_timer.start(delay)
+
+    @Slot(str)
+    def _on_message(self, text):
+        try:
+            message = json.loads(text)
+        except ValueError:
+            return
+
+        msg_type = message.get("type")
+        data = message.get("data") or {}
+        if msg_type == "INITIAL_STATE":
+            version = message.get("version")
+            if self._version is not None and version is not None and version < self._version:
+                return  # Older than what we have applied already
+            self._resync_requested = False
+            self._advance(version)
+            revisions = message.get("revisions") or {}
+            for topic in self.TOPICS:
+                if topic in revisions:
+                    self._revisions[topic] = revisions[topic]
+            self._resync(data)
+        elif msg_type == "RESUMED":
+            # End of a replay (resume handshake or RESYNC): every topic is current as of version
+            self._resync_requested = False
+            version = message.get("version")
+            self._advance(version)
+            if version is not None:
+                for topic, current in self._revisions.items():
+                    self._revisions[topic] = version if current is None else max(current, version)
+        elif msg_type in ("VEHICLE_DELTA", "MEDIA_DELTA"):
+            model = msg_type.split("_")[0].lower()
+            if self._check_version(message.get("topic", model), message):
+                self._apply(model, data)
+                if not self._resync_requested:
+                    self._advance(message.get("version"))  # Nothing held back waiting on a replay
+
+    def _advance(self, version):
+        if version is not None and (self._version is None or version > self._version):
+            self._version = version
+
+    def _check_version(self, topic, message):
+        """True if a delta applies cleanly on top of what we have."""
+        version = message.get("version")
+        prev_version = message.get("prev_version")
+        current = self._revisions.get(topic)
+        if current is None or version is None:
+            return True
+        if version <= current:
+            return False  # Stale, we already have something newer
+        if prev_version is not None and prev_version > current:
+            # We missed at least one change to this topic, ask for the full state
+            if not self._resync_requested:
+                log.warning("StateSync", "version_gap", topic=topic, current=current, prev_version=prev_version)
+                self._resync_requested = True
+                self._send({"type": "RESYNC", "since": current})
+            return False
+        self._revisions[topic] = version
+        return True
+
+    def _resync(self, snapshot):
+        for model in self.MODELS:
+            self._apply(model, snapshot.get(model) or {})
+
+    def _apply(self, model, fields):
+        """Reconcile server fields against local optimistic changes."""
+        now = time.monotonic()
+        pending = self._pending[model]
+        outbox = self._outbox[model]
+        accepted = {}
+        for key, value in fields.items():
+            if key in outbox:
+                continue  # Newer local change still waiting to be sent
+            if key in pending:
+                sent_value, sent_at = pending[key]
+                if value == sent_value:
+                    del pending[key]  # Server caught up with us, UI already shows it
+                    continue
+                elif now - sent_at < self.PENDING_TIMEOUT:
+                    continue  # Our update is still in flight
+                else:
+                    del pending[key]  # Give up, the server wins
+            accepted[key] = value
+
+        if accepted:
+            if model == "vehicle":
+                self.vehicleReceived.emit(accepted)
+            else:
+                self.mediaReceived.emit(accepted)
@@ -0,0 +1,185 @@
+from typing import Any, NamedTuple, Optional
+
+# --- Shared state schema ---
+#
+# The one definition of the vehicle and media fields. backend_fastapi builds
+# its Pydantic models from it, the Django backend its model columns, and the
+# embedded UI its initial state and diffs; none of them lists the fields again.
+#
+# Each ModelSchema compiles plain Python functions for its fields (no loops or
+# per-field lookups at call time): defaults, validate, merge, diff,
+# from_object, and the compact wire format pack/unpack and
+# pack_delta/unpack_delta.
+#
+# Compact wire format (WIRE_VERSION 1):
+#   state  [value, value, ...]       every field, in schema order
+#   delta  [mask, value, ...]        bit i of mask set = field i follows
+# Fields are append-only: never reorder, rename or remove one, only add new
+# ones at the end. A reader then takes a shorter state (older writer) with
+# defaults for the missing tail, and ignores values and mask bits past its own
+# fields (newer writer). Anything else needs a new WIRE_VERSION.
+
+WIRE_VERSION = 1
+
+
+class SchemaError(ValueError):
+    pass
+
+
+class Field(NamedTuple):
+    name: str
+    type: type  # int, bool or str
+    default: Any
+    max_length: Optional[int] = None  # str only
+    url: bool = False  # str only: empty or an http(s) URL
+
+
+def _int(value):
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value.strip().lstrip("+-").isdigit():
+        return int(value)
+    raise TypeError("expected an integer")
+
+
+def _bool(value):
+    if isinstance(value, bool):
+        return value
+    if value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.lower() in ("true", "false", "1", "0"):
+        return value.lower() in ("true", "1")
+    raise TypeError("expected a boolean")
+
+
+def _str(value):
+    if isinstance(value, str):
+        return value
+    raise TypeError("expected a string")
+
+
+def _url(value):
+    if value and not value.startswith(("http://", "https://")):
+        raise TypeError("expected an http(s) URL")
+    return value
+
+
+COERCE = {int: _int, bool: _bool, str: _str}
+
+
+class ModelSchema:
+    def __init__(self, name: str, fields: list):
+        self.name = name
+        self.fields = tuple(fields)
+        self.names = tuple(field.name for field in self.fields)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self._compile()
+
+    def _compile(self):
+        fields = self.fields
+        n = len(fields)
+        env = {"_url": _url, "SchemaError": SchemaError,
+               "DEFAULTS": {field.name: field.default for field in fields}}
+        for field in fields:
+            env[f"_c_{field.name}"] = COERCE[field.type]
+
+        check = []
+        for field in fields:
+            key = repr(field.name)
+            lines = [f"v = _c_{field.name}(v)"]
+            if field.max_length is not None:
+                lines.append(f"if len(v) > {field.max_length}: raise TypeError('longer than {field.max_length} characters')")
+            if field.url:
+                lines.append("v = _url(v)")
+            check.append((key, lines))
+
+        src = []
+        src.append("def defaults():\n    return dict(DEFAULTS)")
+
+        # validate(data, partial): coerced copy of the known fields; unknown ones
+        # are dropped (a newer peer's), missing ones default unless partial=True
+        body = ["def validate(data, partial=False):", "    out = {}", "    field = None", "    try:"]
+        for key, lines in check:
+            body.append(f"        field = {key}")
+            body.append(f"        if {key} in data:")
+            body.append(f"            v = data[{key}]")
+            body += [f"            {line}" for line in lines]
+            body.append(f"            out[{key}] = v")
+            body.append("        elif not partial:")
+            body.append(f"            out[{key}] = DEFAULTS[{key}]")
+        body += ["    except (TypeError, ValueError, AttributeError) as e:",
+                 "        raise SchemaError(f'{SCHEMA_NAME}.{field}: {e}') from None",
+                 "    return out"]
+        src.append("\n".join(body))
+
+        # merge(state, fields): trusted fields over a full state, known fields only
+        src.append("def merge(state, fields):\n    return {" + ", ".join(
+            f"{field.name!r}: fields.get({field.name!r}, state[{field.name!r}])" for field in fields) + "}")
+
+        # diff(old, new): the fields of new that differ from old
+        body = ["def diff(old, new):", "    out = {}"]
+        for field in fields:
+            key = repr(field.name)
+            body.append(f"    if old[{key}] != new[{key}]: out[{key}] = new[{key}]")
+        body.append("    return out")
+        src.append("\n".join(body))
+
+        src.append("def from_object(obj):\n    return {" + ", ".join(
+            f"{field.name!r}: obj.{field.name}" for field in fields) + "}")
+
+        src.append("def pack(state):\n    return [" + ", ".join(
+            f"state[{field.name!r}]" for field in fields) + "]")
+
+        body = ["def unpack(values):", f"    if len(values) >= {n}:",
+                "        return {" + ", ".join(f"{field.name!r}: values[{i}]" for i, field in enumerate(fields)) + "}",
+                "    out = defaults()",
+                f"    out.update(zip({self.names!r}, values))",
+                "    return out"]
+        src.append("\n".join(body))
+
+        body = ["def pack_delta(delta):", "    mask = 0", "    values = [0]"]
+        for i, field in enumerate(fields):
+            key = repr(field.name)
+            body.append(f"    if {key} in delta: mask |= {1 << i}; values.append(delta[{key}])")
+        body += ["    values[0] = mask", "    return values"]
+        src.append("\n".join(body))
+
+        body = ["def unpack_delta(values):", "    mask = values[0]", "    out = {}", "    i = 1"]
+        for i, field in enumerate(fields):
+            body.append(f"    if mask & {1 << i}: out[{field.name!r}] = values[i]; i += 1")
+        body.append("    return out")
+        src.append("\n".join(body))
+
+        env["SCHEMA_NAME"] = self.name
+        exec(compile("\n\n".join(src), f"<state_schema {self.name}>", "exec"), env)
+        for name in ("defaults", "validate", "merge", "diff", "from_object",
+                     "pack", "unpack", "pack_delta", "unpack_delta"):
+            setattr(self, name, env[name])
+
+    def __repr__(self):
+        return f"ModelSchema({self.name!r}, {list(self.names)})"
+
+
+VEHICLE = ModelSchema("vehicle", [
+    # Climate
+    Field("driver_temp", int, 22),
+    Field("passenger_temp", int, 22),
+    Field("fan_speed", int, 3),  # 1-5
+    # Audio
+    Field("volume", int, 50),  # 0-100
+])
+
+MEDIA = ModelSchema("media", [
+    Field("title", str, "Not Playing", max_length=100),
+    Field("artist", str, "Unknown", max_length=100),
+    Field("album_art", str, "", max_length=200, url=True),
+    Field("is_playing", bool, False),
+    Field("progress", int, 0),  # Seconds
+    Field("duration", int, 180),  # Seconds
+])
+
+MODELS = {schema.name: schema for schema in (VEHICLE, MEDIA)}
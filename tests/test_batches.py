@@ -0,0 +1,185 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+try:
+    import django
+except ImportError:
+    django = None
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend_fastapi"))
+from models import SystemState, Mutation, SchemaError
+from journal import StateJournal
+from broker import StateBroker, BrokerClient
+
+
+class ApplyBatchTests(unittest.TestCase):
+    def setUp(self):
+        self.state = SystemState(journal_dir=None)
+
+    def test_one_version_per_batch(self):
+        self.state.apply("media", {"title": "Before"})
+        changes = self.state.apply_batch([
+            Mutation("vehicle", {"driver_temp": 19}),
+            Mutation("media", {"title": "Preset"}),
+            Mutation("vehicle", {"fan_speed": 2}),
+        ])
+        self.assertEqual(self.state.version, 2)
+        self.assertEqual([(change.model, change.version, change.prev_version) for change in changes],
+                         [("vehicle", 2, 0), ("media", 2, 1)])
+        self.assertEqual(changes[0].delta, {"driver_temp": 19, "fan_speed": 2})  # Net change per model
+        self.assertEqual(self.state.revisions, {"vehicle": 2, "media": 2})
+        self.assertEqual([(event["v"], event["m"], event.get("b")) for event in self.state.journal.tail],
+                         [(1, "media", None), (2, "vehicle", 2), (2, "media", 2)])
+
+    def test_all_or_nothing(self):
+        before = self.state.snapshot()
+        with self.assertRaises(SchemaError) as raised:
+            self.state.apply_batch([Mutation("vehicle", {"volume": 10}), Mutation("media", {"album_art": "nope"})])
+        self.assertTrue(str(raised.exception).startswith("mutation 1: media.album_art"))
+        self.assertEqual(self.state.snapshot(), before)
+        self.assertEqual(len(self.state.journal.tail), 0)
+
+    def test_unknown_model(self):
+        with self.assertRaises(SchemaError):
+            self.state.apply_batch([Mutation("seats", {"heat": 1})])
+
+    def test_no_op_keeps_version(self):
+        self.assertEqual(self.state.apply_batch([Mutation("vehicle", {"volume": 50})]), [])
+        self.assertEqual(self.state.version, 0)
+
+    def test_changes_since_replays_whole_batch(self):
+        self.state.apply_batch([Mutation("vehicle", {"volume": 1}), Mutation("media", {"title": "A"})])
+        self.state.apply("media", {"title": "B"})
+        self.assertEqual([(change.model, change.version) for change in self.state.changes_since(0)],
+                         [("vehicle", 1), ("media", 1), ("media", 2)])
+
+
+class JournalBatchTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, events):
+        journal = StateJournal(self.directory, fsync=False)
+        for version, prev, model, batch in events:
+            journal.record(version, prev, model, {"volume" if model == "vehicle" else "title": version}, {},
+                           batch=batch)
+        journal.write(journal.take_batch(lambda: None))
+        return journal
+
+    def _segment(self):
+        (name,) = [name for name in os.listdir(self.directory) if name.startswith("journal-")]
+        return os.path.join(self.directory, name)
+
+    def test_complete_batch_is_recovered(self):
+        self._write([(1, 0, "vehicle", 1), (2, 1, "vehicle", 2), (2, 0, "media", 2)])
+        state, events = StateJournal(self.directory, fsync=False).recover()
+        self.assertEqual([(event["v"], event["m"]) for event in events], [(1, "vehicle"), (2, "vehicle"), (2, "media")])
+
+    def test_torn_batch_is_dropped(self):
+        self._write([(1, 0, "vehicle", 1), (2, 1, "vehicle", 2), (2, 0, "media", 2)])
+        path = self._segment()
+        with open(path, "rb") as f:
+            lines = f.readlines()
+        with open(path, "wb") as f:
+            f.writelines(lines[:-1])
+            f.write(lines[-1][:5])  # Torn write of the batch's last line
+        journal = StateJournal(self.directory, fsync=False)
+        state, events = journal.recover()
+        self.assertEqual([(event["v"], event["m"]) for event in events], [(1, "vehicle")])
+        self.assertEqual(journal.since(0), [events[0]])
+        self.assertTrue(journal._snapshot_due)
+
+    def test_append_after_torn_first_line(self):
+        self._write([(1, 0, "vehicle", 1)])
+        path = self._segment()
+        with open(path, "rb") as f:
+            line = f.read()
+        with open(path, "wb") as f:
+            f.write(line[:5])  # The segment's only line is torn
+        journal = StateJournal(self.directory, fsync=False)
+        self.assertEqual(journal.recover(), (None, []))
+        self.assertEqual(os.path.getsize(path), 0)
+        journal._snapshot_due = False  # Keep the events in the segment for this check
+        journal.record(1, 0, "media", {"title": "A"}, {})
+        journal.write(journal.take_batch(lambda: None))
+        state, events = StateJournal(self.directory, fsync=False).recover()
+        self.assertEqual([(event["v"], event["m"]) for event in events], [(1, "media")])
+
+    def test_since_refuses_partly_evicted_batch(self):
+        journal = StateJournal(None, tail_size=3)
+        journal.record(2, 0, "vehicle", {"volume": 1}, {}, batch=2)
+        journal.record(2, 0, "media", {"title": "A"}, {}, batch=2)
+        journal.record(3, 2, "media", {"title": "B"}, {})
+        self.assertEqual([event["m"] for event in journal.since(1)], ["vehicle", "media", "media"])
+        journal.record(4, 3, "media", {"title": "C"}, {})  # Evicts the vehicle half of batch 2
+        self.assertIsNone(journal.since(1))
+        self.assertEqual([event["v"] for event in journal.since(2)], [3, 4])
+
+
+class BrokerBatchTests(unittest.TestCase):
+    def test_replica_applies_every_model_of_a_version(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        socket_path = os.path.join(directory, "broker.sock")
+
+        async def scenario():
+            broker = StateBroker(SystemState(journal_dir=None), socket_path)
+            await broker.start()
+            received = []
+
+            async def on_change(change):
+                received.append(change)
+            replicas = [SystemState(journal_dir=None) for _ in range(2)]
+            clients = [BrokerClient(replica, socket_path, on_change) for replica in replicas]
+            for client in clients:
+                await client.start()
+            try:
+                version = await clients[0].apply_batch([Mutation("vehicle", {"volume": 5}),
+                                                        Mutation("media", {"title": "Preset"})])
+                for _ in range(100):
+                    if len(received) == 4:
+                        break
+                    await asyncio.sleep(0.01)
+            finally:
+                for client in clients:
+                    await client.close()
+                await broker.stop()
+            return version, replicas, received
+
+        version, replicas, received = asyncio.run(scenario())
+        self.assertEqual(version, 1)
+        for replica in replicas:
+            self.assertEqual((replica.version, replica.vehicle["volume"], replica.media["title"]), (1, 5, "Preset"))
+            self.assertEqual(replica.revisions, {"vehicle": 1, "media": 1})
+            self.assertEqual([event.get("b") for event in replica.journal.tail], [2, 2])
+        self.assertEqual(sorted((change.model, change.version) for change in received),
+                         [("media", 1), ("media", 1), ("vehicle", 1), ("vehicle", 1)])
+
+
+@unittest.skipIf(django is None, "Django is not installed")
+class BatchViewTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "AeroUI-main", "backend"))
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Gesture_Detection.settings")
+        django.setup()
+
+    def test_body_must_be_an_object(self):
+        from django.test import Client
+        client = Client(HTTP_HOST="localhost")
+        for body in ([{"model": "vehicle", "fields": {"volume": 1}}], 5):
+            with self.subTest(body=body):
+                response = client.post("/api/batch/", body, content_type="application/json")
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"detail": "mutations must be a non-empty list"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "shared"))
+from state_schema import VEHICLE, MEDIA, Field, ModelSchema, SchemaError
+
+
+class PackTests(unittest.TestCase):
+    def test_state_round_trip(self):
+        for schema in (VEHICLE, MEDIA):
+            state = schema.defaults()
+            self.assertEqual(schema.unpack(schema.pack(state)), state)
+
+    def test_pack_is_schema_order(self):
+        state = {"driver_temp": 18, "passenger_temp": 24, "fan_speed": 5, "volume": 0}
+        self.assertEqual(VEHICLE.pack(state), [18, 24, 5, 0])
+
+    def test_shorter_state_defaults_the_tail(self):
+        # Older writer without the last fields
+        self.assertEqual(VEHICLE.unpack([18, 24]),
+                         {"driver_temp": 18, "passenger_temp": 24, "fan_speed": 3, "volume": 50})
+
+    def test_longer_state_ignores_unknown_values(self):
+        # Newer writer with fields appended after ours
+        self.assertEqual(VEHICLE.unpack([18, 24, 5, 0, "new", 7]),
+                         {"driver_temp": 18, "passenger_temp": 24, "fan_speed": 5, "volume": 0})
+
+    def test_delta_round_trip(self):
+        for delta in ({}, {"volume": 0}, {"driver_temp": 17, "volume": 80},
+                      {"driver_temp": 16, "passenger_temp": 30, "fan_speed": 1, "volume": 100}):
+            self.assertEqual(VEHICLE.unpack_delta(VEHICLE.pack_delta(delta)), delta)
+        delta = {"title": "Song", "is_playing": True, "duration": 200}
+        self.assertEqual(MEDIA.unpack_delta(MEDIA.pack_delta(delta)), delta)
+
+    def test_delta_mask(self):
+        self.assertEqual(VEHICLE.pack_delta({"volume": 10, "driver_temp": 20}), [0b1001, 20, 10])
+
+    def test_delta_ignores_unknown_fields_and_mask_bits(self):
+        self.assertEqual(VEHICLE.pack_delta({"volume": 10, "extra": 1}), [0b1000, 10])
+        # Bit 4 belongs to a field this reader does not know yet
+        self.assertEqual(VEHICLE.unpack_delta([0b11000, 10, "new"]), {"volume": 10})
+
+    def test_appended_field_stays_compatible(self):
+        # The header's rule: new fields only go at the end
+        newer = ModelSchema("vehicle", list(VEHICLE.fields) + [Field("seat_heat", int, 0)])
+        state = {**VEHICLE.defaults(), "volume": 70}
+        self.assertEqual(newer.unpack(VEHICLE.pack(state)), {**state, "seat_heat": 0})
+        self.assertEqual(VEHICLE.unpack(newer.pack({**state, "seat_heat": 2})), state)
+        self.assertEqual(VEHICLE.unpack_delta(newer.pack_delta({"volume": 5, "seat_heat": 1})), {"volume": 5})
+        self.assertEqual(newer.unpack_delta(VEHICLE.pack_delta({"fan_speed": 2})), {"fan_speed": 2})
+
+
+class ValidateTests(unittest.TestCase):
+    def test_full_validate_fills_defaults(self):
+        self.assertEqual(VEHICLE.validate({"volume": 10}), {**VEHICLE.defaults(), "volume": 10})
+
+    def test_partial_validate_keeps_only_given_fields(self):
+        self.assertEqual(VEHICLE.validate({"volume": 10}, partial=True), {"volume": 10})
+
+    def test_coercion(self):
+        self.assertEqual(VEHICLE.validate({"volume": "42", "fan_speed": 2.0, "driver_temp": True}, partial=True),
+                         {"volume": 42, "fan_speed": 2, "driver_temp": 1})
+        self.assertEqual(MEDIA.validate({"is_playing": "true"}, partial=True), {"is_playing": True})
+        self.assertEqual(MEDIA.validate({"is_playing": 0}, partial=True), {"is_playing": False})
+
+    def test_unknown_fields_are_dropped(self):
+        self.assertEqual(VEHICLE.validate({"volume": 1, "seat_heat": 3}, partial=True), {"volume": 1})
+
+    def test_rejections(self):
+        for schema, data, message in (
+                (VEHICLE, {"volume": "loud"}, "vehicle.volume"),
+                (VEHICLE, {"volume": 2.5}, "vehicle.volume"),
+                (VEHICLE, {"fan_speed": None}, "vehicle.fan_speed"),
+                (MEDIA, {"title": 5}, "media.title"),
+                (MEDIA, {"title": "x" * 101}, "media.title"),
+                (MEDIA, {"is_playing": "maybe"}, "media.is_playing"),
+                (MEDIA, {"album_art": "ftp://example.com/a.png"}, "media.album_art")):
+            with self.subTest(data=data):
+                with self.assertRaises(SchemaError) as raised:
+                    schema.validate(data, partial=True)
+                self.assertTrue(str(raised.exception).startswith(message + ":"))
+
+    def test_url_field(self):
+        self.assertEqual(MEDIA.validate({"album_art": ""}, partial=True), {"album_art": ""})
+        url = "https://example.com/art.png"
+        self.assertEqual(MEDIA.validate({"album_art": url}, partial=True), {"album_art": url})
+
+
+class MergeDiffTests(unittest.TestCase):
+    def test_merge_ignores_unknown_fields(self):
+        state = VEHICLE.defaults()
+        self.assertEqual(VEHICLE.merge(state, {"volume": 9, "other": 1}), {**state, "volume": 9})
+
+    def test_diff(self):
+        old = MEDIA.defaults()
+        new = {**old, "title": "A", "progress": 3}
+        self.assertEqual(MEDIA.diff(old, new), {"title": "A", "progress": 3})
+        self.assertEqual(MEDIA.diff(old, dict(old)), {})
+
+
+if __name__ == "__main__":
+    unittest.main()